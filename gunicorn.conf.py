@@ -0,0 +1,80 @@
+"""
+Production gunicorn settings. gunicorn reads this file whenever it is started
+from the project root; every value can be overridden with the GUNICORN_*
+environment variable next to it.
+"""
+import multiprocessing
+import os
+
+CPUS = multiprocessing.cpu_count()
+
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def env_bool(name, default):
+    return os.getenv(name, str(default)).lower() == 'true'
+
+
+wsgi_app = 'scheema_retail.wsgi:application'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# gthread workers overlap database and cache waits; a process per core plus
+# one keeps the CPUs busy, and the threads cover the I/O.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = env_int('GUNICORN_WORKERS', CPUS + 1)
+threads = env_int('GUNICORN_THREADS', 4)
+
+# Load the app once in the master: workers then share its imported code and
+# compiled templates copy-on-write. Caches are warmed in each worker instead,
+# since the master never hears of changes and a worker forked hours later
+# would serve its snapshot as current.
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+warm_up_products = env_int('GUNICORN_WARM_UP_PRODUCTS', 500)
+
+# Recycle workers now and then to bound memory growth; the jitter keeps them
+# from all restarting at once.
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 200)
+
+# Behind a load balancer, keep idle connections open for longer than the
+# balancer does, so it never reuses one gunicorn has just closed.
+keepalive = env_int('GUNICORN_KEEPALIVE', 75)
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+
+# Heartbeat files on tmpfs, so a slow disk can't make workers look dead.
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+
+
+def _warm_up(log, code_only=False):
+    # A cold cache is slower, not broken, so a failed warm-up must not stop
+    # the server from starting.
+    try:
+        from scheema_retail_store.warmup import warm_code, warm_up
+        if code_only:
+            warm_code()
+        else:
+            warm_up(warm_up_products)
+    except Exception:
+        log.exception("Warm-up failed; serving with cold caches")
+
+
+def when_ready(server):
+    if preload_app:
+        _warm_up(server.log, code_only=True)
+
+
+def pre_fork(server, worker):
+    # Connections must never be shared between processes.
+    from django.db import connections
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # Every worker, including those recycled after max_requests, fills its
+    # caches with current data before it accepts requests.
+    if warm_up_products:
+        _warm_up(worker.log)
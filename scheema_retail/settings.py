@@ -1,10 +1,13 @@
 from pathlib import Path
-from dotenv import load_dotenv # type: ignore
 import os
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-load_dotenv(os.path.join(BASE_DIR, '.env'))
+# Deployments pass their configuration in the environment; only import
+# python-dotenv when there is a .env file to read.
+if (BASE_DIR / '.env').exists():
+    from dotenv import load_dotenv  # type: ignore
+    load_dotenv(BASE_DIR / '.env')
 
 SECRET_KEY = os.getenv(
     'SECRET_KEY', '0*6-5^7pjc)p2)$ebdwr)0fseeed5q=81xwe$&c*))8rq@#pv8')
@@ -32,34 +35,80 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'scheema_retail_store.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'scheema_retail_store.middleware.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
 
+# Request timing, query counting and Server-Timing headers. Off unless asked
+# for, e.g. for load tests: it wraps every query and logs every request.
+PERFORMANCE_INSTRUMENTATION = os.getenv(
+    'PERFORMANCE_INSTRUMENTATION', 'false').lower() == 'true'
+PERFORMANCE_DB_INSTRUMENTATION = os.getenv(
+    'PERFORMANCE_DB_INSTRUMENTATION', 'true').lower() == 'true'
+PERFORMANCE_WINDOW = int(os.getenv('PERFORMANCE_WINDOW', 1000))
+
+# Checkout stock holds and the cached availability counters
+STOCK_RESERVATION_MINUTES = int(os.getenv('STOCK_RESERVATION_MINUTES', 15))
+STOCK_AVAILABILITY_CACHE_SECONDS = int(os.getenv('STOCK_AVAILABILITY_CACHE_SECONDS', 30))
+
+# Throttled views: URL name -> (burst, seconds to refill it), per signed-in
+# user or anonymous IP. Behind a proxy, read the client IP from its header,
+# e.g. RATELIMIT_IP_HEADER=HTTP_X_FORWARDED_FOR. Buckets live in the cache, so
+# with a per-process cache each worker applies these limits on its own.
+RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
+RATELIMIT_IP_HEADER = os.getenv('RATELIMIT_IP_HEADER', 'REMOTE_ADDR')
+RATELIMITS = {
+    'add_to_cart': (30, 60),
+    'remove_from_cart': (30, 60),
+    'api_cart_add': (30, 60),
+    'api_cart_remove': (30, 60),
+    'search': (20, 60),
+    'api_product_list': (120, 60),
+}
+
+# Background tasks, run by `manage.py run_workers`. A running task whose
+# worker hasn't finished it within the lease is presumed lost and run again,
+# so the lease must outlast the slowest task. Eager mode runs tasks inline.
+TASK_LEASE_SECONDS = int(os.getenv('TASK_LEASE_SECONDS', 300))
+TASKS_EAGER = os.getenv('TASKS_EAGER', 'false').lower() == 'true'
+
 ROOT_URLCONF = 'scheema_retail.urls'
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/'
 TAILWIND_APP_NAME = 'scheema_retail_frontend'
 
+# Outside development, each template is parsed once per process and then
+# rendered from memory; in development edits show up on the next request.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'scheema_retail_store.context_processors.cart_total_items'
+                'scheema_retail_store.context_processors.cart_total_items',
+                'scheema_retail_store.context_processors.navigation',
+                'scheema_retail_store.context_processors.currency',
+            ],
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
             ],
         },
     },
@@ -68,10 +117,30 @@ TEMPLATES = [
 WSGI_APPLICATION = 'scheema_retail.wsgi.application'
 
 
+# Under gunicorn every worker is a separate process, so production needs a
+# cache they all share, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# with CACHE_LOCATION=redis://cache:6379/0 (or memcached, or the database
+# cache after `manage.py createcachetable`). The in-memory default is per
+# process and only sees the changes made in its own process, so it keeps
+# entries that are dropped on change for at most LOCAL_CACHE_SECONDS.
+# Rendered product tiles take one entry per product, so the limit must stay
+# above the catalog size.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+if not CACHE_BACKEND.endswith(('RedisCache', 'MemcacheCache', 'MCCache')):
+    # Redis and memcached evict by themselves.
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 50000))}
+LOCAL_CACHE_SECONDS = int(os.getenv('LOCAL_CACHE_SECONDS', 60))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.getenv('SQLITE_PATH', os.path.join(BASE_DIR, 'db.sqlite3')),
     }
 }
 
@@ -113,7 +182,52 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Media under these directories gets content-hashed URLs, cached forever by
+# browsers. The manifest is written by `manage.py fingerprint_media`.
+DEFAULT_FILE_STORAGE = 'scheema_retail_store.media.FingerprintedMediaStorage'
+MEDIA_FINGERPRINT_DIRS = ['products']
+MEDIA_MANIFEST_PATH = os.getenv('MEDIA_MANIFEST_PATH', os.path.join(BASE_DIR, 'media-manifest.json'))
+# When served behind nginx, e.g. "/protected-media/": an internal location
+# aliased to MEDIA_ROOT that nginx sends media files from.
+MEDIA_ACCEL_REDIRECT = os.getenv('MEDIA_ACCEL_REDIRECT', '')
+
+# The currency product prices, carts and orders are in. Shoppers can also
+# see prices in those of CURRENCIES that are in the exchange rate table,
+# which `manage.py load_exchange_rates` fills from EXCHANGE_RATES_FILE.
+CURRENCY = os.getenv('CURRENCY', 'USD')
+CURRENCIES = os.getenv('CURRENCIES', 'KES,EUR,GBP').split(',')
+EXCHANGE_RATES_FILE = os.getenv('EXCHANGE_RATES_FILE', os.path.join(BASE_DIR, 'exchange_rates.json'))
+
+# Sitemaps and product feeds, written by `manage.py build_feeds`. They link
+# to absolute URLs under SITE_URL.
+FEEDS_ROOT = os.getenv('FEEDS_ROOT', os.path.join(BASE_DIR, 'feeds'))
+SITE_URL = os.getenv('SITE_URL', 'http://localhost:8000').rstrip('/')
+# Feed prices are converted into FEED_CURRENCY, which needs an exchange rate.
+FEED_CURRENCY = os.getenv('FEED_CURRENCY', CURRENCY)
+
+# Gzipped NDJSON files of the orders moved out of the database by
+# `manage.py archive_orders`.
+ARCHIVE_ROOT = os.getenv('ARCHIVE_ROOT', os.path.join(BASE_DIR, 'archive'))
+
+STATICFILES_STORAGE = os.getenv(
+    'STATICFILES_STORAGE', 'whitenoise.storage.CompressedManifestStaticFilesStorage')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'scheema_retail_store.performance': {
+            'handlers': ['console'],
+            'level': os.getenv('PERFORMANCE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
 
 # Auto filed for Pk
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,19 @@
+"""
+Lean settings for processes that serve requests or run scheduled commands,
+such as gunicorn workers and cron jobs. They only drop what is needed to
+build the frontend, so boots are shorter.
+
+Select them with DJANGO_SETTINGS_MODULE=scheema_retail.settings_runtime.
+"""
+from copy import deepcopy
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, TEMPLATES
+
+# django-tailwind only compiles and watches the stylesheet in development;
+# at runtime the compiled file is served like any other static file.
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'tailwind']
+
+TEMPLATES = deepcopy(TEMPLATES)
+TEMPLATES[0]['OPTIONS']['libraries'] = {
+    'tailwind_tags': 'scheema_retail_frontend.runtime_tags',
+}
@@ -1,12 +1,12 @@
 from django.contrib import admin
-from django.urls import include, path
-from django.conf.urls.static import static
+from django.urls import include, path, re_path
 from django.conf import settings
+from scheema_retail_store import feeds, media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), media.serve, name='media'),
+    re_path(r'^(?P<name>sitemap[\w-]*\.xml)$', feeds.serve, name='sitemap'),
+    path('feeds/<str:name>', feeds.serve, name='product_feed'),
     path('', include('scheema_retail_store.urls'))
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -0,0 +1,19 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def tailwind_css(v=None):
+    """
+    Stands in for django-tailwind's tag when the app is not installed and
+    links the compiled stylesheet.
+    """
+    path = getattr(settings, 'TAILWIND_CSS_PATH', 'css/dist/styles.css')
+    url = path if path.startswith(('http://', 'https://', '/')) else static(path)
+    if v:
+        return format_html('<link rel="stylesheet" href="{}?v={}">', url, v)
+    return format_html('<link rel="stylesheet" href="{}">', url)
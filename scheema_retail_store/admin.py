@@ -1,10 +1,207 @@
-from django.contrib import admin
-from .models import Cart, CartItem, Product, Category, Order, OrderItem, Review
-
-admin.site.register(Category)
-admin.site.register(Product)
-admin.site.register(Review)
-admin.site.register(Order)
-admin.site.register(OrderItem)
-admin.site.register(Cart)
-admin.site.register(CartItem)
\ No newline at end of file
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import F
+from django.db.models.functions import Now, Round
+from django.utils.functional import cached_property
+from .caching import invalidate_products
+from .models import Cart, CartItem, ExchangeRate, Product, Category, Order, OrderItem, Review, Task
+
+# Tables estimated to hold fewer rows than this are counted exactly.
+EXACT_COUNT_BELOW = 10000
+
+
+def estimated_row_count(model, using='default'):
+    """
+    Returns the row count of `model`'s table according to the database's
+    statistics (kept by autovacuum on PostgreSQL, by ANALYZE on SQLite), or
+    `None` when there are none.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            try:
+                # Each index's stat starts with the number of rows it covers.
+                cursor.execute('SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s',
+                               [table])
+            except DatabaseError:
+                return None  # No ANALYZE has run yet.
+        else:
+            return None
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for tables that were never analyzed.
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator that takes the size of an unfiltered list of a large
+    table from the database's statistics instead of a `COUNT(*)`, which reads
+    the whole table on PostgreSQL. Filtered lists and small tables are
+    counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= EXACT_COUNT_BELOW:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Base admin for tables that grow with traffic: estimated page counts and
+    no second count of the unfiltered table. Subclasses use raw id inputs
+    rather than select boxes listing every related row.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class ProductActionForm(ActionForm):
+    quantity = forms.IntegerField(required=False, min_value=1,
+                                  help_text="Units to add, for the restock action.")
+    percent = forms.DecimalField(required=False, min_value=-99, max_value=1000, decimal_places=2,
+                                 help_text="Price change in %, for the reprice action.")
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug')
+    search_fields = ('name',)
+    prepopulated_fields = {'slug': ('name',)}
+
+
+@admin.register(Product)
+class ProductAdmin(LargeTableAdmin):
+    list_display = ('name', 'sku', 'category', 'price', 'stock')
+    list_select_related = ('category',)
+    list_filter = ('category',)
+    # Exact matches on the unique sku and slug columns use their indexes.
+    search_fields = ('sku__exact', 'slug__exact')
+    search_help_text = "Exact SKU or slug."
+    action_form = ProductActionForm
+    actions = ('restock', 'reprice')
+
+    def _action_value(self, request, field):
+        try:
+            value = self.action_form.base_fields[field].clean(request.POST.get(field))
+        except ValidationError:
+            value = None
+        if value is None:
+            self.message_user(request, f"Enter a valid {field} for this action.", messages.ERROR)
+        return value
+
+    def _updated(self, request, queryset, **values):
+        # One UPDATE for the whole selection. Updates skip post_save, so the
+        # quick views and availability counters are dropped here; tiles
+        # follow `updated_at`, which callers changing what they show must set.
+        product_ids = list(queryset.values_list('id', flat=True))
+        updated = queryset.update(**values)
+        invalidate_products(product_ids)
+        return updated
+
+    def save_model(self, request, obj, form, change):
+        # An edited price replaces the converted one, unless the source amount
+        # was edited along with it.
+        if change and 'price' in form.changed_data and not (
+                {'source_currency', 'source_amount'} & set(form.changed_data)):
+            obj.source_currency, obj.source_amount = '', None
+        super().save_model(request, obj, form, change)
+
+    @admin.action(description="Restock selected products")
+    def restock(self, request, queryset):
+        quantity = self._action_value(request, 'quantity')
+        if quantity is not None:
+            updated = self._updated(request, queryset, stock=F('stock') + quantity)
+            self.message_user(request, f"Added {quantity} units to {updated} products.")
+
+    @admin.action(description="Reprice selected products")
+    def reprice(self, request, queryset):
+        percent = self._action_value(request, 'percent')
+        if percent is not None:
+            factor = 1 + percent / 100
+            # A price set here is no longer a conversion for reprice_products to redo.
+            updated = self._updated(request, queryset, price=Round(F('price') * factor, 2),
+                                    updated_at=Now(), source_currency='', source_amount=None)
+            self.message_user(request, f"Changed the price of {updated} products by {percent}%.")
+
+
+@admin.register(Review)
+class ReviewAdmin(LargeTableAdmin):
+    list_display = ('id', 'product', 'user', 'rating', 'created_at')
+    list_select_related = ('product', 'user')
+    list_filter = ('rating',)
+    raw_id_fields = ('product', 'user')
+    search_fields = ('product__sku__exact', 'user__username__exact')
+    search_help_text = "Exact product SKU or username."
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    # The snapshot taken at checkout, shown without a join to the catalog.
+    fields = ('sku', 'name', 'quantity', 'price')
+    readonly_fields = ('sku', 'name')
+    extra = 0
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'total_price', 'created_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('user__username__exact',)
+    search_help_text = "Exact username."
+    inlines = (OrderItemInline,)
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(LargeTableAdmin):
+    list_display = ('id', 'order', 'sku', 'name', 'quantity', 'price')
+    list_select_related = ('order__user',)
+    raw_id_fields = ('order', 'product')
+    search_fields = ('product__sku__exact',)
+    search_help_text = "Exact product SKU."
+
+
+@admin.register(Cart)
+class CartAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'session_key')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('user__username__exact',)
+    search_help_text = "Exact username."
+
+
+@admin.register(CartItem)
+class CartItemAdmin(LargeTableAdmin):
+    list_display = ('id', 'cart', 'product', 'quantity')
+    list_select_related = ('cart__user', 'product')
+    raw_id_fields = ('cart', 'product')
+    search_fields = ('product__sku__exact',)
+    search_help_text = "Exact product SKU."
+
+
+@admin.register(Task)
+class TaskAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('name__exact',)
+    search_help_text = "Exact task name."
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'last_error')
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ('currency', 'rate', 'updated_at')
+    readonly_fields = ('updated_at',)
@@ -0,0 +1,111 @@
+from datetime import timedelta
+from decimal import Decimal
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import DailyCategorySales, DailyProductSales, Order, OrderItem, RollupState
+
+ROLLUP_NAME = 'sales'
+ITEM_COLUMNS = ['order_id', 'created_at', 'product_id', 'category_id', 'quantity', 'price']
+
+
+def _to_decimal(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def _items_frame(after, until):
+    # Lines of deleted products have no product (or rollup rows) to count against.
+    items = OrderItem.objects.filter(order__created_at__lte=until, product__isnull=False)
+    if after is not None:
+        items = items.filter(order__created_at__gt=after)
+    rows = items.values_list('order_id', 'order__created_at', 'product_id',
+                             'product__category_id', 'quantity', 'price')
+
+    frame = pd.DataFrame.from_records(rows.iterator(chunk_size=5000), columns=ITEM_COLUMNS)
+    if frame.empty:
+        return frame
+    frame['date'] = pd.to_datetime(frame['created_at'], utc=True).dt.tz_convert(
+        settings.TIME_ZONE).dt.date
+    # Whole cents keep the sums exact while staying in int64 columns.
+    frame['revenue'] = (frame['price'].astype(float) * 100).round().astype('int64') * frame['quantity']
+    return frame
+
+
+def _merge(model, key, totals, columns):
+    """
+    Adds `totals` (indexed by `('date', key)`) to the existing rollup rows of
+    `model` and upserts the result.
+    """
+    existing = pd.DataFrame.from_records(
+        model.objects.filter(
+            date__in=totals.index.get_level_values('date').unique().tolist(),
+            **{f'{key}__in': totals.index.get_level_values(key).unique().tolist()},
+        ).values_list('date', key, *columns),
+        columns=['date', key, *columns],
+    ).set_index(['date', key])
+    if not existing.empty:
+        existing['revenue'] = (existing['revenue'].astype(float) * 100).round().astype('int64')
+        totals = totals.add(existing.reindex(totals.index, fill_value=0), fill_value=0)
+
+    model.objects.bulk_create(
+        [
+            model(date=date, **{key: key_id},
+                  **{column: _to_decimal(row[column]) if column == 'revenue' else int(row[column])
+                     for column in columns})
+            for (date, key_id), row in totals.iterrows()
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['date', key.removesuffix('_id')],
+        update_fields=columns,
+    )
+    return len(totals)
+
+
+def rollup_sales(batch_size=5000, settle=timedelta(minutes=1)):
+    """
+    Adds the orders created since the last run to the daily product and
+    category rollups, `batch_size` orders per transaction, and returns the
+    number of orders processed.
+
+    Orders younger than `settle` are left for the next run, so that one whose
+    transaction commits late is not skipped by the high-water mark.
+    """
+    state, created = RollupState.objects.get_or_create(name=ROLLUP_NAME)
+    until = timezone.now() - settle
+    processed = 0
+
+    while True:
+        orders = Order.objects.filter(created_at__lte=until)
+        if state.high_water_mark is not None:
+            orders = orders.filter(created_at__gt=state.high_water_mark)
+        # Cut at the last order of the batch, including any created at the same instant.
+        cutoff = orders.order_by('created_at').values_list(
+            'created_at', flat=True)[batch_size - 1:batch_size].first() or until
+
+        with transaction.atomic():
+            frame = _items_frame(state.high_water_mark, cutoff)
+            if not frame.empty:
+                _merge(DailyProductSales, 'product_id', frame.groupby(['date', 'product_id']).agg(
+                    units=('quantity', 'sum'), revenue=('revenue', 'sum')), ['units', 'revenue'])
+                _merge(DailyCategorySales, 'category_id', frame.groupby(['date', 'category_id']).agg(
+                    units=('quantity', 'sum'), revenue=('revenue', 'sum'),
+                    orders=('order_id', 'nunique')), ['units', 'revenue', 'orders'])
+                processed += frame['order_id'].nunique()
+
+            state.high_water_mark = cutoff
+            state.save(update_fields=['high_water_mark', 'updated_at'])
+
+        if cutoff == until:
+            return processed
+
+
+def reset_rollups():
+    """
+    Empties the rollups so the next run rebuilds them from every order.
+    """
+    with transaction.atomic():
+        DailyProductSales.objects.all().delete()
+        DailyCategorySales.objects.all().delete()
+        RollupState.objects.filter(name=ROLLUP_NAME).delete()
@@ -0,0 +1,317 @@
+import hashlib
+import json
+from functools import wraps
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET, require_POST
+from .caching import invalidated_timeout, product_cache_key
+from .cart import (add_item, create_order, get_lines, get_user_cart, media_url, remove_item,
+                   start_checkout, total_quantity)
+from .categories import CATEGORY_FIELDS, cached_categories
+from .inventory import InsufficientStock
+from .models import Product
+from . import wishlist
+
+# Public field name -> `.values()` lookup. Only these may be requested with `?fields=`.
+PRODUCT_FIELDS = {
+    'id': 'id',
+    'slug': 'slug',
+    'name': 'name',
+    'sku': 'sku',
+    'description': 'description',
+    'price': 'price',
+    'stock': 'stock',
+    'features': 'features',
+    'image': 'image',
+    'images': 'images',
+    'category': 'category__slug',
+}
+PRODUCT_LIST_FIELDS = ('id', 'slug', 'name', 'price', 'image', 'category')
+CART_LINE_FIELDS = ('id', 'slug', 'name', 'price', 'image', 'stock')
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+QUICK_VIEW_TIMEOUT = 60 * 60
+QUICK_VIEW_MAX_AGE = 60
+
+
+class APIError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False,
+                        json_dumps_params={'separators': (',', ':')})
+
+
+def _parse_fields(request, default):
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(default)
+
+    # Repeats are dropped, keeping the first mention's place.
+    fields = list(dict.fromkeys(field.strip() for field in requested.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in PRODUCT_FIELDS]
+    if unknown:
+        raise APIError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def _parse_int(params, name, default, minimum=0, maximum=None):
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError as e:
+        raise APIError(f"'{name}' must be an integer.") from e
+    if value < minimum:
+        raise APIError(f"'{name}' must be at least {minimum}.")
+    return min(value, maximum) if maximum else value
+
+
+def _serialize_products(rows, fields):
+    """
+    Renames `.values()` lookups back to their public names and turns stored
+    file names into URLs, mutating and returning the rows.
+    """
+    for row in rows:
+        for field in fields:
+            lookup = PRODUCT_FIELDS[field]
+            if lookup != field:
+                row[field] = row.pop(lookup)
+        if 'image' in row:
+            row['image'] = media_url(row['image'])
+        if 'images' in row:
+            row['images'] = [media_url(image) for image in row['images'] or []]
+    return rows
+
+
+def api_view(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except APIError as e:
+            return json_response({'error': str(e)}, status=e.status)
+    return wrapper
+
+
+@require_GET
+@api_view
+def product_list(request):
+    """
+    Lists products ordered by id with keyset pagination: `?after=<id>` returns
+    the page following that id, so deep pages cost the same as the first one.
+
+    Supports `?fields=`, `?limit=`, `?category=<slug>` and `?q=`.
+    """
+    fields = _parse_fields(request, PRODUCT_LIST_FIELDS)
+    after = _parse_int(request.GET, 'after', 0)
+    limit = _parse_int(request.GET, 'limit', DEFAULT_PAGE_SIZE,
+                       minimum=1, maximum=MAX_PAGE_SIZE)
+
+    products = Product.objects.filter(id__gt=after).order_by('id')
+    if category := request.GET.get('category'):
+        products = products.filter(category__slug=category)
+    if query := request.GET.get('q'):
+        products = products.filter(name__icontains=query)
+
+    lookups = {PRODUCT_FIELDS[field] for field in fields} | {'id'}
+    rows = list(products.values(*lookups)[:limit + 1])
+
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = rows[-1]['id']
+    if 'id' not in fields:
+        for row in rows:
+            del row['id']
+
+    return json_response({
+        'results': _serialize_products(rows, fields),
+        'next_after': next_after,
+    })
+
+
+@require_GET
+@api_view
+def product_detail(request, slug):
+    fields = _parse_fields(request, PRODUCT_FIELDS)
+    row = Product.objects.filter(slug=slug).values(
+        *(PRODUCT_FIELDS[field] for field in fields)).first()
+    if row is None:
+        raise APIError('Product not found.', status=404)
+    return json_response(_serialize_products([row], fields)[0])
+
+
+def _quick_view_entry(product_id):
+    """
+    Returns the cached `(body, etag)` pair for a product's quick view, building
+    it on a miss. None when the product does not exist. Dropped whenever the
+    product changes; a per-process cache, which only hears of the changes
+    made in its own process, keeps it for `LOCAL_CACHE_SECONDS` at most.
+    """
+    key = product_cache_key('quick_view', product_id)
+    entry = cache.get(key)
+    if entry is None:
+        row = Product.objects.filter(pk=product_id).values(
+            'id', 'slug', 'name', 'price', 'image', 'description').first()
+        if row is None:
+            return None
+        row['image'] = media_url(row['image'])
+        row['add_to_cart_url'] = reverse('add_to_cart', args=[row['id']])
+        body = json.dumps(row, cls=DjangoJSONEncoder,
+                          separators=(',', ':')).encode()
+        entry = (body, f'"{hashlib.md5(body).hexdigest()}"')
+        cache.set(key, entry, invalidated_timeout(QUICK_VIEW_TIMEOUT))
+    return entry
+
+
+@require_GET
+@api_view
+def product_quick_view(request, product_id):
+    """
+    Returns the few fields the home page quick-view modal needs, served from
+    the cache and answered with 304 when the client's ETag still matches.
+    """
+    entry = _quick_view_entry(product_id)
+    if entry is None:
+        raise APIError('Product not found.', status=404)
+
+    body, etag = entry
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=QUICK_VIEW_MAX_AGE)
+    return response
+
+
+@require_GET
+@api_view
+def category_list(request):
+    return json_response({'results': [
+        {field: getattr(category, field) for field in CATEGORY_FIELDS}
+        for category in cached_categories()
+    ]})
+
+
+def _cart_payload(request):
+    lines = get_lines(request, CART_LINE_FIELDS)
+    for line in lines:
+        line['product']['image'] = line['product'].pop('image_url')
+    return {
+        'items': lines,
+        'total_items': total_quantity(request),
+        'total_cost': sum(line['subtotal'] for line in lines),
+    }
+
+
+@require_GET
+@api_view
+def cart_detail(request):
+    return json_response(_cart_payload(request))
+
+
+@require_POST
+@api_view
+def cart_add(request, product_id):
+    product = Product.objects.only('id', 'name').filter(pk=product_id).first()
+    if product is None:
+        raise APIError('Product not found.', status=404)
+    quantity = _parse_int(request.POST, 'quantity', 1, minimum=1)
+    try:
+        add_item(request, product, quantity)
+    except InsufficientStock as e:
+        raise APIError(f'Only {e.shortages[product.id]} left in stock.', status=409) from e
+    return json_response(_cart_payload(request))
+
+
+@require_POST
+@api_view
+def cart_remove(request, product_id):
+    if remove_item(request, product_id) is None:
+        raise APIError('Item not found in cart.', status=404)
+    return json_response(_cart_payload(request))
+
+
+def _wishlist_payload(request):
+    fields = _parse_fields(request, PRODUCT_LIST_FIELDS)
+    rows = list(Product.objects.filter(wishlist__user=request.user).order_by('id').values(
+        *(PRODUCT_FIELDS[field] for field in fields)))
+    return {'results': _serialize_products(rows, fields)}
+
+
+def _require_user(request):
+    if not request.user.is_authenticated:
+        raise APIError('Authentication required.', status=401)
+
+
+@require_GET
+@api_view
+def wishlist_detail(request):
+    _require_user(request)
+    return json_response(_wishlist_payload(request))
+
+
+@require_POST
+@api_view
+def wishlist_add(request, product_id):
+    _require_user(request)
+    if not Product.objects.filter(pk=product_id).exists():
+        raise APIError('Product not found.', status=404)
+    wishlist.add(request.user, product_id)
+    return json_response({'product_ids': sorted(wishlist.wishlist_ids(request.user))})
+
+
+@require_POST
+@api_view
+def wishlist_remove(request, product_id):
+    _require_user(request)
+    wishlist.remove(request.user, product_id)
+    return json_response({'product_ids': sorted(wishlist.wishlist_ids(request.user))})
+
+
+@require_POST
+@api_view
+def checkout_start(request):
+    if not request.user.is_authenticated:
+        raise APIError('Authentication required.', status=401)
+
+    try:
+        expires_at = start_checkout(request.user)
+    except InsufficientStock as e:
+        raise APIError('Not enough stock for products: '
+                       f"{', '.join(map(str, sorted(e.shortages)))}.", status=409) from e
+    if expires_at is None:
+        raise APIError('Cart is empty.')
+
+    return json_response({'reserved_until': expires_at})
+
+
+@require_POST
+@api_view
+def checkout(request):
+    if not request.user.is_authenticated:
+        raise APIError('Authentication required.', status=401)
+
+    try:
+        order = create_order(get_user_cart(request.user), request.user)
+    except InsufficientStock as e:
+        raise APIError('Not enough stock for products: '
+                       f"{', '.join(map(str, sorted(e.shortages)))}.", status=409) from e
+    if order is None:
+        raise APIError('Cart is empty.')
+
+    return json_response({
+        'id': order.id,
+        'total_price': order.total_price,
+        'created_at': order.created_at,
+    }, status=201)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ScheemaRetailStoreConfig(AppConfig):
     name = 'scheema_retail_store'
+
+    def ready(self):
+        from . import caching, categories, currency  # noqa: F401
@@ -0,0 +1,79 @@
+import time
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models.functions import Now
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Category, Product
+
+# Prefixes of the per-product cache entries, cleared whenever the product changes.
+PRODUCT_CACHE_PREFIXES = ['quick_view', 'availability']
+CATEGORY_VERSION_KEY = 'category_version'
+
+
+def product_cache_key(prefix, product_id):
+    return f'{prefix}:{product_id}'
+
+
+def cache_is_shared():
+    """
+    Returns whether every process sees the same cache, so that an entry
+    dropped by one process is gone for all of them.
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def invalidated_timeout(timeout):
+    """
+    Returns how long to keep an entry that is dropped when its data changes:
+    `timeout` in a shared cache, but at most `LOCAL_CACHE_SECONDS` in a
+    per-process one, which never hears of changes made by other processes.
+    """
+    if cache_is_shared():
+        return timeout
+    if timeout is None:
+        return settings.LOCAL_CACHE_SECONDS
+    return min(timeout, settings.LOCAL_CACHE_SECONDS)
+
+
+def category_version():
+    """
+    Returns a value that changes whenever a category or its product count
+    does. The category menu and the process-wide category list vary on it.
+    A per-process cache never hears of changes made by other processes, so
+    there it also changes every `LOCAL_CACHE_SECONDS`.
+    """
+    return cache.get_or_set(CATEGORY_VERSION_KEY, time.time_ns, invalidated_timeout(None))
+
+
+def bump_category_version():
+    cache.set(CATEGORY_VERSION_KEY, time.time_ns(), invalidated_timeout(None))
+
+
+def invalidate_products(product_ids):
+    """
+    Drops every per-product cache entry for the given product ids. Rendered
+    product tiles need no dropping: they are cached under the product's
+    `updated_at`, so a changed product is rendered afresh by every process.
+    """
+    cache.delete_many([
+        product_cache_key(prefix, product_id)
+        for product_id in product_ids
+        for prefix in PRODUCT_CACHE_PREFIXES
+    ])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_caches(sender, instance, **kwargs):
+    invalidate_products([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_caches(sender, instance, **kwargs):
+    bump_category_version()
+    # Product tiles show the category name, so its products get a new version.
+    if kwargs.get('created') is False:
+        instance.product_set.update(updated_at=Now())
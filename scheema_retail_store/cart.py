@@ -0,0 +1,232 @@
+from datetime import timedelta
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from .inventory import check_available, fulfil, reserve
+from .models import Cart, CartItem, Order, OrderItem, Product
+
+LINE_FIELDS = ('id', 'slug', 'name', 'description',
+               'price', 'image', 'stock', 'category__name')
+# A cart's `updated_at` is written at most this often, not on every change.
+TOUCH_INTERVAL = timedelta(hours=1)
+
+
+def get_user_cart(user):
+    cart, created = Cart.objects.get_or_create(user=user)
+    now = timezone.now()
+    if not created and cart.updated_at < now - TOUCH_INTERVAL:
+        Cart.objects.filter(pk=cart.pk).update(updated_at=now)
+        cart.updated_at = now
+    return cart
+
+
+def media_url(name):
+    """
+    Returns the public URL of a stored file name as read from a `.values()`
+    queryset, or an empty string when there is no file.
+    """
+    return default_storage.url(name) if name else ''
+
+
+def add_item(request, product, quantity=1):
+    """
+    Adds `quantity` units of `product` to the request's cart, which is the
+    user's `Cart` when authenticated and the session cart otherwise.
+
+    Returns the resulting quantity of the product in the cart, or raises
+    `InsufficientStock` when that is more than is available.
+    """
+    if request.user.is_authenticated:
+        cart = get_user_cart(request.user)
+        cart_item = CartItem.objects.filter(cart=cart, product=product).first()
+        check_available(product.id, quantity + (cart_item.quantity if cart_item else 0))
+
+        if cart_item is None:
+            cart_item = CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+        else:
+            CartItem.objects.filter(pk=cart_item.pk).update(
+                quantity=F('quantity') + quantity)
+            cart_item.quantity += quantity
+        return cart_item.quantity
+
+    cart = request.session.get('cart', {})
+    check_available(product.id, quantity + cart.get(str(product.id), {}).get('quantity', 0))
+
+    if str(product.id) in cart:
+        cart[str(product.id)]['quantity'] += quantity
+    else:
+        cart[str(product.id)] = {'quantity': quantity, 'name': product.name}
+
+    request.session['cart'] = cart
+    return cart[str(product.id)]['quantity']
+
+
+def remove_item(request, product_id):
+    """
+    Removes one unit of the product from the request's cart.
+
+    Returns a `(product_name, remaining_quantity)` tuple, or None when the
+    product is not in the cart.
+    """
+    if request.user.is_authenticated:
+        cart_item = CartItem.objects.filter(
+            cart__user=request.user, product__id=product_id).select_related('product').first()
+        if not cart_item:
+            return None
+
+        if cart_item.quantity > 1:
+            cart_item.quantity -= 1
+            cart_item.save(update_fields=['quantity'])
+            return cart_item.product.name, cart_item.quantity
+
+        cart_item.delete()
+        return cart_item.product.name, 0
+
+    cart = request.session.get('cart', {})
+    if str(product_id) not in cart:
+        return None
+
+    product_name = cart[str(product_id)]['name']
+    if cart[str(product_id)]['quantity'] > 1:
+        cart[str(product_id)]['quantity'] -= 1
+        remaining = cart[str(product_id)]['quantity']
+    else:
+        del cart[str(product_id)]
+        remaining = 0
+
+    request.session['cart'] = cart
+    return product_name, remaining
+
+
+def merge_session_cart(request):
+    """
+    Moves the session cart into the logged-in user's `Cart`, adding to the
+    quantities already there, with one bulk upsert whatever the number of
+    lines. Returns the number of lines merged.
+    """
+    session_cart = request.session.pop('cart', None)
+    if not session_cart or not isinstance(session_cart, dict):
+        return 0
+
+    quantities = {int(product_id): item['quantity']
+                  for product_id, item in session_cart.items()}
+    with transaction.atomic():
+        product_ids = list(Product.objects.filter(
+            pk__in=quantities).values_list('id', flat=True))
+        cart = get_user_cart(request.user)
+        existing = dict(CartItem.objects.filter(cart=cart, product_id__in=product_ids)
+                        .values_list('product_id', 'quantity'))
+        CartItem.objects.bulk_create(
+            [
+                CartItem(cart=cart, product_id=product_id,
+                         quantity=existing.get(product_id, 0) + quantities[product_id])
+                for product_id in product_ids
+            ],
+            update_conflicts=True,
+            unique_fields=['cart', 'product'],
+            update_fields=['quantity'],
+        )
+    return len(product_ids)
+
+
+def get_lines(request, fields=LINE_FIELDS):
+    """
+    Returns the request's cart as a list of `{'product', 'quantity', 'subtotal'}`
+    dicts, read with a single `.values()` query whatever the number of lines.
+    """
+    if request.user.is_authenticated:
+        rows = CartItem.objects.filter(cart__user=request.user).order_by('id').values(
+            'quantity', *(f'product__{field}' for field in fields))
+        lines = [
+            ({field: row[f'product__{field}'] for field in fields}, row['quantity'])
+            for row in rows
+        ]
+    else:
+        cart = request.session.get('cart', {})
+        products = {
+            str(row['id']): row
+            for row in Product.objects.filter(id__in=[int(key) for key in cart]).values(*fields)
+        }
+        lines = [
+            (products[product_id], item['quantity'])
+            for product_id, item in cart.items()
+            if product_id in products
+        ]
+
+    result = []
+    for product, quantity in lines:
+        if 'category__name' in product:
+            product['category'] = product.pop('category__name')
+        if 'image' in product:
+            product['image_url'] = media_url(product['image'])
+        result.append({
+            'product': product,
+            'quantity': quantity,
+            'subtotal': quantity * product['price'],
+        })
+    return result
+
+
+def total_quantity(request):
+    if request.user.is_authenticated:
+        return CartItem.objects.filter(cart__user=request.user).aggregate(
+            total=Sum('quantity'))['total'] or 0
+
+    cart = request.session.get('cart', {})
+    if not isinstance(cart, dict):
+        return 0
+    return sum(item.get('quantity', 0) for item in cart.values())
+
+
+def _quantities(items):
+    quantities = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+
+def start_checkout(user):
+    """
+    Holds the stock for everything in the user's cart while they check out.
+    Returns the time the holds expire, or None when the cart is empty; raises
+    `InsufficientStock` when other shoppers hold too much of a product.
+    """
+    items = list(CartItem.objects.filter(cart__user=user).only('product_id', 'quantity'))
+    if not items:
+        return None
+    return reserve(user, _quantities(items))
+
+
+def create_order(cart, user):
+    """
+    Turns the contents of `cart` into an `Order` for `user`, takes the ordered
+    units out of stock and empties the cart. Returns the new order, or None
+    when the cart has nothing to order; raises `InsufficientStock` when the
+    stock has run out.
+    """
+    if not cart:
+        return None
+
+    items = list(cart.items.select_related('product'))
+    total_cost = sum(item.total_price for item in items)
+    if not items or total_cost <= 0:
+        return None
+
+    with transaction.atomic():
+        fulfil(user, _quantities(items))
+        order = Order.objects.create(user=user, total_price=total_cost)
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=item.product,
+                name=item.product.name,
+                sku=item.product.sku,
+                quantity=item.quantity,
+                price=item.product.price,
+                thumbnail=item.product.image.name or '',
+            )
+            for item in items
+        ])
+        CartItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+    return order
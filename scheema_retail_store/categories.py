@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .caching import bump_category_version, category_version
+from .models import Category, Product
+
+# Fields of the categories kept in memory for navigation.
+CATEGORY_FIELDS = ('id', 'name', 'slug', 'product_count')
+
+# (version, categories) as last loaded by this process.
+_categories = (None, [])
+
+
+def cached_categories():
+    """
+    Returns every category, by name, with its product count. The list is
+    kept in process memory and reloaded only when `category_version()` has
+    moved on, so on most requests this costs no queries.
+    """
+    global _categories
+    version = category_version()
+    loaded_version, categories = _categories
+    if loaded_version != version:
+        categories = list(Category.objects.order_by('name').only(*CATEGORY_FIELDS))
+        _categories = (version, categories)
+    return categories
+
+
+def _counts_changed():
+    # Bumped at once for this transaction's own reads, and again after the
+    # commit, or another process could cache the old counts in the meantime.
+    bump_category_version()
+    transaction.on_commit(bump_category_version)
+
+
+def _adjust_count(category_id, change):
+    Category.objects.filter(pk=category_id).update(
+        product_count=Greatest(F('product_count') + change, 0))
+    _counts_changed()
+
+
+@receiver(pre_save, sender=Product)
+def remember_category(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._saved_category_id = None
+    # Saves of other fields can't move the product, so they cost no query.
+    if update_fields is not None and not {'category', 'category_id'} & set(update_fields):
+        return
+    if not raw and instance.pk and not instance._state.adding:
+        instance._saved_category_id = Product.objects.filter(pk=instance.pk).values_list(
+            'category_id', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def count_saved_product(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_saved_category_id', None)
+    if created:
+        _adjust_count(instance.category_id, 1)
+    elif previous is not None and previous != instance.category_id:
+        _adjust_count(previous, -1)
+        _adjust_count(instance.category_id, 1)
+
+
+@receiver(post_delete, sender=Product)
+def count_deleted_product(sender, instance, **kwargs):
+    _adjust_count(instance.category_id, -1)
+
+
+def reconcile_product_counts():
+    """
+    Recounts the products of every category and stores the counts that had
+    drifted, e.g. after products were bulk-created or deleted with a
+    queryset. Returns `{category slug: (stored, actual)}` for those.
+    """
+    counts = Product.objects.filter(category=OuterRef('pk')).order_by().values(
+        'category').annotate(total=Count('id')).values('total')
+    drifted = Category.objects.annotate(
+        actual=Coalesce(Subquery(counts, output_field=IntegerField()), 0)).exclude(
+        product_count=F('actual')).values_list('id', 'slug', 'product_count', 'actual')
+
+    changes = {}
+    with transaction.atomic():
+        for category_id, slug, stored, actual in drifted:
+            Category.objects.filter(pk=category_id).update(product_count=actual)
+            changes[slug] = (stored, actual)
+        if changes:
+            _counts_changed()
+    return changes
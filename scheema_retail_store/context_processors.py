@@ -1,16 +1,24 @@
-from .models import Cart
+from .caching import category_version
+from .cart import total_quantity
+from .categories import cached_categories
+from .currency import exchange_rates, rates_version, request_currency
 
 def cart_total_items(request):
-    total_items = 0
+    return {'total_items_in_cart': total_quantity(request)}
 
-    if request.user.is_authenticated:
-        cart = Cart.objects.filter(user=request.user).first()
-        if cart and cart.items.exists():
-            total_items = sum(item.quantity for item in cart.items.all())
-    else:
-        session_cart = request.session.get('cart', {})
-        if isinstance(session_cart, dict):
-            total_items = sum(item.get('quantity', 0) for item in session_cart.values())
 
-    return {'total_items_in_cart': total_items}
+def navigation(request):
+    # Served from process memory; the rendered menu is cached as well.
+    return {
+        'category_version': category_version(),
+        'nav_categories': cached_categories(),
+    }
 
+
+def currency(request):
+    # Product tiles are cached per currency and rates version.
+    return {
+        'currency': request_currency(request),
+        'currencies': list(exchange_rates()),
+        'rates_version': rates_version(),
+    }
@@ -0,0 +1,216 @@
+import json
+import re
+import time
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.db.models.functions import Now, Round
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .caching import invalidate_products, invalidated_timeout
+from .models import ExchangeRate, Product
+
+RATES_VERSION_KEY = 'exchange_rates_version'
+SESSION_KEY = 'currency'
+SYMBOLS = {'USD': '$', 'EUR': '€', 'GBP': '£', 'KES': 'KSh '}
+CURRENCY_RE = re.compile(r'^[A-Z]{3}$')
+CENT = Decimal('0.01')
+
+# (version, rates) as last loaded by this process.
+_rates = (None, {})
+
+
+def _stored_rates_version():
+    # Any change to the table moves the newest `updated_at` or the count.
+    stored = ExchangeRate.objects.aggregate(total=Count('id'), latest=Max('updated_at'))
+    latest = stored['latest'].timestamp() if stored['latest'] else 0
+    return f"{stored['total']}:{latest}"
+
+
+def rates_version():
+    """
+    Returns a value that changes whenever an exchange rate does. Product
+    tiles, which show converted prices, vary on it. When not cached it is
+    derived from the rate table, so rates loaded by another process, such as
+    `load_exchange_rates`, are picked up: at once from a shared cache, which
+    that process updates, or once the value expires from a per-process one.
+    """
+    return cache.get_or_set(RATES_VERSION_KEY, _stored_rates_version, invalidated_timeout(None))
+
+
+def bump_rates_version():
+    # Made unique, not just reread: before the commit another process may
+    # have cached the new stored version along with the old rates.
+    cache.set(RATES_VERSION_KEY, f'{_stored_rates_version()}:{time.time_ns()}',
+              invalidated_timeout(None))
+
+
+def exchange_rates():
+    """
+    Returns `{currency: rate}` for every currency prices can be shown in:
+    the shop's own `CURRENCY` first, at a rate of 1, then those of
+    `CURRENCIES` that have a rate. A rate is the number of units of the
+    currency one unit of `CURRENCY` buys. Kept in process memory and
+    reloaded only when `rates_version()` has moved on.
+    """
+    global _rates
+    version = rates_version()
+    loaded_version, rates = _rates
+    if loaded_version != version:
+        rates = {settings.CURRENCY: Decimal(1)}
+        rates.update(ExchangeRate.objects.filter(currency__in=settings.CURRENCIES).exclude(
+            currency=settings.CURRENCY).order_by('currency').values_list('currency', 'rate'))
+        _rates = (version, rates)
+    return rates
+
+
+def request_currency(request):
+    """
+    Returns the currency the request's prices are shown in: the one chosen
+    with `set_currency`, as long as it still has a rate, else `CURRENCY`.
+    """
+    currency = request.session.get(SESSION_KEY)
+    return currency if currency in exchange_rates() else settings.CURRENCY
+
+
+def choose_currency(request, currency):
+    """
+    Shows the request's prices in `currency` from now on, when it has a
+    rate. Returns whether it does.
+    """
+    if currency not in exchange_rates():
+        return False
+    request.session[SESSION_KEY] = currency
+    return True
+
+
+def symbol(currency):
+    return SYMBOLS.get(currency, f'{currency} ')
+
+
+def convert(prices, currency):
+    """
+    Returns `prices`, amounts in `CURRENCY`, converted into `currency` and
+    formatted for display, rounded half up to the cent. A page's prices are
+    converted together, with the rate looked up once; the rendered tiles are
+    cached per currency, so this mostly runs for the prices outside them.
+    """
+    prefix = symbol(currency)
+    rate = exchange_rates()[currency]
+    if rate == 1:
+        return [f'{prefix}{price:.2f}' for price in prices]
+    return [f'{prefix}{at_rate(price, rate)}' for price in prices]
+
+
+def at_rate(price, rate):
+    """
+    Returns `price`, an amount in `CURRENCY`, at `rate`, rounded half up to
+    the cent.
+    """
+    return (price * rate).quantize(CENT, ROUND_HALF_UP)
+
+
+def price_products(products, currency):
+    """
+    Sets `display_price` on each product to its price in `currency` and
+    returns the products as a list.
+    """
+    products = list(products)
+    for product, price in zip(products, convert([product.price for product in products], currency)):
+        product.display_price = price
+    return products
+
+
+def parse_amount(text):
+    """
+    Returns the amount in a price as scraped, such as "KSh 1,250", or None
+    when there is none.
+    """
+    try:
+        return Decimal(re.sub(r'[^\d.]', '', text or '')).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return None
+
+
+def read_rates(path):
+    """
+    Reads an exchange rate file, `{"base": "USD", "rates": {"KES": 129.7,
+    ...}}`, and returns its rates as `{currency: Decimal}`. Raises
+    ValueError when the file is not in that form or its base is not
+    `CURRENCY`.
+    """
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file, parse_float=Decimal)
+    if not isinstance(data, dict) or not isinstance(data.get('rates'), dict):
+        raise ValueError('Expected an object with "base" and "rates".')
+    if data.get('base') != settings.CURRENCY:
+        raise ValueError(f'The rates are against {data.get("base")}, '
+                         f'but prices are in {settings.CURRENCY}.')
+
+    rates = {}
+    for currency, rate in data['rates'].items():
+        try:
+            rate = Decimal(str(rate))
+        except InvalidOperation:
+            rate = None
+        if not CURRENCY_RE.match(currency) or rate is None or not rate > 0:
+            raise ValueError(f'Invalid rate for {currency!r}: {data["rates"][currency]!r}')
+        rates[currency] = rate
+    return rates
+
+
+def replace_rates(rates):
+    """
+    Makes `rates` the whole exchange rate table: updates and adds them and
+    deletes the currencies not among them. Returns the number of currencies
+    deleted.
+    """
+    rates = {currency: rate for currency, rate in rates.items() if currency != settings.CURRENCY}
+    with transaction.atomic():
+        ExchangeRate.objects.bulk_create(
+            [ExchangeRate(currency=currency, rate=rate) for currency, rate in rates.items()],
+            update_conflicts=True,
+            unique_fields=['currency'],
+            update_fields=['rate', 'updated_at'],
+        )
+        deleted, by_model = ExchangeRate.objects.exclude(currency__in=rates).delete()
+        _rates_changed()
+    return deleted
+
+
+def reprice_products():
+    """
+    Sets the price of every product with a `source_amount` in another
+    currency to that amount at the current rate. Products whose source
+    currency has no rate keep their price. Returns the ids of the products
+    whose price changed.
+    """
+    changed = []
+    for currency, rate in exchange_rates().items():
+        if currency == settings.CURRENCY:
+            continue
+        price = Round(F('source_amount') / rate, 2)
+        products = Product.objects.filter(
+            source_currency=currency, source_amount__isnull=False).exclude(price=price)
+        with transaction.atomic():
+            changed.extend(products.values_list('id', flat=True))
+            # A new `updated_at` re-renders the products' tiles.
+            products.update(price=price, updated_at=Now())
+    # Updates skip the signals that drop the cached quick views.
+    invalidate_products(changed)
+    return changed
+
+
+def _rates_changed():
+    # Bumped at once for this transaction's own reads, and again after the
+    # commit, or another process could cache the old rates in the meantime.
+    bump_rates_version()
+    transaction.on_commit(bump_rates_version)
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def invalidate_rates(sender, instance, **kwargs):
+    _rates_changed()
@@ -0,0 +1,119 @@
+import csv
+import zlib
+from datetime import datetime, time, timedelta
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from .models import Order, OrderItem, Product
+
+# Export name -> (queryset factory, exported columns).
+EXPORTS = {
+    'products': (Product.objects.all, (
+        'id', 'sku', 'name', 'slug', 'category__name', 'price', 'stock')),
+    'orders': (Order.objects.all, (
+        'id', 'created_at', 'user__username', 'total_price')),
+    'order-items': (OrderItem.objects.all, (
+        'id', 'order_id', 'order__created_at', 'product_id', 'sku', 'name', 'quantity', 'price')),
+}
+# The column `since`/`until` filter on, for exports that can be filtered by date.
+DATE_COLUMNS = {'orders': 'created_at', 'order-items': 'order__created_at'}
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+CHUNK_SIZE = 2000
+# Rows are encoded into pieces of about this many bytes before being sent,
+# rather than one write per row.
+PIECE_BYTES = 64 * 1024
+
+
+def _start_of(day):
+    # Midnight in the current time zone, where the `__date` lookup starts the day.
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_rows(name, since=None, until=None):
+    """
+    Returns the columns of export `name` and an iterator over its rows as
+    tuples, in primary key order. Rows are fetched `CHUNK_SIZE` at a time
+    (with a server-side cursor on PostgreSQL), so memory use does not depend
+    on the size of the table.
+    """
+    queryset, columns = EXPORTS[name]
+    rows = queryset().order_by('pk')
+    date_column = DATE_COLUMNS.get(name)
+    # Compared with datetimes rather than cast to dates, so the column's
+    # index can serve the range.
+    if date_column and since:
+        rows = rows.filter(**{f'{date_column}__gte': _start_of(since)})
+    if date_column and until:
+        rows = rows.filter(**{f'{date_column}__lt': _start_of(until + timedelta(days=1))})
+    return columns, rows.values_list(*columns).iterator(chunk_size=CHUNK_SIZE)
+
+
+class _Buffer:
+    """
+    Write target for `csv.writer` that keeps what was written until taken.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+
+    def take(self):
+        text = ''.join(self.parts)
+        self.parts, self.size = [], 0
+        return text.encode('utf-8')
+
+
+def encode(columns, rows, format):
+    """
+    Yields the export as UTF-8 pieces of about `PIECE_BYTES`, starting with
+    the CSV header (or nothing, for NDJSON) so the first byte goes out at once.
+    """
+    buffer = _Buffer()
+    if format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        write = writer.writerow
+    else:
+        encoder = DjangoJSONEncoder(separators=(',', ':'))
+
+        def write(row):
+            buffer.write(encoder.encode(dict(zip(columns, row))))
+            buffer.write('\n')
+
+    yield buffer.take()
+    for row in rows:
+        write(row)
+        if buffer.size >= PIECE_BYTES:
+            yield buffer.take()
+    if buffer.size:
+        yield buffer.take()
+
+
+def gzipped(pieces, level=6):
+    """
+    Compresses a stream of byte strings into a gzip stream, flushing after
+    every piece so compressed output keeps pace with the rows.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for piece in pieces:
+        yield compressor.compress(piece) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def stream_export(name, format='csv', gzip=False, since=None, until=None):
+    """
+    Returns `(pieces, content_type, filename)` for export `name`.
+    """
+    columns, rows = export_rows(name, since, until)
+    pieces = encode(columns, rows, format)
+    filename = f'{name}.{format}'
+    content_type = FORMATS[format]
+    if gzip:
+        pieces = gzipped(pieces)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    return pieces, content_type, filename
@@ -0,0 +1,234 @@
+import gzip
+import os
+import re
+from datetime import datetime, timezone
+from itertools import islice
+from stat import S_ISREG
+from xml.sax.saxutils import escape
+from django.conf import settings
+from django.http import Http404
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+from .cart import media_url
+from .currency import at_rate, exchange_rates
+from .exports import CHUNK_SIZE, PIECE_BYTES, encode
+from .media import REVALIDATE, send_file
+from .models import Category, Product
+
+# The sitemap protocol allows at most 50,000 URLs per file.
+SITEMAP_SIZE = 50000
+SITEMAP_INDEX = 'sitemap.xml'
+SITEMAP_CHUNK = 'sitemap-products-{}.xml'
+SITEMAP_PAGES = 'sitemap-pages.xml'
+FEED_XML = 'products.xml'
+FEED_CSV = 'products.csv'
+# Level 9 takes twice as long for files a few percent smaller.
+GZIP_LEVEL = 6
+# Google rejects longer descriptions.
+DESCRIPTION_LENGTH = 5000
+FEED_COLUMNS = ('id', 'title', 'description', 'link', 'image_link', 'price', 'availability',
+                'quantity', 'product_type')
+FEED_FIELDS = ('sku', 'slug', 'name', 'description', 'price', 'stock', 'image', 'category__name')
+
+SITEMAP_NAME_RE = re.compile(r'^sitemap(?:-pages|-products-\d+)?\.xml$')
+FEED_NAME_RE = re.compile(r'^products\.(?:xml|csv)$')
+CONTENT_TYPES = {'.xml': 'application/xml', '.csv': 'text/csv; charset=utf-8'}
+ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b(?!\s*;\s*q=0(?:\.0*)?\b)')
+
+URLSET_START = '<?xml version="1.0" encoding="UTF-8"?>\n' \
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_END = '</urlset>\n'
+
+
+def _pieces(texts):
+    """
+    Joins a stream of strings into UTF-8 pieces of about `PIECE_BYTES`.
+    """
+    parts, size = [], 0
+    for text in texts:
+        parts.append(text)
+        size += len(text)
+        if size >= PIECE_BYTES:
+            yield ''.join(parts).encode('utf-8')
+            parts, size = [], 0
+    if parts:
+        yield ''.join(parts).encode('utf-8')
+
+
+def write_atomically(path, pieces):
+    """
+    Writes a stream of byte strings to `path` and, gzipped, to `path.gz`.
+    Each file is renamed into place once complete, so readers see either the
+    old file or the whole new one. Returns the uncompressed size.
+    """
+    temporary, gz_temporary = f'{path}.tmp', f'{path}.gz.tmp'
+    size = 0
+    try:
+        with open(temporary, 'wb') as plain, open(gz_temporary, 'wb') as raw, \
+                gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=GZIP_LEVEL,
+                              mtime=0) as compressed:
+            for piece in pieces:
+                plain.write(piece)
+                compressed.write(piece)
+                size += len(piece)
+        os.replace(gz_temporary, f'{path}.gz')
+        os.replace(temporary, path)
+    finally:
+        for leftover in (temporary, gz_temporary):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return size
+
+
+def _url_maker(base_url, view_name):
+    # One reverse() for the whole catalog: slugs need no quoting.
+    prefix, suffix = reverse(view_name, args=['-slug-']).split('-slug-')
+    return lambda slug: f'{base_url}{prefix}{slug}{suffix}'
+
+
+def _urlset(urls):
+    yield URLSET_START
+    for url in urls:
+        yield f'<url><loc>{escape(url)}</loc></url>\n'
+    yield URLSET_END
+
+
+def _sitemap_index(base_url, names, generated_at):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for name in names:
+        yield f'<sitemap><loc>{escape(base_url)}/{name}</loc>' \
+              f'<lastmod>{generated_at}</lastmod></sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+def build_sitemaps(directory, base_url, size=SITEMAP_SIZE):
+    """
+    Writes a sitemap of the shop's pages, one sitemap per `size` products,
+    and the index listing them, then removes product sitemaps left over from
+    a larger catalog. The index goes last, so it never lists a file that
+    isn't there yet. Returns the number of product URLs.
+    """
+    product_url = _url_maker(base_url, 'product_detail')
+    category_url = _url_maker(base_url, 'category_products')
+    pages = [base_url + reverse('home'), base_url + reverse('category_list')] + [
+        category_url(slug) for slug in Category.objects.order_by('name').values_list('slug', flat=True)]
+    write_atomically(os.path.join(directory, SITEMAP_PAGES), _pieces(_urlset(pages)))
+
+    slugs = Product.objects.order_by('pk').values_list('slug', flat=True).iterator(
+        chunk_size=CHUNK_SIZE)
+    names, total = [SITEMAP_PAGES], 0
+    while True:
+        chunk = list(islice(slugs, size))
+        if not chunk:
+            break
+        name = SITEMAP_CHUNK.format(len(names))
+        write_atomically(os.path.join(directory, name),
+                         _pieces(_urlset(map(product_url, chunk))))
+        names.append(name)
+        total += len(chunk)
+
+    generated_at = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+    write_atomically(os.path.join(directory, SITEMAP_INDEX),
+                     _pieces(_sitemap_index(base_url, names, generated_at)))
+
+    stale = len(names)
+    while os.path.exists(os.path.join(directory, SITEMAP_CHUNK.format(stale))):
+        for suffix in ('', '.gz'):
+            os.remove(os.path.join(directory, SITEMAP_CHUNK.format(stale) + suffix))
+        stale += 1
+    return total
+
+
+def feed_rate():
+    """
+    Returns the exchange rate from `CURRENCY` to `FEED_CURRENCY`, which feed
+    prices are converted at. Raises ValueError when none is loaded, rather
+    than label prices with a currency they are not in.
+    """
+    rate = exchange_rates().get(settings.FEED_CURRENCY)
+    if rate is None:
+        raise ValueError(f'No exchange rate for FEED_CURRENCY {settings.FEED_CURRENCY}; '
+                         'load one with load_exchange_rates.')
+    return rate
+
+
+def _feed_rows(base_url, rate):
+    """
+    Yields one tuple of `FEED_COLUMNS` per product, in primary key order,
+    with prices at `rate`.
+    """
+    product_url = _url_maker(base_url, 'product_detail')
+    rows = Product.objects.order_by('pk').values_list(*FEED_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+    for sku, slug, name, description, price, stock, image, category in rows:
+        image_url = media_url(image)
+        yield (sku, name, description[:DESCRIPTION_LENGTH], product_url(slug),
+               base_url + image_url if image_url.startswith('/') else image_url,
+               f'{at_rate(price, rate)} {settings.FEED_CURRENCY}',
+               'in_stock' if stock else 'out_of_stock', stock, category)
+
+
+def _feed_xml(rows, base_url):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0"><channel>\n'
+    yield f'<title>Aliabba Retail</title><link>{escape(base_url)}/</link>' \
+          '<description>Aliabba Retail products</description>\n'
+    for row in rows:
+        yield '<item>'
+        for column, value in zip(FEED_COLUMNS, row):
+            yield f'<g:{column}>{escape(str(value))}</g:{column}>'
+        yield '</item>\n'
+    yield '</channel></rss>\n'
+
+
+def build_product_feeds(directory, base_url):
+    """
+    Writes the Google Merchant style product feed as XML and CSV, reading
+    the catalog once per format. Returns the number of products. Raises
+    ValueError, before writing anything, when `FEED_CURRENCY` has no rate.
+    """
+    rate = feed_rate()
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    write_atomically(os.path.join(directory, FEED_XML),
+                     _pieces(_feed_xml(counted(_feed_rows(base_url, rate)), base_url)))
+    write_atomically(os.path.join(directory, FEED_CSV),
+                     encode(FEED_COLUMNS, _feed_rows(base_url, rate), 'csv'))
+    return count
+
+
+@require_safe
+def serve(request, name):
+    """
+    Serves a file written by `build_feeds`, gzipped when the client accepts
+    it. They are regenerated in place, so clients revalidate them.
+    """
+    if not (SITEMAP_NAME_RE.match(name) or FEED_NAME_RE.match(name)):
+        raise Http404(name)
+
+    full_path = os.path.join(settings.FEEDS_ROOT, name)
+    headers = {}
+    if ACCEPTS_GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', '')) \
+            and os.path.exists(full_path + '.gz'):
+        full_path += '.gz'
+        headers['Content-Encoding'] = 'gzip'
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404(name)
+    if not S_ISREG(stat.st_mode):
+        raise Http404(name)
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    content_type = CONTENT_TYPES[os.path.splitext(name)[1]]
+    response = send_file(request, full_path, stat, etag, content_type, REVALIDATE,
+                         headers=headers, filename=name)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,139 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, PositiveIntegerField, Sum, When
+from django.utils import timezone
+from .caching import invalidate_products, product_cache_key
+from .models import Product, StockReservation
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when a cart asks for more units than are available. `shortages`
+    maps each short product id to the number of units that can still be had.
+    """
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(f'Insufficient stock for products {sorted(shortages)}')
+
+
+def _active_holds(product_ids, exclude_user=None):
+    holds = StockReservation.objects.filter(
+        product_id__in=product_ids, expires_at__gt=timezone.now())
+    if exclude_user is not None:
+        holds = holds.exclude(user=exclude_user)
+    return dict(holds.values('product_id').order_by().annotate(
+        total=Sum('quantity')).values_list('product_id', 'total'))
+
+
+def available_stock(product_ids):
+    """
+    Returns `{product_id: units}` of stock not held by a reservation. Counters
+    are served from the cache, so reads of a hot product never touch its row;
+    misses are computed for all products at once with two queries.
+    """
+    keys = {product_cache_key('availability', product_id): product_id
+            for product_id in product_ids}
+    available = {keys[key]: units for key, units in cache.get_many(keys).items()}
+
+    missing = [product_id for product_id in product_ids if product_id not in available]
+    if missing:
+        stock = dict(Product.objects.filter(
+            pk__in=missing).values_list('id', 'stock'))
+        holds = _active_holds(missing)
+        computed = {product_id: max(0, units - holds.get(product_id, 0))
+                    for product_id, units in stock.items()}
+        cache.set_many(
+            {product_cache_key('availability', product_id): units
+             for product_id, units in computed.items()},
+            settings.STOCK_AVAILABILITY_CACHE_SECONDS)
+        available.update(computed)
+    return available
+
+
+def check_available(product_id, quantity):
+    """
+    Raises `InsufficientStock` unless `quantity` units of the product are
+    available, according to the cached counter.
+    """
+    units = available_stock([product_id]).get(product_id, 0)
+    if quantity > units:
+        raise InsufficientStock({product_id: units})
+
+
+def _lock_and_check(user, quantities):
+    # Lock the product rows so concurrent reservations for the same products
+    # are checked one after the other; other users' live holds count as sold.
+    stock = dict(Product.objects.select_for_update().filter(
+        pk__in=quantities).values_list('id', 'stock'))
+    holds = _active_holds(list(quantities), exclude_user=user)
+
+    shortages = {}
+    for product_id, quantity in quantities.items():
+        units = max(0, stock.get(product_id, 0) - holds.get(product_id, 0))
+        if quantity > units:
+            shortages[product_id] = units
+    if shortages:
+        raise InsufficientStock(shortages)
+
+
+def reserve(user, quantities, ttl=None):
+    """
+    Holds `quantities` (`{product_id: units}`) for `user` until the returned
+    expiry time, replacing any holds the user already had. Raises
+    `InsufficientStock` when other shoppers' holds leave too little stock.
+    """
+    expires_at = timezone.now() + (ttl or timedelta(minutes=settings.STOCK_RESERVATION_MINUTES))
+
+    with transaction.atomic():
+        _lock_and_check(user, quantities)
+        StockReservation.objects.filter(user=user).delete()
+        StockReservation.objects.bulk_create([
+            StockReservation(product_id=product_id, user=user,
+                             quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in quantities.items()
+        ])
+        transaction.on_commit(lambda: invalidate_products(list(quantities)))
+    return expires_at
+
+
+def fulfil(user, quantities):
+    """
+    Takes `quantities` (`{product_id: units}`) out of stock for `user` with a
+    single UPDATE and drops the user's holds, which the sale replaces. Must be
+    called inside the transaction that records the sale.
+    """
+    _lock_and_check(user, quantities)
+    try:
+        # The stock column is unsigned, so a concurrent sale that got there
+        # first makes the update fail rather than oversell.
+        Product.objects.filter(pk__in=quantities).update(stock=Case(
+            *(When(pk=product_id, then=F('stock') - quantity)
+              for product_id, quantity in quantities.items()),
+            default=F('stock'),
+            output_field=PositiveIntegerField(),
+        ))
+    except IntegrityError:
+        raise InsufficientStock(
+            {product_id: 0 for product_id in quantities}) from None
+    StockReservation.objects.filter(user=user).delete()
+    transaction.on_commit(lambda: invalidate_products(list(quantities)))
+
+
+def release_expired(batch_size=1000):
+    """
+    Deletes holds that have expired and refreshes the availability counters
+    of their products. Returns the number of holds released.
+    """
+    released = 0
+    while True:
+        with transaction.atomic():
+            expired = list(StockReservation.objects.filter(
+                expires_at__lte=timezone.now()).values_list('id', 'product_id')[:batch_size])
+            if not expired:
+                return released
+            StockReservation.objects.filter(pk__in=[pk for pk, _ in expired]).delete()
+        invalidate_products({product_id for _, product_id in expired})
+        released += len(expired)
@@ -0,0 +1,203 @@
+import calendar
+import gzip
+import os
+from importlib import import_module
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+from .analytics import ROLLUP_NAME
+from .models import Cart, CartItem, Order, OrderItem, RollupState
+
+DB_SESSION_ENGINES = ('django.contrib.sessions.backends.db',
+                      'django.contrib.sessions.backends.cached_db')
+ARCHIVE_NAME = 'orders-{:%Y%m%dT%H%M%S}.ndjson.gz'
+ARCHIVE_ITEM_FIELDS = ('product_id', 'sku', 'name', 'quantity', 'price', 'thumbnail')
+# The tables purging and archiving delete from, which `compact` vacuums.
+HOT_MODELS = (Cart, CartItem, Order, OrderItem, Session)
+
+
+def purge_carts(older_than, batch_size=1000):
+    """
+    Deletes the carts, of users and of sessions alike, that have not been
+    used for `older_than`, with their items, `batch_size` carts per
+    transaction. Returns the number of carts deleted.
+    """
+    cutoff = timezone.now() - older_than
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(Cart.objects.filter(updated_at__lt=cutoff).values_list(
+                'id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            CartItem.objects.filter(cart_id__in=ids).delete()
+            Cart.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+
+def purge_sessions(batch_size=1000):
+    """
+    Deletes expired sessions, and with them the carts of guests who never
+    came back, `batch_size` per transaction. Returns the number deleted, or
+    None when sessions are not kept in the database and the session engine
+    cleared them itself.
+    """
+    if settings.SESSION_ENGINE not in DB_SESSION_ENGINES:
+        import_module(settings.SESSION_ENGINE).SessionStore.clear_expired()
+        return None
+
+    now = timezone.now()
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            keys = list(Session.objects.filter(expire_date__lt=now).values_list(
+                'session_key', flat=True)[:batch_size])
+            if not keys:
+                return deleted
+            Session.objects.filter(session_key__in=keys).delete()
+        deleted += len(keys)
+
+
+def months_before(moment, months):
+    """
+    Returns `moment` moved back `months` calendar months, on the last day of
+    the month when that month is shorter.
+    """
+    year, month = divmod(moment.year * 12 + moment.month - 1 - months, 12)
+    day = min(moment.day, calendar.monthrange(year, month + 1)[1])
+    return moment.replace(year=year, month=month + 1, day=day)
+
+
+def archive_cutoff(before):
+    """
+    Returns the creation time orders must be older than to be archived: at
+    most `before`, and no later than the sales rollups have reached, so no
+    order leaves before it is counted in them. None when the rollups have
+    never run.
+    """
+    state = RollupState.objects.filter(name=ROLLUP_NAME).first()
+    if state is None or state.high_water_mark is None:
+        return None
+    # The rollups include orders created at the high-water mark itself.
+    return min(before, state.high_water_mark)
+
+
+def _archived_orders(orders, batch_size, ranges):
+    """
+    Yields each order of `orders` with its items as a dict, reading
+    `batch_size` orders at a time in primary key order, and records the
+    primary key range of each batch in `ranges`.
+    """
+    last = 0
+    while True:
+        batch = list(orders.filter(pk__gt=last).order_by('pk').values(
+            'id', 'user_id', 'user__username', 'total_price', 'created_at')[:batch_size])
+        if not batch:
+            return
+        items = {}
+        for row in OrderItem.objects.filter(order_id__in=[order['id'] for order in batch]) \
+                .order_by('pk').values('order_id', *ARCHIVE_ITEM_FIELDS):
+            items.setdefault(row.pop('order_id'), []).append(row)
+        for order in batch:
+            order['items'] = items.get(order['id'], [])
+            yield order
+        ranges.append((last, batch[-1]['id']))
+        last = batch[-1]['id']
+
+
+def archive_orders(before, directory, batch_size=1000, dry_run=False):
+    """
+    Moves the orders created before `before` (but no later than the sales
+    rollups have reached) out of the database into a gzipped NDJSON file in
+    `directory`, one order with its items per line. The file is written and
+    synced in full before anything is deleted, so a failure at any point
+    loses nothing; running again after a failure only archives the same
+    orders twice. Orders are then deleted `batch_size` per transaction.
+
+    Returns `{'orders', 'items', 'path', 'cutoff'}`; `path` is None when
+    there was nothing to archive, or with `dry_run`, which only counts.
+    """
+    cutoff = archive_cutoff(before)
+    result = {'orders': 0, 'items': 0, 'path': None, 'cutoff': cutoff}
+    if cutoff is None:
+        return result
+    orders = Order.objects.filter(created_at__lt=cutoff)
+    if dry_run:
+        result['orders'] = orders.count()
+        result['items'] = OrderItem.objects.filter(order__created_at__lt=cutoff).count()
+        return result
+    if not orders.exists():
+        return result
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, ARCHIVE_NAME.format(timezone.now()))
+    temporary = f'{path}.tmp'
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    ranges = []
+    try:
+        with open(temporary, 'wb') as raw:
+            with gzip.GzipFile(filename='', mode='wb', fileobj=raw) as compressed:
+                for order in _archived_orders(orders, batch_size, ranges):
+                    compressed.write(encoder.encode(order).encode('utf-8'))
+                    compressed.write(b'\n')
+                    result['orders'] += 1
+                    result['items'] += len(order['items'])
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+    for first, last in ranges:
+        with transaction.atomic():
+            batch = orders.filter(pk__gt=first, pk__lte=last)
+            OrderItem.objects.filter(order__in=batch.values('pk')).delete()
+            batch.delete()
+    result['path'] = path
+    return result
+
+
+def database_size():
+    """
+    Returns `(size, free)`: the size of the database in bytes and, on SQLite,
+    how much of it is unused pages that `compact` gives back (None on
+    PostgreSQL, which keeps no such count). None on other databases.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('PRAGMA page_size')
+            page_size = cursor.fetchone()[0]
+            cursor.execute('PRAGMA page_count')
+            page_count = cursor.fetchone()[0]
+            cursor.execute('PRAGMA freelist_count')
+            free_pages = cursor.fetchone()[0]
+            return page_count * page_size, free_pages * page_size
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_database_size(current_database())')
+            return cursor.fetchone()[0], None
+    return None
+
+
+def compact(full=False):
+    """
+    Reclaims the space left by deleted rows and refreshes the planner's
+    statistics. SQLite rebuilds the whole file, locking the database while it
+    does. PostgreSQL vacuums the tables purging and archiving delete from,
+    which makes their free space reusable; with `full` it rewrites them to
+    give the space back to the operating system, locking each one meanwhile.
+    Must not run inside a transaction. Returns False on other databases.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('VACUUM')
+            cursor.execute('ANALYZE')
+            return True
+        if connection.vendor == 'postgresql':
+            tables = ', '.join(connection.ops.quote_name(model._meta.db_table)
+                               for model in HOT_MODELS)
+            cursor.execute(f"VACUUM ({'FULL, ' if full else ''}ANALYZE) {tables}")
+            return True
+    return False
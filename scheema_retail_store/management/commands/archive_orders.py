@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from scheema_retail_store.lifecycle import archive_orders, months_before
+
+
+class Command(BaseCommand):
+    help = "Move orders older than a number of months out of the database into a gzipped NDJSON file in ARCHIVE_ROOT."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=24,
+                            help="Archive orders placed more than this many months ago.")
+        parser.add_argument('--output-dir', default=settings.ARCHIVE_ROOT)
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Orders read and deleted at a time.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only count the orders that would be archived.")
+
+    def handle(self, *args, **options):
+        result = archive_orders(months_before(timezone.now(), options['months']),
+                                options['output_dir'], options['batch_size'], options['dry_run'])
+        if result['cutoff'] is None:
+            self.stderr.write("Nothing archived: run rollup_sales first, so the sales "
+                              "reports keep counting the archived orders.")
+        elif options['dry_run']:
+            self.stdout.write(f"Would archive {result['orders']} orders with {result['items']} "
+                              f"items placed before {result['cutoff']:%Y-%m-%d %H:%M}")
+        elif result['path'] is None:
+            self.stdout.write(f"No orders placed before {result['cutoff']:%Y-%m-%d %H:%M}")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Archived {result['orders']} orders with {result['items']} items "
+                f"to {result['path']}"))
@@ -0,0 +1,68 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from . import loadtest
+
+# gunicorn picks up gunicorn.conf.py from the project root by itself, so plain
+# settings need an empty config file and "conf" needs no arguments at all.
+DEFAULT_CONFIGS = [
+    'sync=-c /dev/null --workers 2',
+    'gthread=-c /dev/null --workers 2 --worker-class gthread --threads 4',
+    'conf=',
+    'conf-sync=--worker-class sync --threads 1',
+]
+
+
+class Command(BaseCommand):
+    help = "Run the load test against several gunicorn configurations on one seeded catalog and compare them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('configs', nargs='*', default=DEFAULT_CONFIGS,
+                            help="label=gunicorn arguments, e.g. \"big=--workers 8\".")
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--duration', type=float, default=30)
+        parser.add_argument('--workdir',
+                            help="Directory for the shared database (a temporary one by default).")
+        parser.add_argument('--json', dest='json_path',
+                            help="Also write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        configs = []
+        for config in options['configs']:
+            label, separator, gunicorn_args = config.partition('=')
+            if not separator:
+                raise CommandError(f"Expected label=arguments, got {config!r}")
+            configs.append((label, gunicorn_args))
+
+        workdir = options['workdir'] or tempfile.mkdtemp(prefix='bench-gunicorn-')
+        results = {}
+        for index, (label, gunicorn_args) in enumerate(configs):
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{label}: {gunicorn_args or '(defaults)'}"))
+            command = loadtest.Command(stdout=self.stdout._out, stderr=self.stderr._out)
+            run_options = vars(command.create_parser('manage.py', 'loadtest').parse_args([
+                '--products', str(options['products']),
+                '--users', str(options['users']),
+                '--duration', str(options['duration']),
+                '--workdir', workdir,
+                '--gunicorn-args', gunicorn_args,
+                # Seed once, then give every configuration the same catalog.
+                *(['--reuse-db'] if index else []),
+            ]))
+            results[label] = command.run(run_options)['TOTAL']
+
+        header = f"{'config':<20}{'requests':>10}{'err %':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for label, row in results.items():
+            self.stdout.write(
+                f"{label:<20}{row['requests']:>10}{row['error_rate'] * 100:>8.1f}{row['rps']:>9.1f}"
+                f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
+        if not options['workdir']:
+            shutil.rmtree(Path(workdir), ignore_errors=True)
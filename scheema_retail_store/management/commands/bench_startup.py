@@ -0,0 +1,95 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter per sample: boot Django the way a gunicorn worker
+# ("wsgi") or a cron job ("setup") does, and report the in-process boot time.
+CHILD = """
+import json, os, sys, time
+start = time.perf_counter()
+os.environ['DJANGO_SETTINGS_MODULE'] = sys.argv[1]
+if sys.argv[2] == 'wsgi':
+    from django.core.wsgi import get_wsgi_application
+    get_wsgi_application()
+else:
+    import django
+    django.setup()
+print(json.dumps({'boot_ms': (time.perf_counter() - start) * 1000}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Returns `{top-level package: self time in ms}` from `-X importtime` output.
+    Self times are used because modules loaded with `importlib.import_module`
+    (as `INSTALLED_APPS` are) are not logged themselves, only their imports.
+    """
+    packages = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        packages[name.strip().split('.')[0]] += int(self_us) / 1000
+    return packages
+
+
+class Command(BaseCommand):
+    help = "Measure how long a gunicorn worker or a management command takes to boot, per settings module."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--settings-modules', nargs='+',
+                            default=['scheema_retail.settings', 'scheema_retail.settings_runtime'])
+        parser.add_argument('--target', choices=['wsgi', 'setup'], default='wsgi',
+                            help="Boot a WSGI application, or only django.setup() as a command does.")
+        parser.add_argument('--repeats', type=int, default=5)
+        parser.add_argument('--top', type=int, default=10,
+                            help="Number of slowest packages to list.")
+        parser.add_argument('--json', dest='json_path',
+                            help="Also write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        results = {module: self.measure(module, options)
+                   for module in options['settings_modules']}
+
+        for module, result in results.items():
+            self.stdout.write(self.style.SUCCESS(
+                f"{module} [{options['target']}]: process {result['process_ms']:.1f} ms, "
+                f"boot {result['boot_ms']:.1f} ms, imports {result['imports_ms']:.1f} ms"))
+            for package, ms in result['packages'][:options['top']]:
+                self.stdout.write(f"  {package:<32}{ms:>9.1f} ms")
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
+
+    def measure(self, module, options):
+        process, boot, imports = [], [], []
+        packages = defaultdict(list)
+        for _ in range(options['repeats']):
+            start = time.perf_counter()
+            child = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', CHILD, module, options['target']],
+                cwd=settings.BASE_DIR, capture_output=True, text=True)
+            process.append((time.perf_counter() - start) * 1000)
+            if child.returncode:
+                raise CommandError(f"{module} failed to boot:\n{child.stderr[-2000:]}")
+
+            boot.append(json.loads(child.stdout.strip().splitlines()[-1])['boot_ms'])
+            sample = parse_importtime(child.stderr)
+            imports.append(sum(sample.values()))
+            for package, ms in sample.items():
+                packages[package].append(ms)
+
+        return {
+            'process_ms': statistics.median(process),
+            'boot_ms': statistics.median(boot),
+            'imports_ms': statistics.median(imports),
+            'packages': sorted(((package, statistics.median(values))
+                                for package, values in packages.items()),
+                               key=lambda item: item[1], reverse=True),
+        }
@@ -0,0 +1,33 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from scheema_retail_store.feeds import SITEMAP_SIZE, build_product_feeds, build_sitemaps, feed_rate
+
+
+class Command(BaseCommand):
+    help = "Write the sitemaps and the product feed (XML and CSV), each with a gzipped copy, to FEEDS_ROOT."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default=settings.SITE_URL,
+                            help="Absolute URL of the shop, used in every link.")
+        parser.add_argument('--output-dir', default=settings.FEEDS_ROOT)
+        parser.add_argument('--sitemap-size', type=int, default=SITEMAP_SIZE,
+                            help="Product URLs per sitemap file.")
+
+    def handle(self, *args, **options):
+        directory = options['output_dir']
+        base_url = options['base_url'].rstrip('/')
+        try:
+            # Checked first, so a failed build leaves every file as it was.
+            feed_rate()
+        except ValueError as e:
+            raise CommandError(e)
+        os.makedirs(directory, exist_ok=True)
+
+        start = time.perf_counter()
+        urls = build_sitemaps(directory, base_url, options['sitemap_size'])
+        products = build_product_feeds(directory, base_url)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote sitemaps for {urls} products and feeds of {products} products "
+            f"to {directory} in {time.perf_counter() - start:.1f}s"))
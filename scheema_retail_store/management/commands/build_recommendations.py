@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from scheema_retail_store.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = "Rebuild the \"customers also bought\" recommendations from orders, wishlists and reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=10,
+                            help="Recommendations kept per product.")
+        parser.add_argument('--max-basket-size', type=int, default=50,
+                            help="Ignore orders and users with more distinct products than this.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = build_recommendations(
+            options['top_k'], options['max_basket_size'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {written} recommendations in {time.perf_counter() - start:.1f}s"))
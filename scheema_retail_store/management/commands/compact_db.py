@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+from scheema_retail_store.lifecycle import compact, database_size
+
+
+class Command(BaseCommand):
+    help = "Reclaim the space freed by purge_carts and archive_orders and refresh the query planner's statistics."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help="PostgreSQL: rewrite the tables to return space to the "
+                                 "operating system. Locks each table while it runs.")
+
+    def handle(self, *args, **options):
+        before = database_size()
+        if not compact(options['full']):
+            raise CommandError("Compacting is only supported on SQLite and PostgreSQL.")
+        after = database_size()
+
+        size, free = before
+        if free is not None:
+            self.stdout.write(f"{filesizeformat(free)} of {filesizeformat(size)} was unused before compacting")
+        self.stdout.write(self.style.SUCCESS(
+            f"Database is {filesizeformat(after[0])}, "
+            f"{filesizeformat(max(size - after[0], 0))} reclaimed"))
@@ -0,0 +1,34 @@
+import sys
+from datetime import date
+from django.core.management.base import BaseCommand
+from scheema_retail_store.exports import EXPORTS, FORMATS, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream a full export of products, orders or order items to a file or stdout, as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help="Compress the output with gzip.")
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help="Only orders placed on or after this date (YYYY-MM-DD).")
+        parser.add_argument('--until', type=date.fromisoformat,
+                            help="Only orders placed on or before this date (YYYY-MM-DD).")
+        parser.add_argument('--output', '-o', default='-',
+                            help="File to write (stdout by default).")
+
+    def handle(self, *args, **options):
+        pieces, content_type, filename = stream_export(
+            options['name'], options['format'], options['gzip'], options['since'], options['until'])
+        if options['output'] == '-':
+            self.write(pieces, sys.stdout.buffer)
+        else:
+            with open(options['output'], 'wb') as file:
+                self.write(pieces, file)
+            self.stderr.write(self.style.SUCCESS(f"Exported {options['name']} to {options['output']}"))
+
+    def write(self, pieces, file):
+        for piece in pieces:
+            file.write(piece)
+        file.flush()
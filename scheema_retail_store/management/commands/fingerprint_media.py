@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from scheema_retail_store.media import build_manifest
+
+
+class Command(BaseCommand):
+    help = "Hash media files and write the manifest their far-future cacheable URLs are served from. Run it after adding product images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('directories', nargs='*',
+                            help="MEDIA_ROOT subdirectories to fingerprint (MEDIA_FINGERPRINT_DIRS by default).")
+
+    def handle(self, *args, **options):
+        files, rehashed = build_manifest(options['directories'] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f"Fingerprinted {files} media files ({rehashed} hashed) into {settings.MEDIA_MANIFEST_PATH}"))
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from scheema_retail_store.currency import read_rates, replace_rates, reprice_products
+
+
+class Command(BaseCommand):
+    help = "Replace the exchange rate table with the rates in a JSON file, and optionally reprice products from their source amounts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=settings.EXCHANGE_RATES_FILE,
+                            help='A file like {"base": "USD", "rates": {"KES": 129.7}}. '
+                                 'The base must be the CURRENCY setting.')
+        parser.add_argument('--reprice', action='store_true',
+                            help="Convert the source amount of products priced in another "
+                                 "currency into a new price at the loaded rates.")
+
+    def handle(self, *args, **options):
+        try:
+            rates = read_rates(options['path'])
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Could not read {options['path']}: {error}")
+
+        deleted = replace_rates(rates)
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {len(rates)} exchange rates against {settings.CURRENCY}"
+            + (f" and removed {deleted}" if deleted else "")))
+        if options['reprice']:
+            self.stdout.write(f"Repriced {len(reprice_products())} products")
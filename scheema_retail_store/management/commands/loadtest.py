@@ -0,0 +1,327 @@
+import json
+import os
+import random
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from .seed_catalog import LOADTEST_PASSWORD
+
+# Scenario name -> relative weight in the traffic mix.
+SCENARIOS = {
+    'browse_home': 25,
+    'browse_category': 15,
+    'search': 15,
+    'product_detail': 25,
+    'add_to_cart': 12,
+    'login_merge': 4,
+    'checkout': 4,
+}
+
+
+class LoadStats:
+    """
+    LoadStats collects the outcome of every request made during a load test, grouped by endpoint.
+
+    Methods:
+        record(endpoint, duration, ok): Adds one request's latency in seconds and whether it succeeded.
+        report(elapsed): Returns per-endpoint and overall throughput, error rate and latency percentiles.
+    """
+
+    def __init__(self):
+        self._latencies = defaultdict(list)
+        self._errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, duration, ok):
+        with self._lock:
+            self._latencies[endpoint].append(duration)
+            if not ok:
+                self._errors[endpoint] += 1
+
+    def report(self, elapsed):
+        with self._lock:
+            latencies = {endpoint: sorted(values)
+                         for endpoint, values in self._latencies.items()}
+            errors = dict(self._errors)
+
+        latencies['TOTAL'] = sorted(
+            value for values in latencies.values() for value in values)
+        errors['TOTAL'] = sum(errors.values())
+
+        return {
+            endpoint: {
+                'requests': len(values),
+                'errors': errors.get(endpoint, 0),
+                'error_rate': errors.get(endpoint, 0) / len(values),
+                'rps': len(values) / elapsed,
+                'p50_ms': percentile(values, 50) * 1000,
+                'p95_ms': percentile(values, 95) * 1000,
+                'p99_ms': percentile(values, 99) * 1000,
+            }
+            for endpoint, values in latencies.items() if values
+        }
+
+
+def percentile(sorted_values, percent):
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[int(index)]
+
+
+class VirtualUser:
+    """
+    VirtualUser drives one shopper's traffic: it picks weighted scenarios until the deadline and
+    records every request in the shared `LoadStats`.
+    """
+
+    def __init__(self, base_url, catalog, stats, rng, username, think_time):
+        self.base_url = base_url
+        self.catalog = catalog
+        self.stats = stats
+        self.rng = rng
+        self.username = username
+        self.think_time = think_time
+        self.session = requests.Session()
+
+    def request(self, endpoint, method, path, session=None, **kwargs):
+        session = session or self.session
+        start = time.perf_counter()
+        try:
+            response = session.request(
+                method, self.base_url + path, allow_redirects=False, timeout=30, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.stats.record(endpoint, time.perf_counter() - start, ok)
+        return response
+
+    def run(self, deadline):
+        names = list(SCENARIOS)
+        weights = list(SCENARIOS.values())
+        while time.monotonic() < deadline:
+            scenario = self.rng.choices(names, weights)[0]
+            getattr(self, scenario)()
+            if self.think_time:
+                time.sleep(self.rng.uniform(0, 2 * self.think_time))
+
+    def product(self):
+        return self.rng.choice(self.catalog['products'])
+
+    def browse_home(self):
+        self.request('home', 'GET', '/')
+
+    def browse_category(self):
+        self.request('category', 'GET',
+                     f"/category/{self.rng.choice(self.catalog['categories'])}/")
+
+    def search(self):
+        self.request('search', 'GET', '/search/',
+                     params={'q': self.rng.choice(self.catalog['terms'])})
+
+    def product_detail(self):
+        self.request('product_detail', 'GET', f"/product/{self.product()['slug']}/")
+
+    def add_to_cart(self, session=None):
+        self.request('add_to_cart', 'GET',
+                     f"/cart/add/{self.product()['id']}/", session=session)
+
+    def login(self, session):
+        self.request('login_form', 'GET', '/login/', session=session)
+        self.request('login', 'POST', '/login/', session=session, data={
+            'username': self.username,
+            'password': LOADTEST_PASSWORD,
+            'csrfmiddlewaretoken': session.cookies.get('csrftoken', ''),
+        })
+
+    def login_merge(self):
+        # A guest fills a session cart, then logs in so it is merged into their account.
+        session = requests.Session()
+        for _ in range(self.rng.randint(1, 3)):
+            self.add_to_cart(session)
+        self.login(session)
+
+    def checkout(self):
+        session = requests.Session()
+        self.login(session)
+        self.add_to_cart(session)
+        self.request('view_cart', 'GET', '/cart/', session=session)
+        self.request('place_order', 'GET', '/order/place/', session=session)
+
+
+class Command(BaseCommand):
+    help = "Seed a catalog, serve it with gunicorn locally and drive mixed shopper traffic against it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url',
+                            help="Test an already running deployment instead of starting one. "
+                                 "It must contain the loadtest-<n> users created by seed_catalog.")
+        parser.add_argument('--products', type=int, default=1000,
+                            help="Catalog size to seed for the local deployment.")
+        parser.add_argument('--users', type=int, default=20,
+                            help="Number of concurrent virtual users.")
+        parser.add_argument('--duration', type=float, default=30,
+                            help="Seconds of traffic to generate.")
+        parser.add_argument('--ramp-up', type=float, default=0,
+                            help="Seconds over which virtual users are started.")
+        parser.add_argument('--think-time', type=float, default=0,
+                            help="Mean pause in seconds between a virtual user's scenarios.")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--workers', type=int,
+                            help="gunicorn worker processes for the local deployment "
+                                 "(gunicorn's own default, or the config file's, if not given).")
+        parser.add_argument('--gunicorn-args', default='',
+                            help="Extra gunicorn arguments, e.g. \"-c gunicorn.conf.py\".")
+        parser.add_argument('--workdir',
+                            help="Directory for the local database and server log (a temporary one by default).")
+        parser.add_argument('--reuse-db', action='store_true',
+                            help="Keep the database already in --workdir instead of migrating and seeding it.")
+        parser.add_argument('--json', dest='json_path',
+                            help="Also write the report to this JSON file.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        report = self.run(options)
+        self.print_report(report)
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=2)
+
+    def run(self, options):
+        server = None
+        workdir = None
+        try:
+            if options['url']:
+                base_url = options['url'].rstrip('/')
+            else:
+                workdir = Path(options['workdir'] or tempfile.mkdtemp(prefix='loadtest-'))
+                workdir.mkdir(parents=True, exist_ok=True)
+                env = self.server_env(workdir)
+                if not (options['reuse_db'] and (workdir / 'loadtest.sqlite3').exists()):
+                    self.prepare_database(env, options)
+                server, base_url = self.start_server(env, workdir, options)
+
+            catalog = self.discover_catalog(base_url)
+            report = self.generate_load(base_url, catalog, options)
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=30)
+            if workdir and not options['workdir']:
+                shutil.rmtree(workdir, ignore_errors=True)
+        return report
+
+    def server_env(self, workdir):
+        return {
+            **os.environ,
+            'SQLITE_PATH': str(workdir / 'loadtest.sqlite3'),
+            'DJANGO_SETTINGS_MODULE': 'scheema_retail.settings_runtime',
+            # Serve templates without a collected static manifest.
+            'STATICFILES_STORAGE': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+            'DEBUG': '',
+            'ENV': 'loadtest',
+            # Server-Timing headers and per-view latencies, without a log line per request.
+            'PERFORMANCE_INSTRUMENTATION': 'true',
+            'PERFORMANCE_LOG_LEVEL': 'WARNING',
+            # Every simulated guest shares one IP address.
+            'RATELIMIT_ENABLED': 'false',
+        }
+
+    def manage(self, env, *args):
+        subprocess.run([sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), *args],
+                       env=env, cwd=settings.BASE_DIR, check=True,
+                       stdout=subprocess.DEVNULL)
+
+    def prepare_database(self, env, options):
+        self.stdout.write("Migrating the load test database...")
+        self.manage(env, 'migrate', '--noinput')
+        self.stdout.write(f"Seeding {options['products']} products...")
+        self.manage(env, 'seed_catalog', '--products', str(options['products']),
+                    '--users', str(options['users']), '--seed', str(options['seed']))
+
+    def start_server(self, env, workdir, options):
+        base_url = f"http://127.0.0.1:{options['port']}"
+        log_path = workdir / 'gunicorn.log'
+        command = [
+            sys.executable, '-m', 'gunicorn', 'scheema_retail.wsgi:application',
+            '--bind', f"127.0.0.1:{options['port']}",
+            *(['--workers', str(options['workers'])] if options['workers'] else []),
+            *shlex.split(options['gunicorn_args']),
+        ]
+        self.stdout.write(f"Starting {' '.join(command[2:])}")
+        with open(log_path, 'w', encoding='utf-8') as log:
+            server = subprocess.Popen(command, env=env, cwd=settings.BASE_DIR,
+                                      stdout=log, stderr=subprocess.STDOUT)
+
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(
+                    f"gunicorn exited with {server.returncode}:\n{log_path.read_text()[-2000:]}")
+            try:
+                if requests.get(f'{base_url}/api/categories/', timeout=2).ok:
+                    return server, base_url
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+
+        server.terminate()
+        raise CommandError(f"gunicorn did not become ready:\n{log_path.read_text()[-2000:]}")
+
+    def discover_catalog(self, base_url, limit=5000):
+        products = []
+        after = 0
+        while after is not None and len(products) < limit:
+            page = requests.get(f'{base_url}/api/products/', timeout=30, params={
+                'fields': 'id,slug,name', 'limit': 100, 'after': after}).json()
+            products.extend(page['results'])
+            after = page['next_after']
+
+        categories = [category['slug'] for category in requests.get(
+            f'{base_url}/api/categories/', timeout=30).json()['results']]
+        if not products or not categories:
+            raise CommandError(f"No products or categories found at {base_url}")
+
+        terms = sorted({word for product in products
+                        for word in product['name'].split() if len(word) > 3})
+        return {'products': products, 'categories': categories, 'terms': terms}
+
+    def generate_load(self, base_url, catalog, options):
+        stats = LoadStats()
+        users = options['users']
+        self.stdout.write(
+            f"Running {users} virtual users for {options['duration']}s against {base_url}...")
+
+        start = time.monotonic()
+        deadline = start + options['duration']
+        threads = []
+        for i in range(users):
+            user = VirtualUser(base_url, catalog, stats, random.Random(options['seed'] + i),
+                               f'loadtest-{i}', options['think_time'])
+            thread = threading.Thread(target=user.run, args=(deadline,), daemon=True)
+            thread.start()
+            threads.append(thread)
+            if options['ramp_up']:
+                time.sleep(options['ramp_up'] / users)
+
+        for thread in threads:
+            thread.join()
+        return stats.report(time.monotonic() - start)
+
+    def print_report(self, report):
+        header = f"{'endpoint':<16}{'requests':>10}{'errors':>8}{'err %':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for endpoint, row in sorted(report.items(), key=lambda item: item[0] == 'TOTAL'):
+            line = (f"{endpoint:<16}{row['requests']:>10}{row['errors']:>8}"
+                    f"{row['error_rate'] * 100:>8.1f}{row['rps']:>9.1f}"
+                    f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+            style = self.style.ERROR if row['error_rate'] > 0.01 else self.style.SUCCESS
+            self.stdout.write(style(line))
@@ -0,0 +1,21 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from scheema_retail_store.lifecycle import purge_carts, purge_sessions
+
+
+class Command(BaseCommand):
+    help = "Delete carts nobody has used for a while and expired sessions, in batches. Run it from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=60,
+                            help="Delete carts not used for this many days.")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Rows deleted per transaction.")
+
+    def handle(self, *args, **options):
+        carts = purge_carts(timedelta(days=options['days']), options['batch_size'])
+        sessions = purge_sessions(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {carts} abandoned carts and "
+            + (f"{sessions} expired sessions" if sessions is not None
+               else "the expired sessions of the session engine")))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from scheema_retail_store.categories import reconcile_product_counts
+
+
+class Command(BaseCommand):
+    help = "Recount the products of every category and fix the stored counts that have drifted."
+
+    def handle(self, *args, **options):
+        changes = reconcile_product_counts()
+        for slug, (stored, actual) in sorted(changes.items()):
+            self.stdout.write(f"{slug}: {stored} -> {actual}")
+        self.stdout.write(self.style.SUCCESS(f"Fixed {len(changes)} category counts"))
@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from scheema_retail_store.inventory import release_expired
+
+
+class Command(BaseCommand):
+    help = "Release expired checkout stock holds. Run it from cron, or keep it running with --interval."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Keep sweeping every this many seconds instead of running once.")
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired(options['batch_size'])
+            self.stdout.write(f"Released {released} expired reservations")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
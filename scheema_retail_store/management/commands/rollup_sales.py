@@ -0,0 +1,22 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from scheema_retail_store.analytics import reset_rollups, rollup_sales
+
+
+class Command(BaseCommand):
+    help = "Incrementally aggregate new orders into the daily product and category sales rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Orders aggregated per transaction.")
+        parser.add_argument('--settle-seconds', type=int, default=60,
+                            help="Leave orders younger than this for the next run.")
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Discard the rollups and aggregate every order again.")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            reset_rollups()
+        processed = rollup_sales(options['batch_size'],
+                                 timedelta(seconds=options['settle_seconds']))
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {processed} new orders"))
@@ -0,0 +1,114 @@
+import json
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection, connections
+from scheema_retail_store.taskqueue import purge_finished, queue_stats, run_pending
+
+logger = logging.getLogger(__name__)
+
+
+def work(threads, poll_interval):
+    """
+    Runs `threads` worker threads in this process until SIGTERM. Each thread
+    runs due tasks and sleeps `poll_interval` seconds when there are none; a
+    task that is running when the signal comes is finished first.
+    """
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent passes Ctrl-C on as SIGTERM.
+
+    def loop():
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                try:
+                    ran = run_pending(limit=100)
+                except DatabaseError:
+                    # Lost connection or lock timeout: start over on a fresh one.
+                    logger.exception("Worker could not reach the task table")
+                    connection.close()
+                    ran = 0
+                if not ran:
+                    stop.wait(poll_interval)
+        finally:
+            connection.close()
+
+    pool = [threading.Thread(target=loop, daemon=True) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    while any(thread.is_alive() for thread in pool):
+        stop.wait(1)
+    for thread in pool:
+        thread.join()
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks with a pool of worker processes and threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=4,
+                            help="Worker threads per process. Tasks mostly wait on I/O.")
+        parser.add_argument('--poll-interval', type=float, default=1,
+                            help="Seconds an idle worker waits before looking for tasks again.")
+        parser.add_argument('--purge-after-hours', type=float, default=24 * 7,
+                            help="Delete finished tasks older than this, hourly (0 to keep them).")
+        parser.add_argument('--once', action='store_true',
+                            help="Run the tasks that are due in this process, then exit.")
+        parser.add_argument('--stats', action='store_true',
+                            help="Print the queue depth and latency as JSON, then exit.")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(queue_stats(), indent=2))
+            return
+        if options['once']:
+            self.stdout.write(f"Ran {run_pending()} tasks")
+            return
+
+        # Forked workers must not share the parent's database connections.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+
+        def start_worker():
+            worker = context.Process(target=work,
+                                     args=(options['threads'], options['poll_interval']))
+            worker.start()
+            return worker
+
+        workers = [start_worker() for _ in range(options['processes'])]
+        self.stdout.write(f"Started {len(workers)} worker processes "
+                          f"with {options['threads']} threads each")
+
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            stopping.set()
+            for worker in workers:
+                worker.terminate()  # SIGTERM: finish the current task, then exit.
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        keep = timedelta(hours=options['purge_after_hours'])
+        next_purge = time.monotonic()
+        while not stopping.is_set():
+            for index, worker in enumerate(workers):
+                if not worker.is_alive() and not stopping.is_set():
+                    self.stderr.write(f"Worker {worker.pid} exited with {worker.exitcode}; restarting")
+                    workers[index] = start_worker()
+            if keep and time.monotonic() >= next_purge:
+                purged = purge_finished(keep)
+                connection.close()
+                if purged:
+                    self.stdout.write(f"Purged {purged} finished tasks")
+                next_purge = time.monotonic() + 3600
+            stopping.wait(5)
+        for worker in workers:
+            worker.join()
+        self.stdout.write("Workers stopped")
@@ -1,14 +1,16 @@
 import os
 import random
 import json
-import requests
-from bs4 import BeautifulSoup
-from slugify import slugify
+from urllib.parse import urljoin
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.core.files.storage import default_storage
 from django.utils.text import slugify
+from scheema_retail_store.currency import exchange_rates, parse_amount
 
+# requests and bs4 are imported inside the methods that use them, so loading
+# this command (for --help, or by the command registry) stays cheap.
+# Used until a KES rate is loaded with load_exchange_rates.
 KSH_TO_USD_RATE = 0.00771
 scrape_urls = os.getenv('SCRAPE_URL')
 
@@ -17,13 +19,17 @@ class Command(BaseCommand):
     help = "Scrape products from e-commerce and save them to the database."
 
     def convert_ksh_to_usd(self, price_str):
-        try:
-            price_numeric = float("".join(filter(str.isdigit, price_str)))
-            return round(price_numeric * KSH_TO_USD_RATE, 2)
-        except ValueError:
+        amount = parse_amount(price_str)
+        if amount is None:
             return None
+        rate = exchange_rates().get('KES')
+        if rate:
+            return float(round(amount / rate, 2))
+        return round(float(amount) * KSH_TO_USD_RATE, 2)
 
     def download_image(self, image_url, save_dir):
+        import requests
+
         try:
             response = requests.get(image_url, stream=True)
             response.raise_for_status()
@@ -57,6 +63,9 @@ class Command(BaseCommand):
             return None
 
     def extract_product_details_from_link(self, url):
+        import requests
+        from bs4 import BeautifulSoup
+
         try:
             response = requests.get(f'{scrape_urls}/{url}')
             response.raise_for_status()
@@ -107,6 +116,9 @@ class Command(BaseCommand):
 
     def scrape_products_from_page(self, url, save_dir):
         # sourcery skip: merge-dict-assign, move-assign-in-block
+        import requests
+        from bs4 import BeautifulSoup
+
         try:
             response = requests.get(url)
             response.raise_for_status()
@@ -188,8 +200,7 @@ class Command(BaseCommand):
             all_products.extend(products)
 
             if next_page_url and not next_page_url.startswith("http"):
-                next_page_url = requests.compat.urljoin(
-                    base_url, next_page_url)
+                next_page_url = urljoin(base_url, next_page_url)
 
         return all_products
 
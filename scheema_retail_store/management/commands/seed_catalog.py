@@ -0,0 +1,95 @@
+import random
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from scheema_retail_store.categories import reconcile_product_counts
+from scheema_retail_store.models import Category, Product, Review, UserProfile
+from configs.json_configs import load_json_data
+
+LOADTEST_PASSWORD = 'loadtest-password'
+
+
+class Command(BaseCommand):
+    help = "Bulk-seed a synthetic catalog of any size, based on products.json, plus shoppers and reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000,
+                            help="Number of products to create.")
+        parser.add_argument('--users', type=int, default=50,
+                            help=f"Number of shoppers to create, named loadtest-<n> with password '{LOADTEST_PASSWORD}'.")
+        parser.add_argument('--reviews-per-product', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--source', default='products.json',
+                            help="JSON file of scraped products used as templates.")
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Random seed, for reproducible catalogs.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        templates = load_json_data(options['source'])
+        batch_size = options['batch_size']
+
+        with transaction.atomic():
+            categories = self.seed_categories(templates)
+            users = self.seed_users(options['users'], batch_size)
+            products = self.seed_products(
+                templates, categories, options['products'], batch_size, rng)
+            reviews = self.seed_reviews(
+                products, users, options['reviews_per_product'], batch_size, rng)
+            # bulk_create skips the signals that keep category counts.
+            reconcile_product_counts()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(products)} products, {len(users)} users and {reviews} reviews"))
+
+    def seed_categories(self, templates):
+        categories = {}
+        for name in sorted({template['category'] for template in templates}):
+            categories[name], created = Category.objects.get_or_create(name=name)
+        return categories
+
+    def seed_users(self, count, batch_size):
+        offset = User.objects.filter(username__startswith='loadtest-').count()
+        password = make_password(LOADTEST_PASSWORD)
+        users = User.objects.bulk_create([
+            User(username=f'loadtest-{offset + i}',
+                 email=f'loadtest-{offset + i}@example.com', password=password)
+            for i in range(count)
+        ], batch_size=batch_size)
+        # bulk_create skips the post_save receiver that normally creates profiles.
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user) for user in users], batch_size=batch_size)
+        return users
+
+    def seed_products(self, templates, categories, count, batch_size, rng):
+        offset = Product.objects.count()
+        products = []
+        for i in range(offset, offset + count):
+            template = templates[i % len(templates)]
+            products.append(Product(
+                name=f"{template['title']} #{i}",
+                slug=f"{template['slug'][:40]}-{i}",
+                sku=f"{template['sku']}-{i}",
+                description=template['description'],
+                price=(Decimal(str(template['price'])) * Decimal(rng.choice(['0.8', '1.0', '1.2']))).quantize(Decimal('0.01')),
+                category=categories[template['category']],
+                stock=rng.randint(1, 200),
+                features=str(template['specifications']),
+                image=template['image'],
+                images=template['images'],
+            ))
+        return Product.objects.bulk_create(products, batch_size=batch_size)
+
+    def seed_reviews(self, products, users, per_product, batch_size, rng):
+        if not users or not per_product:
+            return 0
+
+        reviews = Review.objects.bulk_create([
+            Review(user=rng.choice(users), product=product,
+                   rating=rng.randint(1, 5), comment='Seeded review')
+            for product in products
+            for _ in range(per_product)
+        ], batch_size=batch_size)
+        return len(reviews)
@@ -1,18 +1,20 @@
 import json
 import random
 from django.core.management.base import BaseCommand
+from scheema_retail_store.currency import parse_amount
 from scheema_retail_store.models import Product, Category, Review
 from configs.json_configs import load_json_data
 import csv
-from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from faker import Faker
 
 
 class Command(BaseCommand):
     help = "Seed product data from a JSON file into the database and generate fake users and reviews."
 
     def handle(self, *args, **kwargs):
+        # Faker takes a noticeable time to import; only pay for it when seeding.
+        from faker import Faker
+
         fake = Faker()
 
         json_file_path = 'products.json'
@@ -45,6 +47,9 @@ class Command(BaseCommand):
                         sku=product_data["sku"],
                         description=product_data["description"],
                         price=product_data["price"],
+                        # Kept so load_exchange_rates --reprice can convert it again.
+                        source_currency='KES' if product_data.get("price_ksh") else '',
+                        source_amount=parse_amount(product_data.get("price_ksh")),
                         category=category,
                         image=product_data["image"],
                         stock=product_data["stock"],
@@ -61,19 +66,13 @@ class Command(BaseCommand):
                         [user.username, user.email, user.password])
                     created_users.append(user)
 
-                    generated_reviews = []
-
                     for _ in range(fake.random_int(1, 5)):
-                        review = Review.objects.create(
+                        Review.objects.create(
                             user=random.choice(created_users),
                             product=product_instance,
                             rating=fake.random_int(1, 5),
                             comment=fake.sentence(),
                         )
-                        generated_reviews.append(review)
-
-                    product_instance.reviews.set(generated_reviews)
-                    product_instance.save() 
 
                     self.stdout.write(self.style.SUCCESS(
                         f"Product '{product_data['title']}' seeded into database with fake users and reviews"))
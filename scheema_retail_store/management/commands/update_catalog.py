@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from scheema_retail_store.catalog import FeedError, apply_feed, open_feed, read_feed
+
+
+class Command(BaseCommand):
+    help = "Apply a supplier feed of prices and stock, keyed by SKU, to the catalog. CSV or NDJSON, optionally gzipped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('feed', help="Feed file, or - for stdin.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help="Feed format (guessed from the file name by default).")
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help="Feed rows diffed and applied per transaction.")
+        parser.add_argument('--max-errors', type=int, default=100,
+                            help="Stop after this many invalid rows.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Report what would change without writing anything.")
+
+    def handle(self, *args, **options):
+        feed = options['feed']
+        format = options['format'] or ('ndjson' if '.ndjson' in feed or '.jsonl' in feed else 'csv')
+        start = time.perf_counter()
+        try:
+            with open_feed(feed) as file:
+                report = apply_feed(read_feed(file, format), options['chunk_size'],
+                                    options['dry_run'], options['max_errors'])
+        except FeedError as error:
+            raise CommandError(f"Too many invalid rows, stopped at {error}") from None
+
+        for error in report['errors']:
+            self.stderr.write(f"Skipped {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would update' if options['dry_run'] else 'Updated'} {report['updated']} products "
+            f"from {report['rows']} rows in {time.perf_counter() - start:.1f}s "
+            f"({report['unchanged']} unchanged, {report['unknown']} unknown SKUs, "
+            f"{len(report['errors'])} invalid rows)"))
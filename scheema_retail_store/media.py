@@ -0,0 +1,225 @@
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from stat import S_ISREG
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Unfingerprinted files (e.g. profile images) can be replaced under the same
+# name, so browsers revalidate them, which costs a 304 when unchanged.
+REVALIDATE = 'no-cache'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+_manifests = {}
+
+
+def file_digest(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hashed_name(name, digest):
+    root, ext = os.path.splitext(name)
+    return f'{root}.{digest[:12]}{ext}'
+
+
+def load_manifest(path=None):
+    """
+    Returns `(entries, originals)` for the media manifest at `path`: entries
+    map each original file name to its fingerprinted name and metadata, and
+    `originals` maps fingerprinted names back. Loaded once per process.
+    """
+    path = path or settings.MEDIA_MANIFEST_PATH
+    if path not in _manifests:
+        try:
+            with open(path, encoding='utf-8') as file:
+                entries = json.load(file)
+        except FileNotFoundError:
+            entries = {}
+        _manifests[path] = (entries, {entry['hashed']: name for name, entry in entries.items()})
+    return _manifests[path]
+
+
+def build_manifest(directories=None, path=None):
+    """
+    Fingerprints every file under the given `MEDIA_ROOT` subdirectories and
+    writes the manifest. Files whose size and modification time are unchanged
+    since the last build are not hashed again. Returns `(files, rehashed)`.
+    """
+    path = path or settings.MEDIA_MANIFEST_PATH
+    previous, _ = load_manifest(path)
+    entries = {}
+    rehashed = 0
+
+    for directory in directories or settings.MEDIA_FINGERPRINT_DIRS:
+        top = os.path.join(settings.MEDIA_ROOT, directory)
+        for root, dirs, files in os.walk(top):
+            dirs.sort()
+            for filename in sorted(files):
+                full_path = os.path.join(root, filename)
+                name = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+                stat = os.stat(full_path)
+                entry = previous.get(name)
+                if not entry or (entry['size'], entry['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+                    digest = file_digest(full_path)
+                    entry = {
+                        'hashed': hashed_name(name, digest),
+                        'etag': f'"{digest}"',
+                        'size': stat.st_size,
+                        'mtime_ns': stat.st_mtime_ns,
+                        'content_type': mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                    }
+                    rehashed += 1
+                entries[name] = entry
+
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(entries, file, indent=1, sort_keys=True)
+    os.replace(temporary, path)
+    _manifests.pop(path, None)
+    return len(entries), rehashed
+
+
+class FingerprintedMediaStorage(FileSystemStorage):
+    """
+    Media storage whose URLs point at the fingerprinted name of files listed
+    in the media manifest, so they can be cached forever; other files (new
+    uploads, or before the manifest is built) keep their plain URLs.
+    """
+
+    def url(self, name):
+        entry = load_manifest()[0].get(name) if name else None
+        return super().url(entry['hashed'] if entry else name)
+
+
+class _FileRange:
+    """
+    Reads `length` bytes of `file` from `start`. Keeps `fileno()`, so the WSGI
+    server's file wrapper can still send the range with `sendfile()`.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _byte_range(request, size, etag):
+    """
+    Returns the `(start, end)` of a satisfiable single-range request, `None`
+    to send the whole file, or raises `ValueError` when unsatisfiable.
+    """
+    match = RANGE_RE.match(request.META.get('HTTP_RANGE', ''))
+    if not match or request.META.get('HTTP_IF_RANGE', etag) != etag:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError
+    return start, end
+
+
+@require_safe
+def serve(request, path):
+    """
+    Serves a file under `MEDIA_ROOT`. Fingerprinted names are answered from
+    the manifest's precomputed metadata and cached forever; single byte
+    ranges are honoured; and the body is a file response, which gunicorn
+    sends with `sendfile()`, or an `X-Accel-Redirect` for nginx to send when
+    `MEDIA_ACCEL_REDIRECT` is set.
+    """
+    entries, originals = load_manifest()
+    name = originals.get(path, path)
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404(path)
+    if not S_ISREG(stat.st_mode):
+        raise Http404(path)
+
+    entry = entries.get(name) if name != path else None
+    if entry and (entry['size'], entry['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+        # Changed since the manifest was built: serve it, but not as immutable.
+        entry = None
+    if entry:
+        etag, content_type, cache_control = entry['etag'], entry['content_type'], IMMUTABLE
+    else:
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        cache_control = REVALIDATE
+
+    accel_redirect = settings.MEDIA_ACCEL_REDIRECT and settings.MEDIA_ACCEL_REDIRECT + name
+    return send_file(request, full_path, stat, etag, content_type, cache_control, accel_redirect)
+
+
+def send_file(request, full_path, stat, etag, content_type, cache_control, accel_redirect='',
+              headers=None, filename=''):
+    """
+    Answers a GET or HEAD for the file at `full_path`, whose `stat` the
+    caller has taken: a 304 when the client's copy is current, a 206 for a
+    single byte range, and otherwise the whole file. With `accel_redirect`,
+    nginx is asked to send the file from that internal location instead.
+    `filename` is the name given to clients, by default the file's own.
+    """
+    headers = {**(headers or {}), 'ETag': etag, 'Cache-Control': cache_control,
+               'Last-Modified': http_date(stat.st_mtime), 'Accept-Ranges': 'bytes'}
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is not None:
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    if accel_redirect:
+        # nginx sends the file, and handles any range, from its internal location.
+        return HttpResponse(content_type=content_type, headers={
+            **headers, 'X-Accel-Redirect': accel_redirect})
+
+    size = stat.st_size
+    try:
+        byte_range = _byte_range(request, size, etag)
+    except ValueError:
+        return HttpResponse(status=416, headers={**headers, 'Content-Range': f'bytes */{size}'})
+
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type, headers=headers,
+                                filename=filename)
+    else:
+        start, end = byte_range
+        response = FileResponse(_FileRange(file, start, end - start + 1), status=206,
+                                content_type=content_type, filename=filename, headers={
+                                    **headers, 'Content-Range': f'bytes {start}-{end}/{size}'})
+        response['Content-Length'] = end - start + 1
+    return response
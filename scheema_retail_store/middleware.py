@@ -0,0 +1,248 @@
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.template.backends.django import Template
+
+logger = logging.getLogger('scheema_retail_store.performance')
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """
+    RequestMetrics accumulates the timings of a single request while it is being handled.
+
+    Attributes:
+        db_queries (int): The number of SQL statements executed.
+        db_time (float): The time spent executing SQL, in seconds.
+        template_time (float): The time spent rendering templates, in seconds.
+    """
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+
+def current_metrics():
+    return getattr(_local, 'metrics', None)
+
+
+def query_timer(execute, sql, params, many, context):
+    """
+    `connection.execute_wrapper` hook that counts and times every query run
+    while a request is being measured.
+    """
+    metrics = current_metrics()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics.db_queries += 1
+            metrics.db_time += time.perf_counter() - start
+
+
+_original_template_render = Template.render
+
+
+def _timed_template_render(self, context=None, request=None):
+    metrics = current_metrics()
+    if metrics is None:
+        return _original_template_render(self, context, request)
+
+    start = time.perf_counter()
+    try:
+        return _original_template_render(self, context, request)
+    finally:
+        metrics.template_time += time.perf_counter() - start
+
+
+def instrument_templates():
+    Template.render = _timed_template_render
+
+
+class RollingLatencies:
+    """
+    RollingLatencies keeps the most recent request durations per URL name and reports their percentiles.
+
+    Attributes:
+        window (int): The number of most recent samples kept per URL name.
+
+    Methods:
+        record(name, duration): Adds a duration, in seconds, for a URL name.
+        snapshot(): Returns count and p50/p95/p99 in milliseconds for every URL name.
+        clear(): Drops all samples.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, name, duration):
+        with self._lock:
+            self._samples[name].append(duration)
+
+    def snapshot(self):
+        with self._lock:
+            samples = {name: sorted(values)
+                       for name, values in self._samples.items()}
+
+        return {
+            name: {
+                'count': len(values),
+                'p50_ms': round(_percentile(values, 50) * 1000, 2),
+                'p95_ms': round(_percentile(values, 95) * 1000, 2),
+                'p99_ms': round(_percentile(values, 99) * 1000, 2),
+            }
+            for name, values in samples.items() if values
+        }
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+def _percentile(sorted_values, percent):
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[int(index)]
+
+
+latencies = RollingLatencies(getattr(settings, 'PERFORMANCE_WINDOW', 1000))
+
+
+class PerformanceMiddleware:
+    """
+    PerformanceMiddleware measures wall time, database queries and time, template render time and
+    response size for every request. It reports them in a `Server-Timing` header and a structured
+    log line, and feeds the per-URL-name rolling latencies exposed to staff.
+
+    Enabled by `PERFORMANCE_INSTRUMENTATION`; query timing additionally requires
+    `PERFORMANCE_DB_INSTRUMENTATION`, as it wraps every SQL statement.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFORMANCE_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.instrument_db = getattr(
+            settings, 'PERFORMANCE_DB_INSTRUMENTATION', True)
+        instrument_templates()
+
+    def __call__(self, request):
+        metrics = _local.metrics = RequestMetrics()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                if self.instrument_db:
+                    for connection in connections.all():
+                        stack.enter_context(
+                            connection.execute_wrapper(query_timer))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        url_name = match.view_name if match else 'unresolved'
+        size = None if response.streaming else len(response.content)
+
+        timings = [f'app;dur={duration * 1000:.1f}']
+        if self.instrument_db:
+            timings.append(
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.db_queries} queries"')
+        timings.append(f'tpl;dur={metrics.template_time * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(timings)
+
+        latencies.record(url_name, duration)
+        logger.info(json.dumps({
+            'url_name': url_name,
+            'method': request.method,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'db_queries': metrics.db_queries if self.instrument_db else None,
+            'db_ms': round(metrics.db_time * 1000, 2) if self.instrument_db else None,
+            'template_ms': round(metrics.template_time * 1000, 2),
+            'response_bytes': size,
+        }))
+        return response
+
+
+def take_token(key, burst, period, now=None):
+    """
+    Takes a token from the bucket stored in the cache under `key`, which
+    holds up to `burst` tokens and refills completely in `period` seconds.
+    Returns 0 when a token was taken, or else the whole seconds until one
+    will be available. A bucket untouched for `period` seconds has refilled,
+    so its cache entry expires then.
+    """
+    now = time.time() if now is None else now
+    rate = burst / period
+    tokens, updated = cache.get(key) or (burst, now)
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens < 1:
+        # Rounded first, so float error can't add a second.
+        return math.ceil(round((1 - tokens) / rate, 3))
+    # Not atomic: concurrent requests from one client may both get the last
+    # token, which is fine for shedding abuse.
+    cache.set(key, (tokens - 1, now), period)
+    return 0
+
+
+class RateLimitMiddleware:
+    """
+    RateLimitMiddleware throttles the views named in `RATELIMITS` with token buckets held in the
+    default cache, one per signed-in user or, for anonymous clients, per IP address (read from
+    `RATELIMIT_IP_HEADER`). A request with no token left gets a 429 with `Retry-After`; other views
+    cost one dictionary lookup.
+
+    Enabled by `RATELIMIT_ENABLED`. The limits hold across workers with a shared cache. With a
+    per-process cache each worker keeps its own buckets with the full burst, so a client whose
+    requests are spread over N workers may get up to N times the limit.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'RATELIMIT_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.limits = settings.RATELIMITS
+        self.ip_header = settings.RATELIMIT_IP_HEADER
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def client_key(self, request):
+        if request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        # Proxies append to X-Forwarded-For, so the last address is the one they saw.
+        address = request.META.get(self.ip_header) or request.META.get('REMOTE_ADDR', '')
+        return 'ip:' + address.rsplit(',', 1)[-1].strip()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name
+        limit = self.limits.get(url_name)
+        if limit is None:
+            return None
+        client = self.client_key(request)
+        retry_after = take_token(f'ratelimit:{url_name}:{client}', *limit)
+        if not retry_after:
+            return None
+
+        logger.warning('Rate limited %s for %s', url_name, client)
+        message = 'Too many requests, try again later.'
+        if url_name.startswith('api_'):
+            response = JsonResponse({'error': message}, status=429)
+        else:
+            response = HttpResponse(message, status=429, content_type='text/plain')
+        response['Retry-After'] = retry_after
+        return response
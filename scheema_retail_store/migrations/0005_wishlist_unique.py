@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-19 16:42
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_wishlist_rows(apps, schema_editor):
+    Wishlist = apps.get_model('scheema_retail_store', 'Wishlist')
+    duplicates = Wishlist.objects.values('user', 'product').annotate(
+        keep=Min('id'), rows=Count('id')).filter(rows__gt=1)
+    for duplicate in duplicates:
+        Wishlist.objects.filter(user=duplicate['user'], product=duplicate['product']).exclude(
+            id=duplicate['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheema_retail_store', '0004_productrecommendation'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_wishlist_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='wishlist',
+            constraint=models.UniqueConstraint(fields=('user', 'product'), name='unique_wishlist_product'),
+        ),
+    ]
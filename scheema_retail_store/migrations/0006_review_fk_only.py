@@ -0,0 +1,52 @@
+# Generated by Django 4.2.16 on 2026-10-19 16:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def reconcile_review_links(apps, schema_editor):
+    """
+    The FK is kept as the only link. A review the M2M also attached to a
+    different product is copied to that product, so no product loses a
+    review it used to show.
+    """
+    Product = apps.get_model('scheema_retail_store', 'Product')
+    Review = apps.get_model('scheema_retail_store', 'Review')
+    links = Product.reviews.through.objects.exclude(
+        review__product_id=models.F('product_id')).select_related('review')
+
+    links = [(link.review, link.product_id) for link in links.iterator(chunk_size=2000)]
+    originals = [review for review, product_id in links]
+    copies = Review.objects.bulk_create([
+        Review(user_id=review.user_id, product_id=product_id, rating=review.rating,
+               comment=review.comment)
+        for review, product_id in links
+    ], batch_size=1000)
+    # auto_now_add stamped the copies with the current time; keep the originals' dates.
+    for copy, review in zip(copies, originals):
+        copy.created_at = review.created_at
+    Review.objects.bulk_update(copies, ['created_at'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheema_retail_store', '0005_wishlist_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(reconcile_review_links, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='product',
+            name='reviews',
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='scheema_retail_store.product'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', 'created_at'], name='scheema_ret_product_f983ce_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.16 on 2026-10-19 16:47
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    CartItem = apps.get_model('scheema_retail_store', 'CartItem')
+    duplicates = CartItem.objects.values('cart', 'product').annotate(
+        keep=Min('id'), total=Sum('quantity'), rows=Count('id')).filter(rows__gt=1)
+    for duplicate in duplicates:
+        CartItem.objects.filter(pk=duplicate['keep']).update(quantity=duplicate['total'])
+        CartItem.objects.filter(cart=duplicate['cart'], product=duplicate['product']).exclude(
+            pk=duplicate['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheema_retail_store', '0006_review_fk_only'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='unique_cart_product'),
+        ),
+    ]
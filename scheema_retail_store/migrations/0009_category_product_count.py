@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-19 17:24
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_products(apps, schema_editor):
+    Category = apps.get_model('scheema_retail_store', 'Category')
+    Product = apps.get_model('scheema_retail_store', 'Product')
+    counts = Product.objects.filter(category=OuterRef('pk')).order_by().values(
+        'category').annotate(total=Count('id')).values('total')
+    Category.objects.update(product_count=Coalesce(
+        Subquery(counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheema_retail_store', '0008_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, NullIf
+import django.db.models.deletion
+
+
+def snapshot_products(apps, schema_editor):
+    OrderItem = apps.get_model('scheema_retail_store', 'OrderItem')
+    Product = apps.get_model('scheema_retail_store', 'Product')
+    product = Product.objects.filter(pk=OuterRef('product_id'))
+    OrderItem.objects.update(
+        name=Subquery(product.values('name')[:1]),
+        sku=Subquery(product.values('sku')[:1]),
+        # The image copied at checkout, else the product's current one.
+        thumbnail=Coalesce(NullIf('image', Value('')), Subquery(product.values('image')[:1]),
+                           Value('')),
+    )
+
+
+def restore_images(apps, schema_editor):
+    OrderItem = apps.get_model('scheema_retail_store', 'OrderItem')
+    OrderItem.objects.update(image=NullIf('thumbnail', Value('')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheema_retail_store', '0011_exchange_rates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='name',
+            field=models.CharField(default='', max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='sku',
+            field=models.CharField(default='', max_length=50),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='thumbnail',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(snapshot_products, restore_images),
+        migrations.RemoveField(
+            model_name='orderitem',
+            name='image',
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True,
+                                    on_delete=django.db.models.deletion.SET_NULL,
+                                    to='scheema_retail_store.product'),
+        ),
+    ]
@@ -1,17 +1,20 @@
 from decimal import Decimal
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
 from django.db import models
 from django.forms import ValidationError
+from django.utils import timezone
 from django.utils.text import slugify
 
 
 class Category(models.Model):
     """
-    Category represents a category with a name and a unique slug. It automatically generates the slug from the name if it is not provided.
+    Category represents a category with a name and a unique slug. It automatically generates the slug from the name if it is not provided. The number of products in the category is stored with it, so navigation can list categories with their counts without counting products; Product signals keep it current and `reconcile_categories` repairs it after bulk loads.
 
     Attributes:
         name (str): The name of the category.
         slug (str): A unique slug for the category, generated from the name if not provided.
+        product_count (int): The number of products in the category.
 
     Methods:
         save(*args, **kwargs): Saves the category instance, generating the slug if it is not set.
@@ -19,6 +22,7 @@ class Category(models.Model):
     """
     name = models.CharField(max_length=255)
     slug = models.SlugField(unique=True)
+    product_count = models.PositiveIntegerField(default=0, editable=False)
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -31,19 +35,21 @@ class Category(models.Model):
 
 class Product(models.Model):
     """
-    Product represents an item for sale, including its details such as name, SKU, price, and associated category. It automatically generates a slug from the name if it is not provided.
+    Product represents an item for sale, including its details such as name, SKU, price, and associated category. It automatically generates a slug from the name if it is not provided. The price is in the shop's `CURRENCY`; a product priced by its supplier in another currency keeps that amount too, so `load_exchange_rates --reprice` can convert it again when the rates change; setting the price directly clears that amount. `updated_at` serves as the product's version: rendered product tiles are cached under it, so code that changes a product with a queryset update must set it too.
 
     Attributes:
         name (str): The name of the product.
         slug (str): A unique slug for the product, generated from the name if not provided.
         sku (str): A unique stock keeping unit identifier for the product.
         description (str): A detailed description of the product.
-        price (Decimal): The price of the product.
+        price (Decimal): The price of the product, in the shop's currency.
+        source_currency (str): The currency the product was priced in by its source, optional.
+        source_amount (Decimal): The price in the source currency, optional.
         category (Category): The category to which the product belongs.
         stock (int): The quantity of the product available in stock.
         features (str): Additional features of the product, optional.
-        reviews (ManyToManyField): A collection of reviews associated with the product.
         images_urls (list): A list of image URLs for the product.
+        updated_at (datetime): The timestamp when the product was last changed.
 
     Methods:
         save(*args, **kwargs): Saves the product instance, generating the slug if it is not set.
@@ -54,13 +60,14 @@ class Product(models.Model):
     sku = models.CharField(max_length=50, unique=True)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    source_currency = models.CharField(max_length=3, blank=True)
+    source_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     stock = models.PositiveIntegerField(default=0)
     features = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to='products/')
-    reviews = models.ManyToManyField(
-        'Review', blank=True, related_name='products')
     images = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -88,11 +95,17 @@ class Review(models.Model):
         __str__(): Returns a string representation of the review, including the user's username and the product's name.
     """
     user = models.ForeignKey('auth.User', on_delete=models.CASCADE)
-    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='reviews')
     rating = models.PositiveSmallIntegerField(default=1)
     comment = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'created_at']),
+        ]
+
     def clean(self):
         if not (1 <= self.rating <= 5):
             raise ValidationError("Rating must be between 1 and 5.")
@@ -108,11 +121,12 @@ class Review(models.Model):
 
 class Cart(models.Model):
     """
-    Cart represents a shopping cart associated with a user or a session. It stores the user information and session key for managing the cart's contents.
+    Cart represents a shopping cart associated with a user or a session. It stores the user information and session key for managing the cart's contents. The time the cart was last used is kept to within an hour, so that `purge_carts` can delete the ones that have been abandoned.
 
     Attributes:
         user (User): The user associated with the cart, optional.
         session_key (str): A unique session identifier for the cart, optional.
+        updated_at (datetime): The timestamp when the cart was last used.
 
     Methods:
         __str__(): Returns a string representation of the cart, including the user and the label "Cart".
@@ -121,6 +135,12 @@ class Cart(models.Model):
         User, on_delete=models.CASCADE, null=True, blank=True)
     session_key = models.CharField(
         max_length=40, null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
 
     def __str__(self):
         return f"{self.user} - Cart"
@@ -147,6 +167,12 @@ class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['cart', 'product'], name='unique_cart_product'),
+        ]
+
     @property
     def total_price(self):
         return Decimal(self.product.price) * self.quantity
@@ -170,10 +196,19 @@ class Wishlist(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'product'], name='unique_wishlist_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.product}"
+
 
 class Order(models.Model):
     """
-    Order represents a customer's order, including the user who placed the order and the total price of the order. It tracks when the order was created and provides a way to retrieve the items associated with the order.
+    Order represents a customer's order, including the user who placed the order and the total price of the order. It tracks when the order was created and provides a way to retrieve the items associated with the order. Orders older than a retention period are moved out of the table by `archive_orders`.
 
     Attributes:
         user (User): The user who placed the order.
@@ -190,6 +225,12 @@ class Order(models.Model):
         max_digits=10, decimal_places=2, default=0.00)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Archiving and the sales rollups read orders by age.
+            models.Index(fields=['created_at']),
+        ]
+
     def __str__(self):
         return f"Order {self.id} - {self.user or 'Guest'} - ${self.total_price}"
 
@@ -199,14 +240,19 @@ class Order(models.Model):
 
 class OrderItem(models.Model):
     """
-    OrderItem represents an individual item within an order, linking a specific product to the order along with its quantity and price. It also allows for the storage of an optional image associated with the order item.
+    OrderItem represents an individual item within an order, along with its quantity and price. The product's name, SKU, price and image path are copied into the line at checkout, so order history reads as it was sold and renders from this table alone, whatever later happens to the product; the link to the product is kept for reporting and is cleared if the product is deleted.
 
     Attributes:
         order (Order): The order to which this item belongs.
-        product (Product): The product associated with this order item.
+        product (Product): The product ordered, optional once the product is deleted.
+        name (str): The name of the product at the time of the order.
+        sku (str): The SKU of the product at the time of the order.
         quantity (int): The quantity of the product in the order.
-        price (Decimal): The price of the product at the time of the order.
-        image (ImageField): An optional image file associated with the order item.
+        price (Decimal): The unit price of the product at the time of the order.
+        thumbnail (str): The storage path of the product's image at the time of the order, optional.
+
+    Properties:
+        thumbnail_url (str): The URL of the thumbnail, or an empty string when there is none.
 
     Methods:
         __str__(): Returns a string representation of the order item, including the product name, quantity, and price.
@@ -214,10 +260,16 @@ class OrderItem(models.Model):
 
     order = models.ForeignKey(
         Order, on_delete=models.CASCADE, related_name='items')
-    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
+    name = models.CharField(max_length=255)
+    sku = models.CharField(max_length=50)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
-    image = models.ImageField(upload_to="order_items/", blank=True, null=True)
+    thumbnail = models.CharField(max_length=255, blank=True)
+
+    @property
+    def thumbnail_url(self):
+        return default_storage.url(self.thumbnail) if self.thumbnail else ''
 
     def __str__(self):
         return f"{self.name} - Qty: {self.quantity} - Price: ${self.price}"
@@ -252,3 +304,206 @@ class UserProfile(models.Model):
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
+
+
+class StockReservation(models.Model):
+    """
+    StockReservation represents a time-limited hold on units of a product while a user checks out. Active holds are subtracted from the product's stock when computing availability, and expired ones are released by the `release_reservations` command.
+
+    Attributes:
+        product (Product): The product being held.
+        user (User): The user holding the stock.
+        quantity (int): The number of units held.
+        expires_at (datetime): The time after which the hold no longer counts against stock.
+        created_at (datetime): The timestamp when the hold was created.
+
+    Methods:
+        __str__(): Returns a string representation of the hold, including the product, quantity and expiry.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='reservations')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'expires_at']),
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.product} x{self.quantity} until {self.expires_at}"
+
+
+class DailyProductSales(models.Model):
+    """
+    DailyProductSales is a rollup of the units and revenue sold per product per day, maintained incrementally from `OrderItem` by the `rollup_sales` command so that reports never scan the order tables.
+
+    Attributes:
+        date (date): The day the orders were placed, in the site's time zone.
+        product (Product): The product sold.
+        units (int): The number of units sold that day.
+        revenue (Decimal): The revenue from those units.
+    """
+
+    date = models.DateField()
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'product'], name='unique_daily_product_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.product_id}: {self.units} units, ${self.revenue}"
+
+
+class DailyCategorySales(models.Model):
+    """
+    DailyCategorySales is a rollup of the units, revenue and number of orders per category per day, maintained alongside `DailyProductSales`.
+
+    Attributes:
+        date (date): The day the orders were placed, in the site's time zone.
+        category (Category): The category of the products sold.
+        units (int): The number of units sold that day.
+        revenue (Decimal): The revenue from those units.
+        orders (int): The number of orders containing products of the category.
+    """
+
+    date = models.DateField()
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'category'], name='unique_daily_category_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.category_id}: {self.units} units, ${self.revenue}"
+
+
+class RollupState(models.Model):
+    """
+    RollupState records how far an incremental rollup has got, as the `created_at` of the newest order it has processed.
+
+    Attributes:
+        name (str): The name of the rollup.
+        high_water_mark (datetime): The creation time of the newest processed order, or None before the first run.
+        updated_at (datetime): The timestamp of the last run.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} up to {self.high_water_mark}"
+
+
+class ProductRecommendation(models.Model):
+    """
+    ProductRecommendation stores one of the top-K "customers also bought" neighbours of a product, precomputed offline by the `build_recommendations` command from orders, wishlists and reviews.
+
+    Attributes:
+        product (Product): The product the recommendation is shown on.
+        recommended (Product): The recommended product.
+        score (float): The strength of the association, higher is stronger.
+        rank (int): The position of the recommendation, starting at 1.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'rank'], name='unique_product_recommendation_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.recommended_id} (#{self.rank})"
+
+
+class Task(models.Model):
+    """
+    Task is a call of a function decorated with `@task`, queued in the database by `.delay()` and run later by the `run_workers` command, so that request handlers don't wait for slow side effects.
+
+    Attributes:
+        name (str): The dotted path of the task function.
+        args (list): The positional arguments, as JSON.
+        kwargs (dict): The keyword arguments, as JSON.
+        status (str): Queued, running, done or failed.
+        attempts (int): The number of times the task has been started.
+        max_attempts (int): The number of attempts after which a failing task is given up.
+        run_at (datetime): The earliest time the task may run; pushed back after each failure.
+        locked_until (datetime): When a running task's worker is presumed dead and the task can be claimed again.
+        last_error (str): The traceback of the last failure.
+        created_at (datetime): The timestamp when the task was queued.
+        started_at (datetime): The timestamp when the last attempt started.
+        finished_at (datetime): The timestamp when the task succeeded or was given up.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField()
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest due task of a status.
+            models.Index(fields=['status', 'run_at']),
+            models.Index(fields=['status', 'finished_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class ExchangeRate(models.Model):
+    """
+    ExchangeRate holds how many units of a currency one unit of the shop's `CURRENCY` buys, for showing prices in that currency. The table is replaced from a rates file by `load_exchange_rates`, and every change moves the rates version that converted prices are cached under.
+
+    Attributes:
+        currency (str): The ISO 4217 code of the currency, unique.
+        rate (Decimal): Units of the currency per unit of the shop's currency.
+        updated_at (datetime): The timestamp when the rate was last changed.
+
+    Methods:
+        __str__(): Returns the currency and its rate.
+    """
+
+    currency = models.CharField(max_length=3, unique=True)
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.currency} {self.rate}"
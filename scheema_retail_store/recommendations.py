@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from .models import OrderItem, ProductRecommendation, Review, Wishlist
+
+
+def signals():
+    """
+    Returns the `(basket, product)` sources co-occurrences are counted in,
+    with the weight of each: products bought in the same order, and products
+    wishlisted or rated highly by the same user.
+    """
+    return [
+        (OrderItem.objects.filter(product__isnull=False).values_list('order_id', 'product_id'), 1.0),
+        (Wishlist.objects.values_list('user_id', 'product_id'), 0.5),
+        (Review.objects.filter(rating__gte=4).values_list('user_id', 'product_id'), 0.5),
+    ]
+
+
+def basket_pairs(baskets, products):
+    """
+    Returns two arrays holding every ordered pair of distinct products that
+    share a basket. `baskets` must be sorted and each basket's products
+    unique; the work is proportional to the sum of squared basket sizes.
+    """
+    _, starts, sizes = np.unique(baskets, return_index=True, return_counts=True)
+    row_start = np.repeat(starts, sizes)
+    row_size = np.repeat(sizes, sizes)
+
+    left = np.repeat(np.arange(len(products)), row_size)
+    offset = np.arange(len(left)) - np.repeat(np.cumsum(row_size) - row_size, row_size)
+    right = np.repeat(row_start, row_size) + offset
+
+    distinct = left != right
+    return products[left[distinct]], products[right[distinct]]
+
+
+def _load(rows, max_basket_size):
+    frame = pd.DataFrame.from_records(
+        rows.iterator(chunk_size=10000), columns=['basket', 'product']).drop_duplicates()
+    sizes = frame.groupby('basket')['product'].transform('size')
+    # One-product baskets say nothing, and huge ones (bulk buyers, prolific
+    # reviewers) would add a quadratic number of weak pairs.
+    frame = frame[(sizes > 1) & (sizes <= max_basket_size)].sort_values('basket')
+    return frame['basket'].to_numpy(np.int64), frame['product'].to_numpy(np.int64)
+
+
+def compute_recommendations(top_k=10, max_basket_size=50):
+    """
+    Builds the sparse item-item co-occurrence counts of `signals()` and
+    returns `(product, recommended, score, rank)` arrays holding the `top_k`
+    neighbours of every product. Scores are cosine similarities of the
+    weighted co-occurrence counts, so popular products do not dominate.
+
+    Pairs are encoded as single int64 keys and summed with `np.unique` and
+    `np.bincount`, so memory grows with the number of co-occurring pairs and
+    never with the square of the catalog size.
+    """
+    keys, key_weights, popularity = [], [], []
+    sources = [(*_load(rows, max_basket_size), weight) for rows, weight in signals()]
+    size = 1 + max((int(products.max()) for _, products, _ in sources if len(products)), default=0)
+
+    for baskets, products, weight in sources:
+        if not len(products):
+            continue
+        left, right = basket_pairs(baskets, products)
+        keys.append(left * size + right)
+        key_weights.append(np.full(len(left), weight))
+        popularity.append(np.bincount(products, minlength=size) * weight)
+
+    empty = np.array([], dtype=np.int64)
+    if not keys:
+        return empty, empty, np.array([]), empty
+
+    pair_keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate(key_weights))
+    popularity = np.sum(popularity, axis=0)
+
+    product, recommended = np.divmod(pair_keys, size)
+    score = counts / np.sqrt(popularity[product] * popularity[recommended])
+
+    order = np.lexsort((-score, product))
+    product, recommended, score = product[order], recommended[order], score[order]
+    _, first, group_sizes = np.unique(product, return_index=True, return_counts=True)
+    rank = np.arange(len(product)) - np.repeat(first, group_sizes) + 1
+
+    keep = rank <= top_k
+    return product[keep], recommended[keep], score[keep], rank[keep]
+
+
+def build_recommendations(top_k=10, max_basket_size=50, batch_size=5000):
+    """
+    Replaces the `ProductRecommendation` table with freshly computed
+    neighbours and returns the number of rows written.
+    """
+    product, recommended, score, rank = compute_recommendations(top_k, max_basket_size)
+
+    with transaction.atomic():
+        ProductRecommendation.objects.all().delete()
+        for start in range(0, len(product), batch_size):
+            end = start + batch_size
+            ProductRecommendation.objects.bulk_create([
+                ProductRecommendation(product_id=p, recommended_id=r, score=s, rank=k)
+                for p, r, s, k in zip(product[start:end].tolist(), recommended[start:end].tolist(),
+                                      score[start:end].tolist(), rank[start:end].tolist())
+            ])
+    return len(product)
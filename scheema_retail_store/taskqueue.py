@@ -0,0 +1,164 @@
+import importlib
+import logging
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Task name -> (function, options), filled in by `@task` as modules are imported.
+TASKS = {}
+DEFAULT_RETRY_DELAY = 30
+
+
+def task(func=None, *, max_attempts=3, retry_delay=DEFAULT_RETRY_DELAY):
+    """
+    Registers `func` as a background task and gives it a `delay(*args,
+    **kwargs)` method that queues a call and returns the `Task` row. The
+    arguments must be JSON serialisable. A failing call is retried up to
+    `max_attempts` times in all, `retry_delay` seconds after the first
+    failure and twice as long after each next one.
+    """
+    def register(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+        TASKS[name] = (func, {'max_attempts': max_attempts, 'retry_delay': retry_delay})
+        func.delay = lambda *args, **kwargs: enqueue(name, *args, **kwargs)
+        return func
+    return register(func) if func else register
+
+
+def enqueue(name, *args, **kwargs):
+    """
+    Queues a call of task `name`. The row is written in the caller's
+    transaction, so a task queued by a request that is rolled back never
+    runs. With `TASKS_EAGER` the call runs at once instead, for development.
+    """
+    func, options = resolve(name)
+    if settings.TASKS_EAGER:
+        func(*args, **kwargs)
+        return None
+    return Task.objects.create(name=name, args=list(args), kwargs=kwargs,
+                               max_attempts=options['max_attempts'], run_at=timezone.now())
+
+
+def resolve(name):
+    if name not in TASKS:
+        # Importing the task's module registers it.
+        importlib.import_module(name.rsplit('.', 1)[0])
+    return TASKS[name]
+
+
+def claim():
+    """
+    Marks the oldest due task as running and returns it, or returns `None`
+    when there is nothing to do. Running tasks whose lease has run out (their
+    worker died) are due again. Safe to call from many workers at once: the
+    conditional update lets exactly one of them win each task.
+    """
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    while True:
+        now = timezone.now()
+        due = Task.objects.filter(
+            Q(status=Task.QUEUED, run_at__lte=now) | Q(status=Task.RUNNING, locked_until__lt=now))
+        # On PostgreSQL, skip_locked keeps workers from queueing behind each
+        # other for the same row. SQLite can't lock rows, and a read inside a
+        # transaction there would fail to upgrade to the write under
+        # contention, so the conditional update alone settles it.
+        with transaction.atomic() if skip_locked else nullcontext():
+            candidates = due.order_by('run_at')
+            if skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            task_id = candidates.values_list('id', flat=True).first()
+            if task_id is None:
+                return None
+            claimed = due.filter(pk=task_id).update(
+                status=Task.RUNNING, attempts=F('attempts') + 1, started_at=now,
+                locked_until=now + timedelta(seconds=settings.TASK_LEASE_SECONDS))
+        if claimed:
+            return Task.objects.get(pk=task_id)
+
+
+def execute(task):
+    """
+    Runs a claimed task and records the outcome: done, queued again after a
+    back-off, or failed once it has used up its attempts.
+    """
+    retry_delay = DEFAULT_RETRY_DELAY
+    try:
+        func, options = resolve(task.name)
+        retry_delay = options['retry_delay']
+        func(*task.args, **task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if task.attempts >= task.max_attempts:
+            logger.error('Task %s %s failed for good:\n%s', task.pk, task.name, error)
+            changes = {'status': Task.FAILED, 'finished_at': timezone.now()}
+        else:
+            logger.warning('Task %s %s failed, will retry:\n%s', task.pk, task.name, error)
+            changes = {'status': Task.QUEUED, 'run_at': timezone.now() + timedelta(
+                seconds=retry_delay * 2 ** (task.attempts - 1))}
+        changes['last_error'] = error
+    else:
+        changes = {'status': Task.DONE, 'finished_at': timezone.now()}
+    Task.objects.filter(pk=task.pk).update(locked_until=None, **changes)
+    return changes['status']
+
+
+def run_pending(limit=None):
+    """
+    Runs due tasks in this thread until there are none left (or `limit` have
+    run) and returns the number run.
+    """
+    done = 0
+    while limit is None or done < limit:
+        task = claim()
+        if task is None:
+            break
+        execute(task)
+        done += 1
+    return done
+
+
+def purge_finished(older_than):
+    """
+    Deletes tasks that finished (successfully or not) more than `older_than`
+    ago and returns how many.
+    """
+    return Task.objects.filter(
+        status__in=[Task.DONE, Task.FAILED],
+        finished_at__lt=timezone.now() - older_than).delete()[0]
+
+
+def queue_stats(window=timedelta(hours=1)):
+    """
+    Returns the queue depth per status and per task, the age of the oldest
+    due task, and the mean wait and run times of the tasks finished within
+    `window`.
+    """
+    now = timezone.now()
+    by_status = dict(Task.objects.values_list('status').order_by().annotate(Count('id')))
+    waiting = Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+    oldest = waiting.aggregate(oldest=Min('run_at'))['oldest']
+    recent = Task.objects.filter(status=Task.DONE, finished_at__gte=now - window).values(
+        'name').order_by('name').annotate(
+        done=Count('id'), wait=Avg(F('started_at') - F('created_at')),
+        run=Avg(F('finished_at') - F('started_at')))
+
+    return {
+        'by_status': {status: by_status.get(status, 0) for status, label in Task.STATUS_CHOICES},
+        'queued_by_name': dict(waiting.values_list('name').order_by().annotate(Count('id'))),
+        'oldest_due_seconds': (now - oldest).total_seconds() if oldest else 0,
+        'recent': {
+            row['name']: {
+                'done': row['done'],
+                'mean_wait_seconds': row['wait'].total_seconds() if row['wait'] else 0,
+                'mean_run_seconds': row['run'].total_seconds() if row['run'] else 0,
+            }
+            for row in recent
+        },
+    }
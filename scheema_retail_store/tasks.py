@@ -0,0 +1,10 @@
+from django.core.files.storage import default_storage
+from .taskqueue import task
+
+
+@task
+def delete_stored_file(name):
+    """
+    Deletes a replaced upload from media storage.
+    """
+    default_storage.delete(name)
@@ -0,0 +1,82 @@
+import json
+import os
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import skipUnless
+from django.conf import settings
+
+RESULTS_FILE = Path(os.getenv(
+    'BENCHMARK_RESULTS', Path(settings.BASE_DIR) / '.benchmarks' / 'results.jsonl'))
+REPEATS = int(os.getenv('BENCHMARK_REPEATS', 5))
+
+# Benchmarks are slow and machine dependent, so they only run when asked for.
+benchmark = skipUnless(os.getenv('RUN_BENCHMARKS'),
+                       'set RUN_BENCHMARKS=1 to run benchmarks')
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_call(func, repeats=REPEATS, setup=None):
+    """
+    Runs `func` `repeats` times, calling `setup` untimed before each run, and
+    returns the durations in seconds.
+    """
+    timings = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def previous_result(name, scale):
+    if not RESULTS_FILE.exists():
+        return None
+
+    previous = None
+    with open(RESULTS_FILE, encoding='utf-8') as file:
+        for line in file:
+            result = json.loads(line)
+            if result['name'] == name and result['scale'] == scale:
+                previous = result
+    return previous
+
+
+def record_benchmark(name, scale, timings):
+    """
+    Appends a benchmark result to `RESULTS_FILE` so runs can be compared over
+    time, and prints it next to the previous result for the same benchmark.
+    """
+    result = {
+        'name': name,
+        'scale': scale,
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+        'min_ms': round(min(timings) * 1000, 3),
+        'repeats': len(timings),
+        'revision': _git_revision(),
+        'recorded_at': datetime.now(timezone.utc).isoformat(),
+    }
+    previous = previous_result(name, scale)
+
+    RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(RESULTS_FILE, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(result) + '\n')
+
+    trend = ''
+    if previous:
+        change = (result['median_ms'] - previous['median_ms']) / previous['median_ms'] * 100
+        trend = f" ({change:+.1f}% vs {previous['revision'] or 'previous run'})"
+    print(f"\n{name}[{scale}]: median {result['median_ms']} ms{trend}")
+    return result
@@ -0,0 +1,96 @@
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from scheema_retail_store.categories import reconcile_product_counts
+from scheema_retail_store.models import Cart, CartItem, Category, Order, OrderItem, Product, Review
+
+# Data sizes every query budget is checked at; the query count must not change between them.
+SCALES = (1, 10, 50)
+
+
+def seed_catalog(count, reviews_per_product=3, category=None):
+    """
+    Bulk-creates `count` more products, each with `reviews_per_product` reviews, in `category`
+    (a new category when not given). Returns the created products.
+    """
+    offset = Product.objects.count()
+    if category is None:
+        category, created = Category.objects.get_or_create(
+            slug='seeded', defaults={'name': 'Seeded'})
+
+    products = Product.objects.bulk_create([
+        Product(
+            name=f'Product {offset + i}',
+            slug=f'product-{offset + i}',
+            sku=f'SKU-{offset + i}',
+            description='A seeded product. ' * 20,
+            price=Decimal('9.99'),
+            category=category,
+            stock=100,
+            features="{'Brand': 'Seeded', 'Colour': '-'}",
+            image='products/0071.jpg',
+            images=['products/0071_a.jpg', 'products/0071_b.jpg'],
+        )
+        for i in range(count)
+    ])
+
+    if reviews_per_product:
+        reviewer, created = User.objects.get_or_create(username='reviewer')
+        Review.objects.bulk_create([
+            Review(user=reviewer, product=product,
+                   rating=1 + i % 5, comment='Seeded review')
+            for product in products
+            for i in range(reviews_per_product)
+        ])
+    reconcile_product_counts()
+    return products
+
+
+def fill_cart(user, products, quantity=2):
+    cart, created = Cart.objects.get_or_create(user=user)
+    CartItem.objects.bulk_create([
+        CartItem(cart=cart, product=product, quantity=quantity)
+        for product in products
+    ])
+    return cart
+
+
+def fill_session_cart(client, products, quantity=2):
+    session = client.session
+    cart = session.get('cart', {})
+    for product in products:
+        cart[str(product.id)] = {'quantity': quantity, 'name': product.name}
+    session['cart'] = cart
+    session.save()
+
+
+def create_orders(user, products, count, lines_per_order=3):
+    orders = Order.objects.bulk_create([
+        Order(user=user, total_price=Decimal('29.97')) for _ in range(count)
+    ])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=product, name=product.name, sku=product.sku,
+                  quantity=1, price=Decimal('9.99'), thumbnail='products/0071.jpg')
+        for i, order in enumerate(orders)
+        for product in (products[(i + j) % len(products)] for j in range(lines_per_order))
+    ])
+    return orders
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    PERFORMANCE_INSTRUMENTATION=False,
+)
+class StoreTestCase(TestCase):
+    """
+    Base test case rendering templates without a collected static manifest and
+    without the performance middleware. The cache is cleared before every test,
+    since per-product entries would otherwise outlive the rows they describe.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def create_user(self, username='shopper'):
+        return User.objects.create_user(username=username, password='not-a-real-password')
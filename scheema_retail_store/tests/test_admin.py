@@ -0,0 +1,85 @@
+from decimal import Decimal
+from unittest import mock
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from scheema_retail_store import admin
+from scheema_retail_store.caching import product_cache_key
+from scheema_retail_store.inventory import available_stock
+from scheema_retail_store.models import Product
+from .fixtures import StoreTestCase, seed_catalog
+
+
+class ProductAdminTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', password='not-a-real-password'))
+        self.products = seed_catalog(3, reviews_per_product=0)
+        self.selected = [product.pk for product in self.products[:2]]
+        self.url = reverse('admin:scheema_retail_store_product_changelist')
+
+    def run_action(self, action, **fields):
+        return self.client.post(self.url, {
+            'action': action, ACTION_CHECKBOX_NAME: self.selected, 'index': 0, **fields})
+
+    def test_restock_updates_selection_in_one_query(self):
+        available_stock(self.selected)
+        with CaptureQueriesContext(connection) as queries:
+            self.run_action('restock', quantity=5)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(list(Product.objects.order_by('id').values_list('stock', flat=True)),
+                         [105, 105, 100])
+        self.assertIsNone(cache.get(product_cache_key('availability', self.selected[0])))
+
+    def test_reprice_rounds_to_cents(self):
+        self.run_action('reprice', percent='-10')
+        self.assertEqual(list(Product.objects.order_by('id').values_list('price', flat=True)),
+                         [Decimal('8.99'), Decimal('8.99'), Decimal('9.99')])
+
+    def test_reprice_drops_source_amounts(self):
+        Product.objects.update(source_currency='KES', source_amount=Decimal('1296'))
+        self.run_action('reprice', percent='10')
+        self.assertEqual(list(Product.objects.order_by('id').values_list('source_amount', flat=True)),
+                         [None, None, Decimal('1296')])
+
+    def test_editing_the_price_drops_the_source_amount(self):
+        product = self.products[0]
+        Product.objects.filter(pk=product.pk).update(source_currency='KES', source_amount=Decimal('1296'))
+        url = reverse('admin:scheema_retail_store_product_change', args=[product.pk])
+        data = {field: getattr(product, field) for field in ('name', 'slug', 'sku', 'description', 'stock')}
+        response = self.client.post(url, {
+            **data, 'category': product.category_id, 'features': '',
+            'images': '["products/0071_a.jpg"]', 'price': '11.00',
+            'source_currency': 'KES', 'source_amount': '1296'})
+        self.assertEqual(response.status_code, 302)
+        product.refresh_from_db()
+        self.assertEqual((product.price, product.source_amount), (Decimal('11.00'), None))
+
+    def test_reprice_rerenders_tiles(self):
+        self.assertContains(self.client.get(reverse('home')), 'data-price="$9.99"', count=6)
+        self.run_action('reprice', percent='50')
+        page = self.client.get(reverse('home'))
+        self.assertContains(page, 'data-price="$14.99"', count=4)
+        self.assertContains(page, 'data-price="$9.99"', count=2)
+
+    def test_action_without_value_changes_nothing(self):
+        self.run_action('restock')
+        self.assertFalse(Product.objects.exclude(stock=100).exists())
+
+    def test_unfiltered_changelist_uses_estimated_count(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(admin.estimated_row_count(Product), 3)
+
+        with mock.patch.object(admin, 'EXACT_COUNT_BELOW', 1), \
+                mock.patch.object(admin, 'estimated_row_count', return_value=5000):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['cl'].result_count, 5000)
+
+        response = self.client.get(self.url, {'q': self.products[0].sku})
+        self.assertEqual(response.context['cl'].result_count, 1)
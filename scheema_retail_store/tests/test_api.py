@@ -0,0 +1,117 @@
+from decimal import Decimal
+from django.urls import reverse
+from scheema_retail_store.models import CartItem, Order, Product, StockReservation
+from .fixtures import StoreTestCase, fill_cart, seed_catalog
+
+
+class ProductAPITests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = seed_catalog(5, reviews_per_product=0)
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(name, args=args), params)
+
+    def test_pages_follow_the_cursor(self):
+        ids, after = [], None
+        while True:
+            params = {'limit': 2, 'fields': 'id'}
+            if after is not None:
+                params['after'] = after
+            page = self.get('api_product_list', **params).json()
+            ids.extend(row['id'] for row in page['results'])
+            after = page['next_after']
+            if after is None:
+                break
+        self.assertEqual(ids, [product.id for product in self.products])
+
+    def test_fields_are_renamed_once_each(self):
+        response = self.get('api_product_list', fields='category, name,category', limit=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{'category': 'seeded', 'name': 'Product 0'}])
+
+    def test_bad_parameters_are_rejected(self):
+        for params in ({'fields': 'name,secret'}, {'after': 'x'}, {'limit': '0'}):
+            response = self.get('api_product_list', **params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+    def test_product_detail(self):
+        product = self.products[0]
+        row = self.get('api_product_detail', product.slug, fields='sku,images,price').json()
+        self.assertEqual(set(row), {'sku', 'images', 'price'})
+        self.assertEqual(row['sku'], product.sku)
+        self.assertEqual(len(row['images']), 2)
+        self.assertTrue(all(image.startswith('/media/') for image in row['images']))
+
+        self.assertEqual(self.get('api_product_detail', 'missing').status_code, 404)
+
+
+class CartAPITests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product, self.other = seed_catalog(2, reviews_per_product=0)
+
+    def post(self, name, *args, **data):
+        return self.client.post(reverse(name, args=args), data)
+
+    def test_guest_adds_and_removes(self):
+        cart = self.post('api_cart_add', self.product.id, quantity=2).json()
+        self.assertEqual(cart['total_items'], 2)
+        self.assertEqual(Decimal(str(cart['total_cost'])), Decimal('19.98'))
+        self.assertEqual(cart['items'][0]['product']['slug'], self.product.slug)
+
+        self.assertEqual(self.post('api_cart_remove', self.product.id).json()['total_items'], 1)
+        self.post('api_cart_remove', self.product.id)
+        self.assertEqual(self.post('api_cart_remove', self.product.id).status_code, 404)
+
+    def test_add_checks_product_and_stock(self):
+        self.assertEqual(self.post('api_cart_add', 0).status_code, 404)
+        self.assertEqual(self.post('api_cart_add', self.product.id, quantity=0).status_code, 400)
+        response = self.post('api_cart_add', self.product.id, quantity=101)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'error': 'Only 100 left in stock.'})
+
+
+class CheckoutAPITests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product, = seed_catalog(1, reviews_per_product=0)
+        self.shopper = self.create_user()
+
+    def post(self, name):
+        return self.client.post(reverse(name))
+
+    def test_requires_a_signed_in_user(self):
+        self.assertEqual(self.post('api_checkout_start').status_code, 401)
+        self.assertEqual(self.post('api_checkout').status_code, 401)
+
+    def test_empty_cart(self):
+        self.client.force_login(self.shopper)
+        self.assertEqual(self.post('api_checkout_start').json(), {'error': 'Cart is empty.'})
+        self.assertEqual(self.post('api_checkout').status_code, 400)
+
+    def test_start_holds_stock_then_checkout_places_the_order(self):
+        self.client.force_login(self.shopper)
+        fill_cart(self.shopper, [self.product], quantity=3)
+
+        self.assertIn('reserved_until', self.post('api_checkout_start').json())
+        self.assertEqual(StockReservation.objects.get().quantity, 3)
+
+        response = self.post('api_checkout')
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(user=self.shopper)
+        self.assertEqual(response.json()['id'], order.id)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 97)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_checkout_fails_without_stock(self):
+        self.client.force_login(self.shopper)
+        fill_cart(self.shopper, [self.product], quantity=3)
+        Product.objects.filter(pk=self.product.pk).update(stock=2)
+
+        response = self.post('api_checkout')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'error': f'Not enough stock for products: {self.product.id}.'})
+        self.assertFalse(Order.objects.exists())
@@ -0,0 +1,167 @@
+from decimal import Decimal
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.test import Client, RequestFactory
+from django.urls import resolve, reverse
+from scheema_retail_store.currency import convert
+from scheema_retail_store.middleware import RateLimitMiddleware, take_token
+from scheema_retail_store.models import ExchangeRate, Product
+from scheema_retail_store.views import HOME_PRODUCT_FIELDS
+from .benchmarking import benchmark, record_benchmark, time_call
+from .fixtures import StoreTestCase, fill_cart, fill_session_cart, seed_catalog
+
+BENCHMARK_SCALES = (10, 100, 500)
+TEMPLATE_BENCHMARK_SCALES = (1000, 10000)
+# Buckets already in the cache when the rate limiter is timed.
+RATELIMIT_BENCHMARK_SCALES = (10, 1000, 10000)
+RATELIMIT_CALLS = 1000
+# Prices converted at once, as for a page of products.
+CURRENCY_BENCHMARK_SCALES = (100, 1000, 10000)
+
+
+@benchmark
+class ViewBenchmarks(StoreTestCase):
+    """
+    Times the busiest views at growing data sizes and records the results in
+    `RESULTS_FILE`. Run with `RUN_BENCHMARKS=1 pytest -s -k Benchmarks`.
+    """
+
+    def run_at_scales(self, name, grow, request, setup=None):
+        for scale in BENCHMARK_SCALES:
+            grow(scale)
+            request()
+            record_benchmark(name, scale, time_call(request, setup=setup))
+
+    def setUp(self):
+        super().setUp()
+        self.products = []
+
+    def seed_to(self, scale):
+        self.products.extend(seed_catalog(scale - len(self.products)))
+
+    def test_home(self):
+        self.run_at_scales('home', self.seed_to,
+                           lambda: self.client.get(reverse('home')))
+
+    def test_search(self):
+        self.run_at_scales('search', self.seed_to, lambda: self.client.get(
+            reverse('search'), {'q': 'Product 1'}))
+
+    def test_view_cart(self):
+        user = self.create_user()
+        self.client.force_login(user)
+
+        def grow(scale):
+            previous = len(self.products)
+            self.seed_to(scale)
+            fill_cart(user, self.products[previous:])
+
+        self.run_at_scales('view_cart', grow,
+                           lambda: self.client.get(reverse('view_cart')))
+
+    def test_place_order(self):
+        user = self.create_user()
+        self.client.force_login(user)
+
+        def refill():
+            fill_cart(user, self.products)
+
+        def grow(scale):
+            self.seed_to(scale)
+            refill()
+
+        self.run_at_scales('place_order', grow,
+                           lambda: self.client.get(reverse('place_order')), setup=refill)
+
+    def test_login_merge(self):
+        user = self.create_user()
+        fill_cart(user, seed_catalog(1))
+        guests = []
+
+        def new_guest():
+            guests.append(Client())
+            fill_session_cart(guests[-1], self.products)
+
+        def login():
+            return guests[-1].post(reverse('login'), {
+                'username': user.username, 'password': 'not-a-real-password'})
+
+        def grow(scale):
+            self.seed_to(scale)
+            new_guest()
+
+        self.run_at_scales('login_merge', grow, login, setup=new_guest)
+
+
+@benchmark
+class TemplateBenchmarks(StoreTestCase):
+    """
+    Times rendering the home page's product grid alone, with every fragment
+    rebuilt (cold) and with the tiles, menu and footer served from the cache
+    (warm). Run with `RUN_BENCHMARKS=1 pytest -s -k Benchmarks`.
+    """
+
+    def test_home_render(self):
+        template = get_template('stores/home.html')
+        request = self.client.get(reverse('home')).wsgi_request
+        for scale in TEMPLATE_BENCHMARK_SCALES:
+            seed_catalog(scale - Product.objects.count(), reviews_per_product=0)
+            context = {
+                'products': list(Product.objects.select_related('category').only(*HOME_PRODUCT_FIELDS)),
+                'wishlist_ids': set(),
+            }
+
+            def render():
+                template.render(context, request)
+
+            record_benchmark('home_render_cold', scale, time_call(render, setup=cache.clear))
+            render()
+            record_benchmark('home_render_warm', scale, time_call(render))
+
+
+@benchmark
+class RateLimitBenchmarks(StoreTestCase):
+    """
+    Times `RATELIMIT_CALLS` rate limit checks with more and more client
+    buckets in the cache: a limited view's check (take a token) and an
+    unlimited view's (one lookup). Divide by `RATELIMIT_CALLS` for the
+    overhead per request. Run with `RUN_BENCHMARKS=1 pytest -s -k Benchmarks`.
+    """
+
+    def request_for(self, path):
+        request = RequestFactory().get(path, REMOTE_ADDR='10.0.0.1')
+        request.resolver_match = resolve(path)
+        request.user = AnonymousUser()
+        return request
+
+    def test_checks(self):
+        middleware = RateLimitMiddleware(lambda request: None)
+        limited, unlimited = self.request_for(reverse('search')), self.request_for(reverse('home'))
+        # A burst that never runs out, so every call takes a token.
+        middleware.limits = {'search': (10 ** 9, 1)}
+
+        def check(request):
+            for _ in range(RATELIMIT_CALLS):
+                middleware.process_view(request, None, (), {})
+
+        for scale in RATELIMIT_BENCHMARK_SCALES:
+            for client in range(scale):
+                take_token(f'ratelimit:search:ip:10.1.{client}', 30, 60)
+            record_benchmark('ratelimit_limited_view', scale, time_call(lambda: check(limited)))
+            record_benchmark('ratelimit_unlimited_view', scale, time_call(lambda: check(unlimited)))
+
+
+@benchmark
+class CurrencyBenchmarks(StoreTestCase):
+    """
+    Times converting a page's prices into another currency and into the
+    shop's own. Run with `RUN_BENCHMARKS=1 pytest -s -k Benchmarks`.
+    """
+
+    def test_convert(self):
+        ExchangeRate.objects.create(currency='KES', rate=Decimal('129.70'))
+        for scale in CURRENCY_BENCHMARK_SCALES:
+            prices = [Decimal(f'{1 + i % 500}.99') for i in range(scale)]
+            record_benchmark('convert_prices', scale, time_call(lambda: convert(prices, 'KES')))
+            record_benchmark('convert_prices_base', scale, time_call(lambda: convert(prices, 'USD')))
@@ -0,0 +1,62 @@
+import io
+from decimal import Decimal
+from unittest.mock import patch
+from django.core.cache import cache
+from django.urls import reverse
+from scheema_retail_store.caching import product_cache_key
+from scheema_retail_store.catalog import apply_feed, read_feed
+from scheema_retail_store.inventory import available_stock
+from scheema_retail_store.models import Product
+from .fixtures import StoreTestCase, seed_catalog
+
+
+class UpdateCatalogTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.first, self.second, self.third = seed_catalog(3, reviews_per_product=0)
+
+    def apply(self, text, format='csv', **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return apply_feed(read_feed(io.StringIO(text), format), **kwargs)
+
+    def test_applies_only_changed_fields(self):
+        available_stock([self.first.id])
+        report = self.apply(
+            'sku,price,stock\n'
+            f'{self.first.sku},12.5,\n'
+            f'{self.second.sku},9.99,100\n'
+            f'{self.third.sku},,7\n'
+            'UNKNOWN,1,1\n'
+            f'{self.first.sku},abc,1\n', chunk_size=2)
+
+        self.assertEqual({key: report[key] for key in ('rows', 'updated', 'unchanged', 'unknown')},
+                         {'rows': 5, 'updated': 2, 'unchanged': 1, 'unknown': 1})
+        self.assertEqual([error.line for error in report['errors']], [6])
+        self.assertEqual(
+            list(Product.objects.order_by('id').values_list('price', 'stock')),
+            [(Decimal('12.50'), 100), (Decimal('9.99'), 100), (Decimal('9.99'), 7)])
+        self.assertIsNone(cache.get(product_cache_key('availability', self.first.id)))
+
+    def test_ndjson_dry_run_writes_nothing(self):
+        report = self.apply(
+            f'{{"sku": "{self.first.sku}", "stock": 1}}\n\nnot json\n',
+            format='ndjson', dry_run=True)
+
+        self.assertEqual(report['updated'], 1)
+        self.assertEqual(len(report['errors']), 1)
+        self.assertEqual(Product.objects.get(pk=self.first.pk).stock, 100)
+
+    def test_update_uses_one_diff_query_per_chunk(self):
+        feed = 'sku,price\n' + ''.join(f'{product.sku},1.00\n'
+                                       for product in (self.first, self.second, self.third))
+        # Per chunk: savepoint, diff, update, release.
+        with self.assertNumQueries(4):
+            self.apply(feed)
+
+    def test_new_prices_reach_tiles_cached_elsewhere(self):
+        self.assertIn('$9.99', self.client.get(reverse('home')).content.decode())
+
+        # As when the command's cache is not the web server's.
+        with patch('scheema_retail_store.catalog.invalidate_products'):
+            self.apply(f'sku,price\n{self.first.sku},12.50\n')
+        self.assertIn('$12.50', self.client.get(reverse('home')).content.decode())
@@ -0,0 +1,88 @@
+import time
+from io import StringIO
+from decimal import Decimal
+from unittest.mock import patch
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.urls import reverse
+from scheema_retail_store.categories import cached_categories, reconcile_product_counts
+from scheema_retail_store.models import Category, Product
+from .fixtures import StoreTestCase, seed_catalog
+
+
+class CategoryCountTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = seed_catalog(3, reviews_per_product=0)
+        self.seeded = Category.objects.get(slug='seeded')
+        self.other = Category.objects.create(name='Other')
+
+    def counts(self):
+        return dict(Category.objects.values_list('slug', 'product_count'))
+
+    def test_signals_keep_counts(self):
+        self.assertEqual(self.counts(), {'seeded': 3, 'other': 0})
+
+        Product.objects.create(name='New', slug='new', sku='NEW', description='', image='x.jpg',
+                               price=Decimal('1.00'), category=self.other)
+        self.assertEqual(self.counts(), {'seeded': 3, 'other': 1})
+
+        moved = self.products[0]
+        moved.category = self.other
+        moved.save()
+        self.assertEqual(self.counts(), {'seeded': 2, 'other': 2})
+
+        moved.delete()
+        self.assertEqual(self.counts(), {'seeded': 2, 'other': 1})
+
+    def test_reconcile_fixes_drift(self):
+        # Queryset updates skip the signals.
+        Product.objects.filter(pk=self.products[0].pk).update(category=self.other)
+        self.assertEqual(reconcile_product_counts(), {'seeded': (3, 2), 'other': (0, 1)})
+        self.assertEqual(reconcile_product_counts(), {})
+
+        Product.objects.update(category=self.seeded)
+        output = StringIO()
+        call_command('reconcile_categories', stdout=output)
+        self.assertIn('other: 1 -> 0', output.getvalue())
+
+    def test_category_list_is_cached_until_a_count_changes(self):
+        cached_categories()
+        with self.assertNumQueries(0):
+            categories = cached_categories()
+        self.assertEqual([(category.slug, category.product_count) for category in categories],
+                         [('other', 0), ('seeded', 3)])
+
+        self.products[0].delete()
+        self.assertEqual(cached_categories()[1].product_count, 2)
+
+    def test_counts_changed_by_another_process(self):
+        cached_categories()
+        # reconcile_categories runs with a cache of its own.
+        Product.objects.filter(pk=self.products[0].pk).update(category=self.other)
+        with patch('scheema_retail_store.caching.cache', LocMemCache('reconcile', {})):
+            reconcile_product_counts()
+        self.assertEqual(cached_categories()[1].product_count, 3)
+
+        # Once this process's cached version expires, the list is read again.
+        expired = time.time() + settings.LOCAL_CACHE_SECONDS + 1
+        with patch('django.core.cache.backends.locmem.time.time', return_value=expired):
+            self.assertEqual(cached_categories()[1].product_count, 2)
+
+    def test_saving_other_fields_skips_the_category_lookup(self):
+        product = self.products[0]
+        product.stock = 5
+        with self.assertNumQueries(1):
+            product.save(update_fields=['stock'])
+
+    def test_navigation_and_listing_show_counts(self):
+        page = self.client.get(reverse('category_list')).content.decode()
+        self.assertIn('Other</a>\n        (0)', page)
+        self.assertIn('(3)</span>', page)
+        # Both are listed, but the empty one is left out of the menu.
+        self.assertEqual(page.count(reverse('category_products', args=['seeded'])), 2)
+        self.assertEqual(page.count(reverse('category_products', args=['other'])), 1)
+
+        results = self.client.get(reverse('api_category_list')).json()['results']
+        self.assertEqual([result['product_count'] for result in results], [0, 3])
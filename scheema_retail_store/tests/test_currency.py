@@ -0,0 +1,123 @@
+import io
+import json
+import os
+import tempfile
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from scheema_retail_store import currency
+from scheema_retail_store.catalog import apply_feed, read_feed
+from scheema_retail_store.models import ExchangeRate, Product
+from .fixtures import StoreTestCase, seed_catalog
+
+
+class CurrencyTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product, = seed_catalog(1, reviews_per_product=0)
+        ExchangeRate.objects.create(currency='KES', rate=Decimal('129.70'))
+
+    def rates_file(self, data):
+        handle, path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(handle, 'w') as file:
+            json.dump(data, file)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def home(self):
+        return self.client.get(reverse('home')).content.decode()
+
+    def test_convert_rounds_to_cents(self):
+        prices = [Decimal('9.99'), Decimal('0.01'), Decimal('1234.50')]
+        self.assertEqual(currency.convert(prices, 'USD'), ['$9.99', '$0.01', '$1234.50'])
+        # 1295.703, 1.297 and 160114.65
+        self.assertEqual(currency.convert(prices, 'KES'),
+                         ['KSh 1295.70', 'KSh 1.30', 'KSh 160114.65'])
+        self.assertEqual(currency.convert([], 'KES'), [])
+
+    def test_shopper_chooses_a_currency(self):
+        self.assertIn('$9.99', self.home())
+
+        self.client.post(reverse('set_currency'), {'currency': 'KES'})
+        page = self.home()
+        self.assertIn('KSh 1295.70', page)
+        self.assertNotIn('$9.99', page)
+
+        # Currencies without a rate are ignored.
+        self.client.post(reverse('set_currency'), {'currency': 'EUR'})
+        self.assertIn('KSh 1295.70', self.home())
+
+    def test_tiles_follow_rate_and_price_changes(self):
+        self.client.post(reverse('set_currency'), {'currency': 'KES'})
+        self.assertIn('KSh 1295.70', self.home())
+
+        ExchangeRate.objects.update(rate=100)
+        # Updates skip the signals, so the cached tile still shows the old rate...
+        self.assertIn('KSh 1295.70', self.home())
+        # ...until the rates are replaced.
+        currency.replace_rates({'KES': Decimal(100)})
+        self.assertIn('KSh 999.00', self.home())
+
+        self.product.price = Decimal('5.00')
+        self.product.save()
+        self.assertIn('KSh 500.00', self.home())
+
+    def test_rates_loaded_by_another_process(self):
+        self.client.post(reverse('set_currency'), {'currency': 'KES'})
+        self.assertIn('KSh 1295.70', self.home())
+
+        # load_exchange_rates runs with a cache of its own.
+        with patch.object(currency, 'cache', LocMemCache('loader', {})):
+            currency.replace_rates({'KES': Decimal(100)})
+        self.assertIn('KSh 1295.70', self.home())
+
+        # Once this process's cached version expires, the table is read again.
+        expired = time.time() + settings.LOCAL_CACHE_SECONDS + 1
+        with patch('django.core.cache.backends.locmem.time.time', return_value=expired):
+            self.assertIn('KSh 999.00', self.home())
+
+    def test_load_exchange_rates(self):
+        path = self.rates_file({'base': 'USD', 'rates': {'EUR': 0.9, 'GBP': '0.79'}})
+        out = StringIO()
+        call_command('load_exchange_rates', path, stdout=out)
+        self.assertIn('Loaded 2 exchange rates against USD and removed 1', out.getvalue())
+        self.assertEqual(dict(ExchangeRate.objects.values_list('currency', 'rate')),
+                         {'EUR': Decimal('0.9'), 'GBP': Decimal('0.79')})
+        self.assertEqual(list(currency.exchange_rates()), ['USD', 'EUR', 'GBP'])
+
+    def test_load_rejects_bad_files(self):
+        for data in ({'base': 'EUR', 'rates': {'USD': 1.1}},
+                     {'base': 'USD', 'rates': {'KES': -1}},
+                     {'base': 'USD', 'rates': {'kes': 129}},
+                     ['USD']):
+            with self.assertRaises(CommandError):
+                call_command('load_exchange_rates', self.rates_file(data))
+        self.assertEqual(ExchangeRate.objects.get().rate, Decimal('129.70'))
+
+    def test_reprice_from_source_amounts(self):
+        Product.objects.filter(pk=self.product.pk).update(
+            source_currency='KES', source_amount=Decimal('975'))
+        self.assertEqual(currency.reprice_products(), [self.product.pk])
+        self.assertEqual(Product.objects.get(pk=self.product.pk).price, Decimal('7.52'))
+        # Already at the current rate.
+        self.assertEqual(currency.reprice_products(), [])
+
+    def test_reprice_leaves_prices_set_since(self):
+        Product.objects.filter(pk=self.product.pk).update(
+            source_currency='KES', source_amount=Decimal('975'))
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_feed(read_feed(io.StringIO(f'sku,price\n{self.product.sku},12.50\n'), 'csv'))
+
+        self.assertEqual(currency.reprice_products(), [])
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual((product.price, product.source_currency, product.source_amount),
+                         (Decimal('12.50'), '', None))
+
+    def test_parse_amount(self):
+        self.assertEqual(currency.parse_amount('KSh 1,250'), Decimal('1250.00'))
+        self.assertIsNone(currency.parse_amount('N/A'))
@@ -0,0 +1,68 @@
+import csv
+import gzip
+import io
+import json
+from datetime import date, datetime
+from django.urls import reverse
+from django.utils import timezone
+from scheema_retail_store.exports import export_rows, gzipped
+from scheema_retail_store.models import Order
+from .fixtures import StoreTestCase, create_orders, seed_catalog
+
+
+class ExportTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = seed_catalog(3, reviews_per_product=0)
+        self.staff = self.create_user('staff')
+        self.staff.is_staff = True
+        self.staff.save()
+        self.client.force_login(self.staff)
+
+    def export(self, name, **params):
+        response = self.client.get(reverse('export_data', args=[name]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_products_csv(self):
+        response, body = self.export('products')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="products.csv"')
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual([row['sku'] for row in rows], [product.sku for product in self.products])
+        self.assertEqual(rows[0]['category__name'], 'Seeded')
+
+    def test_order_items_gzipped_ndjson(self):
+        create_orders(self.staff, self.products, 2)
+        response, body = self.export('order-items', format='ndjson', gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['sku'], self.products[0].sku)
+
+        response, body = self.export('orders', since='2000-01-01', until='2000-12-31')
+        self.assertEqual(body.decode().splitlines(), ['id,created_at,user__username,total_price'])
+
+    def test_date_range_covers_whole_days(self):
+        orders = create_orders(self.staff, self.products, 3)
+        for order, moment in zip(orders, ('2024-12-31 23:59:59', '2025-01-31 23:59:59',
+                                          '2025-02-01 00:00:00')):
+            Order.objects.filter(pk=order.pk).update(
+                created_at=timezone.make_aware(datetime.fromisoformat(moment)))
+
+        columns, rows = export_rows('orders', since=date(2025, 1, 1), until=date(2025, 1, 31))
+        self.assertEqual([row[0] for row in rows], [orders[1].pk])
+        columns, rows = export_rows('order-items', since=date(2025, 1, 1))
+        self.assertEqual(len(list(rows)), 6)
+
+    def test_gzip_output_is_flushed_per_piece(self):
+        pieces = list(gzipped([b'a' * 100, b'b' * 100]))
+        self.assertEqual(gzip.decompress(b''.join(pieces[:2]) + pieces[2]), b'a' * 100 + b'b' * 100)
+        self.assertTrue(all(pieces[:2]))
+
+    def test_staff_only(self):
+        self.client.force_login(self.create_user())
+        response = self.client.get(reverse('export_data', args=['orders']))
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(reverse('export_data', args=['users'])).status_code, 404)
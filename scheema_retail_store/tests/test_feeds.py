@@ -0,0 +1,102 @@
+import csv
+import gzip
+import io
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from xml.etree import ElementTree
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from scheema_retail_store.feeds import build_product_feeds, build_sitemaps
+from scheema_retail_store.models import ExchangeRate, Product
+from .fixtures import StoreTestCase, seed_catalog
+
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+BASE_URL = 'https://shop.example'
+
+
+class FeedTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = override_settings(FEEDS_ROOT=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.products = seed_catalog(5, reviews_per_product=0)
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), 'rb') as file:
+            content = file.read()
+        with gzip.open(os.path.join(self.root, name + '.gz')) as file:
+            self.assertEqual(file.read(), content)
+        return content
+
+    def locations(self, name):
+        return [element.text for element in ElementTree.fromstring(self.read(name)).iter(f'{SITEMAP_NS}loc')]
+
+    def test_sitemaps_are_chunked(self):
+        self.assertEqual(build_sitemaps(self.root, BASE_URL, size=2), 5)
+        self.assertEqual(self.locations('sitemap.xml'), [
+            f'{BASE_URL}/sitemap-pages.xml', f'{BASE_URL}/sitemap-products-1.xml',
+            f'{BASE_URL}/sitemap-products-2.xml', f'{BASE_URL}/sitemap-products-3.xml'])
+        self.assertEqual(self.locations('sitemap-products-3.xml'),
+                         [f'{BASE_URL}/product/product-4/'])
+        self.assertIn(f'{BASE_URL}/category/seeded/', self.locations('sitemap-pages.xml'))
+
+        # A smaller catalog leaves no stale chunks behind.
+        Product.objects.filter(pk__in=[product.pk for product in self.products[2:]]).delete()
+        build_sitemaps(self.root, BASE_URL, size=2)
+        self.assertEqual(len(self.locations('sitemap.xml')), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'sitemap-products-2.xml.gz')))
+
+    def test_product_feeds(self):
+        Product.objects.filter(pk=self.products[0].pk).update(stock=0, name='Fish & Chips')
+        self.assertEqual(build_product_feeds(self.root, BASE_URL), 5)
+
+        channel = ElementTree.fromstring(self.read('products.xml')).find('channel')
+        item = channel.find('item')
+        values = {element.tag.split('}')[1]: element.text for element in item}
+        self.assertEqual(values['title'], 'Fish & Chips')
+        self.assertEqual(values['price'], '9.99 USD')
+        self.assertEqual(values['availability'], 'out_of_stock')
+        self.assertEqual(values['link'], f'{BASE_URL}/product/product-0/')
+        self.assertTrue(values['image_link'].startswith(f'{BASE_URL}/media/products/0071'))
+        self.assertEqual(len(channel.findall('item')), 5)
+
+        rows = list(csv.DictReader(io.StringIO(self.read('products.csv').decode())))
+        self.assertEqual([row['id'] for row in rows], [f'SKU-{i}' for i in range(5)])
+        self.assertEqual(rows[1]['quantity'], '100')
+
+    @override_settings(FEED_CURRENCY='KES')
+    def test_feed_prices_are_converted(self):
+        ExchangeRate.objects.create(currency='KES', rate=Decimal('129.70'))
+        build_product_feeds(self.root, BASE_URL)
+        rows = list(csv.DictReader(io.StringIO(self.read('products.csv').decode())))
+        self.assertEqual(rows[0]['price'], '1295.70 KES')
+
+    @override_settings(FEED_CURRENCY='EUR')
+    def test_feed_currency_needs_a_rate(self):
+        with self.assertRaises(CommandError):
+            call_command('build_feeds', '--output-dir', self.root, stdout=io.StringIO())
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_served_precompressed(self):
+        call_command('build_feeds', base_url=BASE_URL, stdout=io.StringIO())
+
+        response = self.client.get('/sitemap.xml', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)),
+                         self.read('sitemap.xml'))
+
+        response = self.client.get('/feeds/products.csv')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), self.read('products.csv'))
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        response = self.client.get('/feeds/products.csv', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/feeds/other.csv').status_code, 404)
+        self.assertEqual(self.client.get('/sitemap-products-9.xml').status_code, 404)
@@ -0,0 +1,74 @@
+import time
+from unittest.mock import patch
+from django.conf import settings
+from django.db.models.functions import Now
+from django.template import engines
+from django.test import override_settings
+from django.urls import reverse
+from scheema_retail_store.caching import cache_is_shared, invalidated_timeout
+from scheema_retail_store.models import Category, Product
+from .fixtures import StoreTestCase, seed_catalog
+
+
+class FragmentCacheTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product, = seed_catalog(1, reviews_per_product=0)
+
+    def home(self):
+        return self.client.get(reverse('home')).content.decode()
+
+    def test_templates_are_parsed_once(self):
+        loader, = engines['django'].engine.template_loaders
+        self.assertEqual(type(loader).__module__, 'django.template.loaders.cached')
+
+    def test_tiles_are_rebuilt_when_the_product_changes(self):
+        self.assertIn('Product 0', self.home())
+
+        # An update that leaves the version alone still gets the cached tile...
+        Product.objects.filter(pk=self.product.pk).update(name='Renamed')
+        self.assertNotIn('Renamed', self.home())
+
+        # ...but a new version is seen by every process, although nothing was
+        # dropped from their caches.
+        Product.objects.filter(pk=self.product.pk).update(updated_at=Now())
+        self.assertIn('Renamed', self.home())
+
+    def test_category_change_rebuilds_menu_and_tiles(self):
+        self.assertIn('Seeded', self.home())
+        with self.assertNumQueries(1):
+            self.home()
+
+        category = Category.objects.get(slug='seeded')
+        category.name = 'Gadgets'
+        category.save()
+        page = self.home()
+        self.assertIn(f'href="{reverse("category_products", args=["seeded"])}"', page)
+        self.assertEqual(page.count('Gadgets'), 2)
+
+    def test_per_process_caches_keep_entries_briefly(self):
+        self.assertFalse(cache_is_shared())
+        self.assertEqual(invalidated_timeout(3600), 60)
+        self.assertEqual(invalidated_timeout(None), 60)
+        self.assertEqual(invalidated_timeout(30), 30)
+
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            self.assertTrue(cache_is_shared())
+            self.assertEqual(invalidated_timeout(3600), 3600)
+
+    def test_quick_view_follows_changes_made_elsewhere(self):
+        url = reverse('api_product_quick_view', args=[self.product.id])
+        self.assertEqual(self.client.get(url).json()['name'], 'Product 0')
+
+        # Dropped on save, in this process's cache...
+        self.product.name = 'Saved'
+        self.product.save()
+        self.assertEqual(self.client.get(url).json()['name'], 'Saved')
+
+        # ...while a change the cache never hears of waits for it to expire.
+        Product.objects.filter(pk=self.product.pk).update(name='Elsewhere')
+        self.assertEqual(self.client.get(url).json()['name'], 'Saved')
+        expired = time.time() + settings.LOCAL_CACHE_SECONDS + 1
+        with patch('django.core.cache.backends.locmem.time.time', return_value=expired):
+            self.assertEqual(self.client.get(url).json()['name'], 'Elsewhere')
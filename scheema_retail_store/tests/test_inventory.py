@@ -0,0 +1,58 @@
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from scheema_retail_store.inventory import InsufficientStock, available_stock, release_expired, reserve
+from scheema_retail_store.models import CartItem, Order, Product, StockReservation
+from .fixtures import StoreTestCase, fill_cart, seed_catalog
+
+
+class InventoryTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = seed_catalog(1, reviews_per_product=0)[0]
+        Product.objects.filter(pk=self.product.pk).update(stock=3)
+        self.shopper = self.create_user()
+        self.other = self.create_user('other')
+
+    def test_holds_count_against_availability(self):
+        reserve(self.other, {self.product.id: 2})
+        self.assertEqual(available_stock([self.product.id]), {self.product.id: 1})
+
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve(self.shopper, {self.product.id: 2})
+        self.assertEqual(raised.exception.shortages, {self.product.id: 1})
+
+    def test_expired_holds_are_released(self):
+        reserve(self.other, {self.product.id: 3}, ttl=timedelta(minutes=-1))
+        self.assertEqual(release_expired(), 1)
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(available_stock([self.product.id]), {self.product.id: 3})
+
+    def test_add_to_cart_checks_stock(self):
+        self.client.force_login(self.shopper)
+        fill_cart(self.shopper, [self.product], quantity=3)
+
+        self.client.get(reverse('add_to_cart', args=[self.product.id]))
+        self.assertEqual(CartItem.objects.get(product=self.product).quantity, 3)
+
+    def test_place_order_takes_stock_and_drops_holds(self):
+        self.client.force_login(self.shopper)
+        fill_cart(self.shopper, [self.product], quantity=2)
+        reserve(self.shopper, {self.product.id: 2})
+
+        self.client.get(reverse('place_order'))
+        self.assertEqual(Order.objects.filter(user=self.shopper).count(), 1)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 1)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_place_order_fails_when_held_by_others(self):
+        self.client.force_login(self.shopper)
+        fill_cart(self.shopper, [self.product], quantity=2)
+        StockReservation.objects.create(
+            product=self.product, user=self.other, quantity=2,
+            expires_at=timezone.now() + timedelta(minutes=5))
+
+        self.client.get(reverse('place_order'))
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 3)
+        self.assertEqual(CartItem.objects.get(product=self.product).quantity, 2)
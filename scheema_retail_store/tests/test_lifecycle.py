@@ -0,0 +1,131 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from scheema_retail_store import lifecycle
+from scheema_retail_store.analytics import rollup_sales
+from scheema_retail_store.models import Cart, CartItem, Order, OrderItem, RollupState
+from .fixtures import StoreTestCase, create_orders, fill_cart, seed_catalog
+
+
+class PurgeTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = seed_catalog(2, reviews_per_product=0)
+
+    def test_abandoned_carts_are_deleted_in_batches(self):
+        kept = fill_cart(self.create_user('recent'), self.products)
+        for index in range(3):
+            fill_cart(self.create_user(f'gone{index}'), self.products)
+        Cart.objects.create(session_key='guest')
+        Cart.objects.exclude(pk=kept.pk).update(updated_at=timezone.now() - timedelta(days=90))
+
+        self.assertEqual(lifecycle.purge_carts(timedelta(days=60), batch_size=2), 4)
+        self.assertEqual(list(Cart.objects.values_list('pk', flat=True)), [kept.pk])
+        self.assertEqual(CartItem.objects.count(), 2)
+
+    def test_using_an_old_cart_keeps_it(self):
+        user = self.create_user()
+        cart = fill_cart(user, self.products[:1])
+        Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now() - timedelta(days=90))
+        self.client.force_login(user)
+
+        self.client.get(reverse('add_to_cart', args=[self.products[1].id]))
+        self.assertGreater(Cart.objects.get(pk=cart.pk).updated_at, timezone.now() - timedelta(hours=1))
+        self.assertEqual(lifecycle.purge_carts(timedelta(days=60)), 0)
+
+    def test_expired_sessions_are_deleted(self):
+        for expiry in (-60, -60, 3600):
+            session = SessionStore()
+            session.set_expiry(expiry)
+            session['cart'] = {}
+            session.save()
+
+        self.assertEqual(lifecycle.purge_sessions(batch_size=1), 2)
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('purge_carts', '--days', '30', stdout=out)
+        self.assertIn('Deleted 0 abandoned carts and 0 expired sessions', out.getvalue())
+
+
+class ArchiveTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = seed_catalog(3, reviews_per_product=0)
+        self.user = self.create_user()
+        self.old = create_orders(self.user, self.products, 5, lines_per_order=2)
+        Order.objects.filter(pk__in=[order.pk for order in self.old]).update(
+            created_at=timezone.now() - timedelta(days=400))
+        self.recent = create_orders(self.user, self.products, 2, lines_per_order=2)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def read_archive(self, path):
+        with gzip.open(path, 'rt') as file:
+            return [json.loads(line) for line in file]
+
+    def test_old_orders_move_to_the_archive(self):
+        rollup_sales()
+        result = lifecycle.archive_orders(timezone.now() - timedelta(days=365), self.directory,
+                                          batch_size=2)
+        self.assertEqual((result['orders'], result['items']), (5, 10))
+
+        archived = self.read_archive(result['path'])
+        self.assertEqual([order['id'] for order in archived], [order.pk for order in self.old])
+        self.assertEqual(archived[0]['user__username'], 'shopper')
+        self.assertEqual(archived[0]['total_price'], '29.97')
+        self.assertEqual(archived[0]['items'][0]['sku'], self.products[0].sku)
+        self.assertEqual(archived[0]['items'][0]['price'], '9.99')
+
+        self.assertEqual(sorted(Order.objects.values_list('pk', flat=True)),
+                         [order.pk for order in self.recent])
+        self.assertEqual(OrderItem.objects.count(), 4)
+        self.assertEqual(os.listdir(self.directory), [os.path.basename(result['path'])])
+
+    def test_orders_wait_for_the_rollups(self):
+        before = timezone.now() - timedelta(days=365)
+        self.assertIsNone(lifecycle.archive_orders(before, self.directory)['cutoff'])
+
+        rollup_sales()
+        RollupState.objects.update(high_water_mark=timezone.now() - timedelta(days=375))
+        Order.objects.filter(pk__in=[order.pk for order in self.old[2:]]).update(
+            created_at=timezone.now() - timedelta(days=370))
+
+        result = lifecycle.archive_orders(before, self.directory)
+        self.assertEqual(result['orders'], 2)
+        self.assertEqual(Order.objects.count(), 5)
+
+    def test_dry_run_deletes_nothing(self):
+        rollup_sales()
+        out = StringIO()
+        call_command('archive_orders', '--months', '12', '--dry-run',
+                     '--output-dir', self.directory, stdout=out)
+        self.assertIn('Would archive 5 orders with 10 items', out.getvalue())
+        self.assertEqual(Order.objects.count(), 7)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_months_before(self):
+        moment = datetime(2024, 3, 31, 12, tzinfo=dt_timezone.utc)
+        self.assertEqual(lifecycle.months_before(moment, 1), moment.replace(month=2, day=29))
+        self.assertEqual(lifecycle.months_before(moment, 15), moment.replace(year=2022, month=12))
+
+
+class CompactTests(TransactionTestCase):
+    def test_compact_reports_the_size(self):
+        size, free = lifecycle.database_size()
+        self.assertGreater(size, 0)
+        out = StringIO()
+        call_command('compact_db', stdout=out)
+        self.assertIn('reclaimed', out.getvalue())
+        self.assertEqual(lifecycle.database_size()[1], 0)
@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from scheema_retail_store.media import IMMUTABLE, REVALIDATE, build_manifest
+from .fixtures import StoreTestCase
+
+IMAGE = bytes(range(256)) * 4
+
+
+class MediaTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.root, 'products'))
+        for name in ('products/a.jpg', 'profile_images/me.jpg'):
+            os.makedirs(os.path.dirname(os.path.join(self.root, name)), exist_ok=True)
+            with open(os.path.join(self.root, name), 'wb') as file:
+                file.write(IMAGE)
+
+        settings = override_settings(MEDIA_ROOT=self.root, MEDIA_ACCEL_REDIRECT='',
+                                     MEDIA_MANIFEST_PATH=os.path.join(self.root, 'manifest.json'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        build_manifest()
+        self.url = default_storage.url('products/a.jpg')
+
+    def test_fingerprinted_url_is_cached_forever(self):
+        self.assertRegex(self.url, r'^/media/products/a\.[0-9a-f]{12}\.jpg$')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), IMAGE)
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        self.assertEqual(response['Content-Length'], str(len(IMAGE)))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(IMAGE)}')
+        self.assertEqual(b''.join(response.streaming_content), IMAGE[10:20])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), IMAGE[-5:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(IMAGE)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_unlisted_and_changed_files_are_revalidated(self):
+        self.assertEqual(default_storage.url('profile_images/me.jpg'), '/media/profile_images/me.jpg')
+        response = self.client.get('/media/profile_images/me.jpg')
+        self.assertEqual(response['Cache-Control'], REVALIDATE)
+
+        with open(os.path.join(self.root, 'products/a.jpg'), 'ab') as file:
+            file.write(b'more')
+        self.assertEqual(self.client.get(self.url)['Cache-Control'], REVALIDATE)
+
+    def test_paths_outside_media_root_are_not_served(self):
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/products/').status_code, 404)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/')
+    def test_accel_redirect_hands_the_file_to_nginx(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/products/a.jpg')
+        self.assertEqual(response.content, b'')
@@ -0,0 +1,32 @@
+from django.urls import reverse
+from scheema_retail_store.models import Order, OrderItem, Product
+from .fixtures import StoreTestCase, fill_cart, seed_catalog
+
+
+class OrderSnapshotTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = seed_catalog(1, reviews_per_product=0)[0]
+        self.shopper = self.create_user()
+        self.client.force_login(self.shopper)
+        fill_cart(self.shopper, [self.product], quantity=2)
+        self.client.get(reverse('place_order'))
+        self.item = OrderItem.objects.get(order__user=self.shopper)
+
+    def test_lines_copy_the_product(self):
+        self.assertEqual((self.item.name, self.item.sku, self.item.price),
+                         (self.product.name, self.product.sku, self.product.price))
+        self.assertEqual(self.item.thumbnail, self.product.image.name or '')
+        self.assertEqual(str(self.item), f'{self.product.name} - Qty: 2 - Price: ${self.product.price}')
+
+    def test_history_outlives_product_changes(self):
+        Product.objects.filter(pk=self.product.pk).update(name='Renamed', price=1)
+        page = self.client.get(reverse('dashboard')).content.decode()
+        self.assertIn(self.product.name, page)
+        self.assertNotIn('Renamed', page)
+
+        self.product.delete()
+        self.item.refresh_from_db()
+        self.assertIsNone(self.item.product_id)
+        self.assertEqual(Order.objects.get().items.get().sku, self.product.sku)
+        self.assertIn(self.product.sku, self.client.get(reverse('dashboard')).content.decode())
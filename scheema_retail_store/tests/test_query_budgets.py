@@ -0,0 +1,222 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from scheema_retail_store.models import Cart, CartItem, Review, Wishlist
+from .fixtures import SCALES, StoreTestCase, create_orders, fill_cart, fill_session_cart, seed_catalog
+
+
+class QueryBudgetTests(StoreTestCase):
+    """
+    Every view must issue the same number of queries whatever the amount of
+    data behind it, and no more than its budget.
+    """
+
+    def count_queries(self, request):
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        self.assertLess(response.status_code, 400)
+        return len(queries)
+
+    def assertQueryBudget(self, budget, grow, request, warm_up=True):
+        """
+        Calls `grow(scale)` to bring the data up to each of `SCALES`, then
+        counts the queries `request()` issues at that size.
+        """
+        counts = {}
+        for scale in SCALES:
+            grow(scale)
+            if warm_up:
+                request()
+            counts[scale] = self.count_queries(request)
+
+        self.assertEqual(len(set(counts.values())), 1,
+                         f'Query count grows with data size: {counts}')
+        self.assertLessEqual(counts[SCALES[0]], budget,
+                             f'Query budget of {budget} exceeded: {counts}')
+
+    def setUp(self):
+        super().setUp()
+        self.products = []
+
+    def seed_to(self, scale, reviews_per_product=3):
+        created = seed_catalog(scale - len(self.products),
+                               reviews_per_product=reviews_per_product)
+        self.products.extend(created)
+        return created
+
+    def add_reviews(self, product, total):
+        reviewer = Review.objects.filter(product=product).first().user
+        existing = product.reviews.count()
+        Review.objects.bulk_create([
+            Review(user=reviewer, product=product, rating=5)
+            for _ in range(total - existing)
+        ])
+
+    def test_home(self):
+        self.assertQueryBudget(
+            1, self.seed_to, lambda: self.client.get(reverse('home')))
+
+    def test_home_authenticated_with_wishlist(self):
+        user = self.create_user()
+        self.client.force_login(user)
+
+        def grow(scale):
+            Wishlist.objects.bulk_create([
+                Wishlist(user=user, product=product) for product in self.seed_to(scale)])
+
+        # Session, user, cart count and wishlist membership.
+        self.assertQueryBudget(5, grow, lambda: self.client.get(reverse('home')))
+
+    def test_product_detail(self):
+        def grow(scale):
+            # More reviews on the same product at each scale.
+            if not self.products:
+                self.seed_to(1, reviews_per_product=scale)
+            else:
+                self.add_reviews(self.products[0], scale)
+
+        # The product, its review stats and its precomputed recommendations.
+        self.assertQueryBudget(3, grow, lambda: self.client.get(
+            reverse('product_detail', args=[self.products[0].slug])))
+
+    def test_product_detail_authenticated(self):
+        user = self.create_user()
+        self.client.force_login(user)
+
+        def grow(scale):
+            self.seed_to(scale)
+            fill_cart(user, self.products[-1:])
+
+        self.assertQueryBudget(7, grow, lambda: self.client.get(
+            reverse('product_detail', args=[self.products[0].slug])))
+
+    def test_category_products(self):
+        self.assertQueryBudget(2, self.seed_to, lambda: self.client.get(
+            reverse('category_products', args=['seeded'])))
+
+    def test_search(self):
+        self.assertQueryBudget(1, self.seed_to, lambda: self.client.get(
+            reverse('search'), {'q': 'Product'}))
+
+    def test_view_cart_session(self):
+        def grow(scale):
+            fill_session_cart(self.client, self.seed_to(scale))
+
+        self.assertQueryBudget(2, grow, lambda: self.client.get(reverse('view_cart')))
+
+    def test_view_cart_authenticated(self):
+        user = self.create_user()
+        self.client.force_login(user)
+
+        def grow(scale):
+            fill_cart(user, self.seed_to(scale))
+
+        self.assertQueryBudget(5, grow, lambda: self.client.get(reverse('view_cart')))
+
+    def test_add_to_cart_authenticated(self):
+        user = self.create_user()
+        self.client.force_login(user)
+
+        def grow(scale):
+            fill_cart(user, self.seed_to(scale)[1:])
+
+        self.assertQueryBudget(6, grow, lambda: self.client.get(
+            reverse('add_to_cart', args=[self.products[0].id])))
+
+    def test_remove_from_cart_authenticated(self):
+        user = self.create_user()
+        self.client.force_login(user)
+
+        def grow(scale):
+            fill_cart(user, self.seed_to(scale), quantity=10)
+
+        self.assertQueryBudget(4, grow, lambda: self.client.get(
+            reverse('remove_from_cart', args=[self.products[0].id])))
+
+    def test_login_merges_session_cart(self):
+        user = self.create_user()
+        fill_cart(user, self.seed_to(1))
+
+        def grow(scale):
+            # A fresh guest each time, whose session cart covers the whole catalog.
+            self.seed_to(scale)
+            self.guest = Client()
+            fill_session_cart(self.guest, self.products)
+
+        # Session rotation and last_login, then one bulk upsert for the cart;
+        # no profile writes.
+        self.assertQueryBudget(18, grow, lambda: self.guest.post(reverse('login'), {
+            'username': 'shopper', 'password': 'not-a-real-password'}), warm_up=False)
+        self.assertEqual(user.cart_set.get().items.count(), len(self.products))
+
+    def test_place_order(self):
+        user = self.create_user()
+        self.client.force_login(user)
+
+        def grow(scale):
+            self.seed_to(scale)
+            fill_cart(user, self.products)
+
+        # Includes locking the products, reading other shoppers' holds, the
+        # stock decrement and dropping the shopper's own holds.
+        self.assertQueryBudget(13, grow, lambda: self.client.get(
+            reverse('place_order')), warm_up=False)
+
+    def test_dashboard(self):
+        user = self.create_user()
+        self.client.force_login(user)
+
+        def grow(scale):
+            create_orders(user, self.seed_to(scale), scale)
+
+        self.assertQueryBudget(5, grow, lambda: self.client.get(reverse('dashboard')))
+
+    def test_api_product_list(self):
+        self.assertQueryBudget(1, self.seed_to, lambda: self.client.get(
+            reverse('api_product_list'), {'limit': 100}))
+
+    def test_api_cart_authenticated(self):
+        user = self.create_user()
+        self.client.force_login(user)
+
+        def grow(scale):
+            fill_cart(user, self.seed_to(scale))
+
+        self.assertQueryBudget(4, grow, lambda: self.client.get(reverse('api_cart')))
+
+    def login_admin(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='not-a-real-password'))
+
+    def test_admin_product_changelist(self):
+        self.login_admin()
+        # Session, user, count, page, and the categories listed by the filter.
+        self.assertQueryBudget(7, self.seed_to, lambda: self.client.get(
+            reverse('admin:scheema_retail_store_product_changelist')))
+
+    def test_admin_review_changelist(self):
+        self.login_admin()
+        self.assertQueryBudget(7, self.seed_to, lambda: self.client.get(
+            reverse('admin:scheema_retail_store_review_changelist')))
+
+    def test_admin_cart_item_changelist(self):
+        self.login_admin()
+
+        def grow(scale):
+            for product in self.seed_to(scale):
+                cart = Cart.objects.create(user=self.create_user(f'shopper-{product.id}'))
+                CartItem.objects.create(cart=cart, product=product)
+
+        self.assertQueryBudget(6, grow, lambda: self.client.get(
+            reverse('admin:scheema_retail_store_cartitem_changelist')))
+
+    def test_admin_order_item_changelist(self):
+        self.login_admin()
+        user = self.create_user()
+
+        def grow(scale):
+            create_orders(user, self.seed_to(scale), scale)
+
+        self.assertQueryBudget(6, grow, lambda: self.client.get(
+            reverse('admin:scheema_retail_store_orderitem_changelist')))
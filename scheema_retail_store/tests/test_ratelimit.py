@@ -0,0 +1,45 @@
+from django.test import override_settings
+from django.urls import reverse
+from scheema_retail_store.middleware import take_token
+from .fixtures import StoreTestCase, seed_catalog
+
+
+@override_settings(RATELIMITS={'search': (2, 60), 'api_product_list': (1, 60)})
+class RateLimitTests(StoreTestCase):
+    def search(self, **headers):
+        return self.client.get(reverse('search'), {'q': 'x'}, **headers)
+
+    def test_bucket_refills_over_time(self):
+        self.assertEqual([take_token('bucket', 2, 60, now=0) for _ in range(3)], [0, 0, 30])
+        self.assertEqual(take_token('bucket', 2, 60, now=20), 10)
+        self.assertEqual(take_token('bucket', 2, 60, now=30), 0)
+
+    def test_limited_view_returns_retry_after(self):
+        self.assertEqual([self.search().status_code for _ in range(2)], [200, 200])
+        response = self.search()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+        # Other clients and other views are unaffected.
+        self.assertEqual(self.search(REMOTE_ADDR='10.0.0.2').status_code, 200)
+        self.assertEqual(self.client.get(reverse('home')).status_code, 200)
+
+    def test_signed_in_users_have_their_own_bucket(self):
+        for _ in range(2):
+            self.search()
+        self.client.force_login(self.create_user())
+        self.assertEqual(self.search().status_code, 200)
+
+    def test_api_gets_json_error(self):
+        seed_catalog(1, reviews_per_product=0)
+        self.client.get(reverse('api_product_list'))
+        response = self.client.get(reverse('api_product_list'))
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('error', response.json())
+
+    @override_settings(RATELIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR')
+    def test_client_address_from_proxy_header(self):
+        for _ in range(2):
+            self.search(HTTP_X_FORWARDED_FOR='1.1.1.1, 10.0.0.9')
+        self.assertEqual(self.search(HTTP_X_FORWARDED_FOR='10.0.0.9').status_code, 429)
+        self.assertEqual(self.search(HTTP_X_FORWARDED_FOR='10.0.0.8').status_code, 200)
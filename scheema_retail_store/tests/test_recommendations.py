@@ -0,0 +1,40 @@
+import numpy as np
+from django.urls import reverse
+from scheema_retail_store.models import Order, OrderItem, ProductRecommendation
+from scheema_retail_store.recommendations import basket_pairs, build_recommendations
+from .fixtures import StoreTestCase, seed_catalog
+
+
+class RecommendationTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = seed_catalog(4, reviews_per_product=0)
+        self.user = self.create_user()
+
+    def order(self, *products):
+        order = Order.objects.create(user=self.user, total_price=0)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=1, price=product.price)
+            for product in products
+        ])
+
+    def test_basket_pairs(self):
+        left, right = basket_pairs(np.array([1, 1, 1, 2, 2, 3]), np.array([10, 11, 12, 20, 21, 30]))
+        self.assertEqual(sorted(zip(left.tolist(), right.tolist())), [
+            (10, 11), (10, 12), (11, 10), (11, 12), (12, 10), (12, 11), (20, 21), (21, 20)])
+
+    def test_top_k_neighbours_by_co_occurrence(self):
+        first, second, third, fourth = self.products
+        self.order(first, second)
+        self.order(first, second)
+        self.order(first, third)
+        self.order(fourth)
+
+        build_recommendations(top_k=2)
+        recommended = list(ProductRecommendation.objects.filter(
+            product=first).order_by('rank').values_list('recommended', flat=True))
+        self.assertEqual(recommended, [second.id, third.id])
+        self.assertFalse(ProductRecommendation.objects.filter(product=fourth).exists())
+
+        response = self.client.get(reverse('product_detail', args=[first.slug]))
+        self.assertContains(response, 'Customers also bought')
@@ -0,0 +1,49 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from scheema_retail_store.analytics import rollup_sales
+from scheema_retail_store.models import DailyCategorySales, DailyProductSales, Order
+from .fixtures import StoreTestCase, create_orders, seed_catalog
+
+
+class SalesRollupTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = seed_catalog(3, reviews_per_product=0)
+        self.user = self.create_user()
+
+    def place_orders(self, count, age=timedelta(hours=1)):
+        orders = create_orders(self.user, self.products, count, lines_per_order=2)
+        Order.objects.filter(pk__in=[order.pk for order in orders]).update(
+            created_at=timezone.now() - age)
+        return orders
+
+    def test_rollup_is_incremental(self):
+        self.place_orders(3)
+        self.assertEqual(rollup_sales(), 3)
+        self.assertEqual(rollup_sales(), 0)
+
+        self.place_orders(2, age=timedelta(0))
+        self.assertEqual(rollup_sales(batch_size=1, settle=timedelta(0)), 2)
+
+        # 5 orders of 2 lines, each 1 unit at 9.99.
+        self.assertEqual(sum(DailyProductSales.objects.values_list('units', flat=True)), 10)
+        category = DailyCategorySales.objects.get()
+        self.assertEqual((category.units, category.revenue, category.orders),
+                         (10, Decimal('99.90'), 5))
+
+    def test_recent_orders_wait_to_settle(self):
+        self.place_orders(1, age=timedelta(seconds=0))
+        self.assertEqual(rollup_sales(), 0)
+        self.assertEqual(rollup_sales(settle=timedelta(0)), 1)
+
+    def test_sales_report_reads_rollups(self):
+        self.place_orders(2)
+        rollup_sales()
+        staff = User.objects.create_user('staff', password='not-a-real-password', is_staff=True)
+        self.client.force_login(staff)
+
+        response = self.client.get(reverse('sales_report'))
+        self.assertContains(response, '$39.96')
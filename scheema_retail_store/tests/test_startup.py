@@ -0,0 +1,38 @@
+from django.template import Context, Engine
+from django.test import SimpleTestCase, override_settings
+from scheema_retail_store.api import _quick_view_entry
+from scheema_retail_store.inventory import available_stock
+from scheema_retail_store.management.commands.bench_startup import parse_importtime
+from scheema_retail_store.warmup import warm_up
+from .fixtures import StoreTestCase, seed_catalog
+
+
+class StartupTests(SimpleTestCase):
+    def test_parse_importtime_sums_self_time_per_package(self):
+        packages = parse_importtime(
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:      1500 |       1500 |     django.utils\n'
+            'import time:       500 |       2000 |   django\n'
+            'import time:      2000 |       2000 | tailwind\n'
+            'some warning\n')
+        self.assertEqual(dict(packages), {'django': 2.0, 'tailwind': 2.0})
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_runtime_tailwind_tag_links_compiled_stylesheet(self):
+        engine = Engine(libraries={'tailwind_tags': 'scheema_retail_frontend.runtime_tags'})
+        template = engine.from_string('{% load tailwind_tags %}{% tailwind_css %}')
+        self.assertEqual(template.render(Context()),
+                         '<link rel="stylesheet" href="/static/css/dist/styles.css">')
+
+
+class WarmUpTests(StoreTestCase):
+    def test_warm_up_primes_product_caches(self):
+        products = seed_catalog(3, reviews_per_product=0)
+        ids = [product.id for product in products]
+        warm_up(products=2)
+
+        with self.assertNumQueries(0):
+            _quick_view_entry(ids[0])
+            available_stock(ids[:2])
+        with self.assertNumQueries(2):
+            available_stock(ids)
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from django.test import override_settings
+from django.utils import timezone
+from scheema_retail_store import taskqueue
+from scheema_retail_store.models import Task
+from .fixtures import StoreTestCase
+
+calls = []
+
+
+@taskqueue.task(max_attempts=2, retry_delay=10)
+def flaky(value):
+    calls.append(value)
+    if value == 'fail':
+        raise ValueError(value)
+
+
+class TaskQueueTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        calls.clear()
+
+    def test_delay_queues_and_worker_runs(self):
+        queued = flaky.delay('ok')
+        self.assertEqual(queued.status, Task.QUEUED)
+        self.assertEqual(calls, [])
+
+        self.assertEqual(taskqueue.run_pending(), 1)
+        self.assertEqual(calls, ['ok'])
+        task = Task.objects.get(pk=queued.pk)
+        self.assertEqual((task.status, task.attempts), (Task.DONE, 1))
+        self.assertEqual(taskqueue.run_pending(), 0)
+
+    def test_failure_backs_off_then_fails_for_good(self):
+        queued = flaky.delay('fail')
+        taskqueue.run_pending()
+        task = Task.objects.get(pk=queued.pk)
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertIn('ValueError', task.last_error)
+        self.assertGreater(task.run_at, timezone.now() + timedelta(seconds=5))
+        # Not due yet.
+        self.assertEqual(taskqueue.run_pending(), 0)
+
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        taskqueue.run_pending()
+        task = Task.objects.get(pk=queued.pk)
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+        self.assertEqual(calls, ['fail', 'fail'])
+
+    def test_expired_lease_is_claimed_again(self):
+        queued = flaky.delay('ok')
+        self.assertEqual(taskqueue.claim().pk, queued.pk)
+        self.assertIsNone(taskqueue.claim())
+
+        Task.objects.filter(pk=queued.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        task = taskqueue.claim()
+        self.assertEqual((task.pk, task.attempts), (queued.pk, 2))
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        self.assertIsNone(flaky.delay('ok'))
+        self.assertEqual(calls, ['ok'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_stats_and_purge(self):
+        flaky.delay('ok')
+        flaky.delay('ok')
+        taskqueue.run_pending(limit=1)
+
+        stats = taskqueue.queue_stats()
+        self.assertEqual(stats['by_status'][Task.QUEUED], 1)
+        self.assertEqual(stats['by_status'][Task.DONE], 1)
+        self.assertEqual(stats['queued_by_name'], {f'{__name__}.flaky': 1})
+        self.assertEqual(stats['recent'][f'{__name__}.flaky']['done'], 1)
+        self.assertGreaterEqual(stats['recent'][f'{__name__}.flaky']['mean_run_seconds'], 0)
+
+        self.assertEqual(taskqueue.purge_finished(timedelta(0)), 1)
+        self.assertEqual(Task.objects.count(), 1)
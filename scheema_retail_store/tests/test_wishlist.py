@@ -0,0 +1,36 @@
+from django.urls import reverse
+from scheema_retail_store.models import Wishlist
+from scheema_retail_store.wishlist import wishlist_ids
+from .fixtures import StoreTestCase, seed_catalog
+
+
+class WishlistTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = seed_catalog(3, reviews_per_product=0)
+        self.user = self.create_user()
+        self.client.force_login(self.user)
+
+    def test_adding_twice_is_idempotent(self):
+        for _ in range(2):
+            self.client.post(reverse('add_to_wishlist', args=[self.products[0].id]))
+        self.assertEqual(Wishlist.objects.filter(user=self.user).count(), 1)
+
+    def test_membership_follows_changes(self):
+        self.assertEqual(wishlist_ids(self.user), frozenset())
+        self.client.post(reverse('api_wishlist_add', args=[self.products[1].id]))
+        self.assertEqual(wishlist_ids(self.user), {self.products[1].id})
+
+        response = self.client.post(reverse('api_wishlist_remove', args=[self.products[1].id]))
+        self.assertEqual(response.json(), {'product_ids': []})
+        self.assertEqual(wishlist_ids(self.user), frozenset())
+
+    def test_tiles_show_hearted_state(self):
+        self.client.post(reverse('add_to_wishlist', args=[self.products[2].id]))
+
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, reverse('remove_from_wishlist', args=[self.products[2].id]))
+        self.assertContains(response, reverse('add_to_wishlist', args=[self.products[0].id]))
+
+        response = self.client.get(reverse('api_wishlist'))
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.products[2].id])
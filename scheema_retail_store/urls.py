@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -11,14 +11,39 @@ urlpatterns = [
 
     path('product/<slug:slug>/', views.product_detail, name='product_detail'),
     
+    path('search/', views.search, name='search'),
+
+    path('categories/', views.category_list, name='category_list'),
     path('category/<slug:slug>/', views.category_products, name='category_products'),
     
     path('cart/', views.view_cart, name='view_cart'),
     path('cart/add/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
     path('cart/remove/<int:cart_id>/', views.remove_from_cart, name='remove_from_cart'),
     
+    path('wishlist/', views.view_wishlist, name='view_wishlist'),
+    path('currency/', views.set_currency, name='set_currency'),
+    path('wishlist/add/<int:product_id>/', views.add_to_wishlist, name='add_to_wishlist'),
+    path('wishlist/remove/<int:product_id>/', views.remove_from_wishlist, name='remove_from_wishlist'),
+
     path('order/place/', views.place_order, name='place_order'),
     
     path('dashboard/', views.dashboard, name='dashboard'),
     path('settings/', views.update_profile, name='update_profile'),
+    path('staff/sales/', views.sales_report, name='sales_report'),
+    path('staff/performance/', views.performance_stats, name='performance_stats'),
+    path('staff/tasks/', views.task_stats, name='task_stats'),
+    path('staff/export/<slug:name>/', views.export_data, name='export_data'),
+
+    path('api/products/', api.product_list, name='api_product_list'),
+    path('api/products/<int:product_id>/quick-view/', api.product_quick_view, name='api_product_quick_view'),
+    path('api/products/<slug:slug>/', api.product_detail, name='api_product_detail'),
+    path('api/categories/', api.category_list, name='api_category_list'),
+    path('api/cart/', api.cart_detail, name='api_cart'),
+    path('api/cart/add/<int:product_id>/', api.cart_add, name='api_cart_add'),
+    path('api/cart/remove/<int:product_id>/', api.cart_remove, name='api_cart_remove'),
+    path('api/wishlist/', api.wishlist_detail, name='api_wishlist'),
+    path('api/wishlist/add/<int:product_id>/', api.wishlist_add, name='api_wishlist_add'),
+    path('api/wishlist/remove/<int:product_id>/', api.wishlist_remove, name='api_wishlist_remove'),
+    path('api/checkout/start/', api.checkout_start, name='api_checkout_start'),
+    path('api/checkout/', api.checkout, name='api_checkout'),
 ]
\ No newline at end of file
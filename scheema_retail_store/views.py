@@ -1,15 +1,29 @@
-import contextlib
+from datetime import date, timedelta
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.dispatch import receiver
 from django.shortcuts import redirect, render, get_object_or_404
-from .models import Cart, CartItem, Category, Order, OrderItem, Product, UserProfile
-from .models import Product
+from .cart import add_item, create_order, get_lines, media_url, merge_session_cart, remove_item, total_quantity
+from .categories import cached_categories
+from .currency import choose_currency, price_products, request_currency
+from .exports import EXPORTS, FORMATS, stream_export
+from .inventory import InsufficientStock, available_stock
+from .tasks import delete_stored_file
+from .taskqueue import queue_stats
+from . import wishlist
+from .models import (Cart, CartItem, Category, DailyCategorySales, DailyProductSales, Order,
+                     Product, ProductRecommendation, RollupState, UserProfile)
 from django.contrib.auth.models import User
 from django.contrib.auth import login
 from django.contrib.auth.views import LoginView
 from django.shortcuts import redirect
+from django.db.models import Avg, Count, Sum
+from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.db.models.signals import post_save
-from django.core.files.storage import default_storage
+from django.views.decorators.http import require_POST
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from .middleware import latencies
 
 
 class CustomLoginView(LoginView):
@@ -21,27 +35,9 @@ class CustomLoginView(LoginView):
     def form_valid(self, form):
         response = super().form_valid(form)
 
-        if self.request.user.is_authenticated:
-            session_cart = self.request.session.get('cart', {})
-            if session_cart:
-                cart, created = Cart.objects.get_or_create(
-                    user=self.request.user)
-
-                for product_id, item in session_cart.items():
-                    product = get_object_or_404(Product, id=product_id)
-                    cart_item, created = CartItem.objects.get_or_create(
-                        cart=cart, product=product)
-
-                    if not created:
-                        cart_item.quantity += item['quantity']
-                    else:
-                        cart_item.quantity = item['quantity']
-                    cart_item.save()
-
-                del self.request.session['cart']
-
-                messages.success(
-                    self.request, 'Cart items migrated to your account')
+        if merge_session_cart(self.request):
+            messages.success(
+                self.request, 'Cart items migrated to your account')
 
         return response
 
@@ -61,85 +57,108 @@ def register(request):  # sourcery skip: extract-method
 
 
 @receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
+def create_user_profile(sender, instance, created, **kwargs):
+    # Only new users need a profile; logins save the user too, to update last_login.
     if created:
         UserProfile.objects.create(user=instance)
 
-    instance.profile.save()
-
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
+def get_profile(user):
+    """
+    Returns the user's profile, creating it for users added without the
+    post_save signal (e.g. with bulk_create).
+    """
+    profile, created = UserProfile.objects.get_or_create(user=user)
+    return profile
 
 
 def update_profile(request):
     if not request.user.is_authenticated:
         return redirect('login')
-    profile = request.user.profile
+    profile = get_profile(request.user)
     if request.method == 'POST':
         return _update_profile_actions(request, profile)
     return render(request, 'stores/settings.html', {'profile': profile})
 
 
+def _apply_changes(instance, values, skip_blank=False):
+    """
+    Sets the attributes in `values` that differ from `instance` and returns
+    the names of those that changed.
+    """
+    changed = []
+    for field, value in values.items():
+        if (value or not skip_blank) and getattr(instance, field) != value:
+            setattr(instance, field, value)
+            changed.append(field)
+    return changed
+
+
 def _update_profile_actions(request, profile):
     first_name = request.POST.get('first_name', '').strip()
     last_name = request.POST.get('last_name', '').strip()
     email = request.POST.get('email', '').strip()
     description = request.POST.get('description', '').strip()
-    job_name = request.POST.get('job_name', '').strip()
+    job_title = request.POST.get('job_title', '').strip()
     social_links = {
         'linkedin': request.POST.get('linkedin', '').strip(),
         'twitter': request.POST.get('twitter', '').strip(),
         'github': request.POST.get('github', '').strip(),
     }
 
-    profile_image = request.FILES.get('profile_image')
-    if profile_image:
-        if profile.profile_image:
-            default_storage.delete(
-                profile.profile_image.path)  # Delete old image
-        profile.profile_image = profile_image
-
     user = request.user
-    if first_name:
-        user.first_name = first_name
-    if last_name:
-        user.last_name = last_name
-    if email:
+    if email and email != user.email:
         if User.objects.filter(email=email).exclude(pk=user.pk).exists():
             messages.error(request, 'Email is already in use.')
             return redirect('update_profile')
-        user.email = email
 
-    user.save()
-    profile.description = description
-    profile.job_name = job_name
-    profile.social_links = social_links
-    profile.save()
+    # Only write the rows, and the columns, that actually changed.
+    user_changes = _apply_changes(user, {
+        'first_name': first_name, 'last_name': last_name, 'email': email,
+    }, skip_blank=True)
+    if user_changes:
+        user.save(update_fields=user_changes)
+
+    profile_changes = _apply_changes(profile, {
+        'description': description, 'job_title': job_title, 'social_links': social_links,
+    })
+    profile_image = request.FILES.get('profile_image')
+    if profile_image:
+        if profile.profile_image:
+            # Remove the old image after the response has gone out.
+            delete_stored_file.delay(profile.profile_image.name)
+        profile.profile_image = profile_image
+        profile_changes.append('profile_image')
+    if profile_changes:
+        profile.save(update_fields=profile_changes + ['updated_at'])
 
     messages.success(request, 'Your profile has been updated successfully!')
     return redirect('dashboard')
 
 
+HOME_PRODUCT_FIELDS = ('id', 'slug', 'name', 'price', 'image', 'updated_at', 'category__name')
+
+
 def home(request):
-    products = Product.objects.all()
-    return render(request, 'stores/home.html', {'products': products})
+    products = Product.objects.select_related(
+        'category').only(*HOME_PRODUCT_FIELDS)
+    return render(request, 'stores/home.html', {
+        'products': price_products(products, request_currency(request)),
+        'wishlist_ids': wishlist.wishlist_ids(request.user),
+    })
 
 
 def product_detail(request, slug):
     product = get_object_or_404(Product, slug=slug)
 
-    reviews = product.reviews.all()
-    total_reviews = reviews.count()
-    average_rating = 0
-    if total_reviews > 0:
-        average_rating = sum(
-            [review.rating for review in reviews]) / total_reviews
+    # Both read the (product, created_at) index of the reviews table.
+    reviews = product.reviews.order_by('-created_at')
+    review_stats = reviews.aggregate(total=Count('id'), average=Avg('rating'))
+    total_reviews = review_stats['total']
+    average_rating = review_stats['average'] or 0
 
     features = []
-    for feature in product.features.split(','):
+    for feature in (product.features or '').split(','):
         feature = feature.strip()
         if feature:
             feature = feature.replace('{', '').replace('}', '').replace("'", '').replace('-', 'N/A').strip()
@@ -150,21 +169,28 @@ def product_detail(request, slug):
     total_qty_in_cart = 0
 
     if request.user.is_authenticated:
-        with contextlib.suppress(Cart.DoesNotExist):
-            cart = Cart.objects.get(user=request.user)
-            cart_item = CartItem.objects.filter(
-                cart=cart, product=product).first()
-            if cart_item:
-                total_qty_in_cart = cart_item.quantity
+        total_qty_in_cart = CartItem.objects.filter(
+            cart__user=request.user, product=product).values_list('quantity', flat=True).first() or 0
     else:
         cart = request.session.get('cart', {})
         if str(product.id) in cart:
             total_qty_in_cart = cart[str(product.id)]['quantity']
 
+    recommendations = ProductRecommendation.objects.filter(product=product).select_related(
+        'recommended').only('recommended__name', 'recommended__slug', 'recommended__price',
+                            'recommended__image').order_by('rank')
+    currency = request_currency(request)
+    price_products([product], currency)
+    recommendations = list(recommendations)
+    price_products([recommendation.recommended for recommendation in recommendations], currency)
+
     return render(request, 'stores/product_detail.html', {
         'product': product,
+        'image_urls': [media_url(name) for name in product.images or []],
+        'recommendations': recommendations,
         'features': features,
         'total_qty_in_cart': total_qty_in_cart,
+        'available': available_stock([product.id]).get(product.id, 0),
         'average_rating': average_rating,
         'total_reviews': total_reviews,
         'reviews': reviews,
@@ -172,39 +198,36 @@ def product_detail(request, slug):
     })
 
 
+def category_list(request):
+    return render(request, 'stores/category_list.html', {
+        'categories': cached_categories(),
+    })
+
+
 def category_products(request, slug):
     category = get_object_or_404(Category, slug=slug)
     products = Product.objects.filter(category=category)
-    return render(request, 'stores/category_products.html', {'category': category, 'products': products})
+    return render(request, 'stores/category_products.html', {
+        'category': category,
+        'products': price_products(products, request_currency(request)),
+        'wishlist_ids': wishlist.wishlist_ids(request.user),
+    })
 
 
 def add_to_cart(request, product_id):
     product = get_object_or_404(Product, pk=product_id)
 
-    if request.user.is_authenticated:
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart, product=product)
-
-        if not created:
-            cart_item.quantity += 1
-        else:
-            cart_item.quantity = 1
-        cart_item.save()
-
-        messages.success(request, f'{product.name} added to cart')
-
+    try:
+        add_item(request, product)
+    except InsufficientStock as error:
+        messages.error(
+            request, f'Only {error.shortages[product.id]} of {product.name} left in stock.')
     else:
-        cart = request.session.get('cart', {})
-
-        if str(product_id) in cart:
-            cart[str(product_id)]['quantity'] += 1
+        if request.user.is_authenticated:
+            messages.success(request, f'{product.name} added to cart')
         else:
-            cart[str(product_id)] = {'quantity': 1, 'name': product.name}
+            messages.success(request, f'{product.name} added to cart (session)')
 
-        request.session['cart'] = cart
-
-        messages.success(request, f'{product.name} added to cart (session)')
     referer = request.META.get('HTTP_REFERER', '')
     if referer and f'/product/{product.slug}/' in referer:
         return redirect(f'/product/{product.slug}/')
@@ -213,86 +236,23 @@ def add_to_cart(request, product_id):
 
 
 def remove_from_cart(request, cart_id):
-    if request.user.is_authenticated:
-        cart = Cart.objects.get(user=request.user)
-
-        cart_item = CartItem.objects.filter(
-            cart=cart, product__id=cart_id).first()
-
-        if cart_item:
-            if cart_item.quantity > 1:
-                cart_item.quantity -= 1
-                cart_item.save()
-                messages.success(
-                    request, f'{cart_item.product.name} quantity decreased by 1.')
-            else:
-                cart_item.delete()
-                messages.success(
-                    request, f'{cart_item.product.name} removed from cart.')
-        else:
-            messages.error(request, 'Item not found in cart.')
+    removed = remove_item(request, cart_id)
 
-    else:
-        cart = request.session.get('cart', {})
-
-        if str(cart_id) in cart:
-            product_name = cart[str(cart_id)]["name"]
-
-            if cart[str(cart_id)]['quantity'] > 1:
-                cart[str(cart_id)]['quantity'] -= 1
-                request.session['cart'] = cart
-                messages.success(
-                    request, f'{product_name} quantity decreased by 1.')
-            else:
-                del cart[str(cart_id)]
-                request.session['cart'] = cart
-                messages.success(request, f'{product_name} removed from cart.')
+    if removed:
+        product_name, remaining = removed
+        if remaining:
+            messages.success(
+                request, f'{product_name} quantity decreased by 1.')
         else:
-            messages.error(request, 'Item not found in cart.')
+            messages.success(request, f'{product_name} removed from cart.')
+    else:
+        messages.error(request, 'Item not found in cart.')
 
     return redirect('view_cart')
 
 
 def view_cart(request):
-    if request.user.is_authenticated:
-        cart = Cart.objects.get(user=request.user)
-        cart_items = cart.items.all()
-        cart_items_with_details = [
-            {
-                'product': {
-                    'id': item.product.id,
-                    'slug': item.product.slug,
-                    'name': item.product.name,
-                    'description': item.product.description,
-                    'price': item.product.price,
-                    'image': item.product.image,
-                    'category': item.product.category.name if item.product.category else None,
-                    'stock': item.product.stock
-                },
-                'quantity': item.quantity,
-                'subtotal': item.quantity * item.product.price
-            }
-            for item in cart_items
-        ]
-    else:
-        cart = request.session.get('cart', {})
-        cart_items_with_details = [
-            {
-                'product': {
-                    'id': Product.objects.get(id=product_id).id,
-                    'slug': Product.objects.get(id=product_id).slug,
-                    'name': item['name'],
-                    'description': Product.objects.get(id=product_id).description,
-                    'price': Product.objects.get(id=product_id).price,
-                    'image': Product.objects.get(id=product_id).image,
-                    'category': Product.objects.get(id=product_id).category.name if Product.objects.get(id=product_id).category else None,
-                    'stock': Product.objects.get(id=product_id).stock
-                },
-                'quantity': item['quantity'],
-                'subtotal': item['quantity'] * Product.objects.get(id=product_id).price
-            }
-            for product_id, item in cart.items()
-        ]
+    cart_items_with_details = get_lines(request)
 
     total_items_in_cart = get_cart_total_items(request)
     total_cost = sum(item['subtotal'] for item in cart_items_with_details)
@@ -305,18 +265,62 @@ def view_cart(request):
 
 
 def get_cart_total_items(request):
-    if request.user.is_authenticated:
-        cart = Cart.objects.get(user=request.user)
-        return sum([item.quantity for item in cart.items.all()])
-    else:
-        cart = request.session.get('cart', {})
-        return sum(item['quantity'] for item in cart.values())
+    return total_quantity(request)
 
 
 def search(request):
     query = request.GET.get('q', '')
     products = Product.objects.filter(name__icontains=query) if query else []
-    return render(request, 'stores/search.html', {'products': products, 'query': query})
+    return render(request, 'stores/search.html', {
+        'products': price_products(products, request_currency(request)),
+        'query': query,
+    })
+
+
+def view_wishlist(request):
+    if not request.user.is_authenticated:
+        return redirect('login')
+    products = Product.objects.filter(wishlist__user=request.user).select_related(
+        'category').only(*HOME_PRODUCT_FIELDS)
+    return render(request, 'stores/wishlist.html', {
+        'products': price_products(products, request_currency(request)),
+        'wishlist_ids': wishlist.wishlist_ids(request.user),
+    })
+
+
+def _back(request, fallback):
+    referer = request.META.get('HTTP_REFERER')
+    return redirect(referer if referer and url_has_allowed_host_and_scheme(
+        referer, allowed_hosts={request.get_host()}) else fallback)
+
+
+@require_POST
+def set_currency(request):
+    """
+    Shows prices in the posted currency from now on. Carts and orders stay
+    in the shop's own currency.
+    """
+    choose_currency(request, request.POST.get('currency'))
+    return _back(request, 'home')
+
+
+@require_POST
+def add_to_wishlist(request, product_id):
+    if not request.user.is_authenticated:
+        return redirect('login')
+    product = get_object_or_404(Product.objects.only('id', 'name'), pk=product_id)
+    wishlist.add(request.user, product.id)
+    messages.success(request, f'{product.name} added to your wishlist.')
+    return _back(request, 'view_wishlist')
+
+
+@require_POST
+def remove_from_wishlist(request, product_id):
+    if not request.user.is_authenticated:
+        return redirect('login')
+    wishlist.remove(request.user, product_id)
+    messages.success(request, 'Removed from your wishlist.')
+    return _back(request, 'view_wishlist')
 
 
 def place_order(request):
@@ -329,34 +333,95 @@ def place_order(request):
         session_key = request.session.session_key
         cart = Cart.objects.filter(session_key=session_key).first()
 
-    if not cart or not cart.items.exists():
+    try:
+        order = create_order(
+            cart, request.user if request.user.is_authenticated else None)
+    except InsufficientStock:
+        messages.error(
+            request, 'Some items in your cart are no longer available in the quantity requested.')
         return redirect('view_cart')
-
-    total_cost = sum(item.total_price for item in cart.items.all())
-
-    if total_cost > 0:
-        order = Order.objects.create(
-            user=request.user if request.user.is_authenticated else None,
-            total_price=total_cost
-        )
-
-        for item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=item.product,
-                quantity=item.quantity,
-                price=item.product.price,
-                image=item.product.image if hasattr(
-                    item.product, 'image') else None
-            )
-
-        cart.items.all().delete()
-
+    if order:
         return redirect('dashboard')
 
     return redirect('view_cart')
 
 
 def dashboard(request):
-    orders = Order.objects.filter(user=request.user)
+    if not request.user.is_authenticated:
+        return redirect('login')
+    # The lines hold a snapshot of what was ordered; no join to the catalog.
+    orders = Order.objects.filter(user=request.user).prefetch_related('items')
     return render(request, 'stores/dashboard.html', {'orders': orders})
+
+
+@staff_member_required
+def performance_stats(request):
+    if request.method == 'POST':
+        latencies.clear()
+    return JsonResponse({'latencies': latencies.snapshot()})
+
+
+@staff_member_required
+def task_stats(request):
+    return JsonResponse(queue_stats())
+
+
+@staff_member_required
+def sales_report(request):
+    """
+    Sales over the last `?days=` days (30 by default), read only from the
+    daily rollups maintained by the `rollup_sales` command.
+    """
+    try:
+        days = min(max(int(request.GET.get('days', 30)), 1), 366)
+    except ValueError:
+        days = 30
+    since = timezone.localdate() - timedelta(days=days - 1)
+
+    category_sales = DailyCategorySales.objects.filter(date__gte=since)
+    daily = category_sales.values('date').annotate(
+        total_units=Sum('units'), total_revenue=Sum('revenue')).order_by('-date')
+    categories = category_sales.values('category__name').annotate(
+        total_units=Sum('units'), total_revenue=Sum('revenue'),
+        total_orders=Sum('orders')).order_by('-total_revenue')
+    top_products = DailyProductSales.objects.filter(date__gte=since).values(
+        'product__name', 'product__slug').annotate(
+        total_units=Sum('units'), total_revenue=Sum('revenue')).order_by('-total_revenue')[:20]
+
+    return render(request, 'stores/sales_report.html', {
+        'days': days,
+        'daily': daily,
+        'categories': categories,
+        'top_products': top_products,
+        'totals': category_sales.aggregate(total_units=Sum('units'), total_revenue=Sum('revenue')),
+        'state': RollupState.objects.filter(name='sales').first(),
+    })
+
+
+def _date_param(request, name):
+    try:
+        return date.fromisoformat(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
+
+@staff_member_required
+def export_data(request, name):
+    """
+    Streams export `name` as CSV (or `?format=ndjson`), gzipped with
+    `?gzip=1`; orders and order items can be limited with `?since=` and
+    `?until=` dates. Rows are read and sent in chunks, so neither memory
+    nor the time to the first byte grows with the table.
+    """
+    if name not in EXPORTS:
+        raise Http404(name)
+    format = request.GET.get('format', 'csv')
+    if format not in FORMATS:
+        format = 'csv'
+
+    pieces, content_type, filename = stream_export(
+        name, format, gzip=request.GET.get('gzip') == '1',
+        since=_date_param(request, 'since'), until=_date_param(request, 'until'))
+    response = StreamingHttpResponse(pieces, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
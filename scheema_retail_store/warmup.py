@@ -0,0 +1,56 @@
+import logging
+import time
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver
+from .api import _quick_view_entry
+from .categories import cached_categories
+from .inventory import available_stock
+from .media import load_manifest
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# Templates rendered on the busiest pages, compiled ahead of the first request.
+HOT_TEMPLATES = [
+    'base.html',
+    'stores/home.html',
+    'stores/product_detail.html',
+    'stores/category_products.html',
+    'stores/cart.html',
+    'stores/search.html',
+]
+
+
+def warm_code():
+    """
+    Imports every view through the URLconf, compiles the hot templates and
+    reads the media manifest. None of it changes while the server runs, so
+    it can be done once before forking workers, which then share it.
+    """
+    get_resolver().url_patterns
+    for name in HOT_TEMPLATES:
+        get_template(name)
+    load_manifest()
+
+
+def warm_up(products=500):
+    """
+    Does the work the first requests of a fresh process would otherwise pay
+    for: `warm_code()`, then reading the category list and filling the
+    per-product caches for the first `products` products. What it caches is
+    current when it runs, so it belongs in each worker rather than before
+    forking. Closes the database connections it opened.
+    """
+    start = time.perf_counter()
+    warm_code()
+    cached_categories()
+
+    product_ids = list(Product.objects.order_by('id').values_list('id', flat=True)[:products])
+    for product_id in product_ids:
+        _quick_view_entry(product_id)
+    available_stock(product_ids)
+
+    connections.close_all()
+    logger.info('Warmed up %d products in %.0f ms', len(product_ids),
+                (time.perf_counter() - start) * 1000)
@@ -0,0 +1,24 @@
+from .models import Wishlist
+
+
+def wishlist_ids(user):
+    """
+    Returns the ids of the products on the user's wishlist as a frozenset,
+    so a whole grid of products can be checked for membership at once. One
+    query, answered from the (user, product) unique index; a cached copy
+    would cost a round trip too, and go stale in other processes' caches.
+    Anonymous users have an empty wishlist.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    return frozenset(Wishlist.objects.filter(user=user).values_list('product_id', flat=True))
+
+
+def add(user, product_id):
+    # The unique (user, product) constraint turns a repeated add into a no-op.
+    Wishlist.objects.bulk_create(
+        [Wishlist(user=user, product_id=product_id)], ignore_conflicts=True)
+
+
+def remove(user, product_id):
+    Wishlist.objects.filter(user=user, product_id=product_id).delete()